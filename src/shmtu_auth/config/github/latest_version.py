@@ -1,6 +1,7 @@
 import re
 
-import requests
+from shmtu_auth.src.utils import http_client
+from shmtu_auth.src.utils.deadline import get_timeout
 
 github_author_name = "a645162"
 github_repo_name = "shmtu-auth"
@@ -11,7 +12,7 @@ def get_github_branches() -> list[str]:
     url = f"https://api.github.com/repos/{github_author_name}/{github_repo_name}/branches"
 
     try:
-        response = requests.get(url)
+        response = http_client.get(url, timeout=get_timeout("github"))
         if response.status_code != 200:
             return ["main"]  # 如果API请求失败，返回默认分支
 
@@ -46,7 +47,7 @@ def get_branch_version(branch: str = "main") -> str:
     url += "src/shmtu_auth/version.py"
 
     try:
-        response = requests.get(url)
+        response = http_client.get(url, timeout=get_timeout("github"))
         content = response.text.strip()
         if len(content) == 0:
             return ""
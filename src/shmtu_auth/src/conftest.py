@@ -0,0 +1,63 @@
+"""
+测试共用的fixture(本地eportal模拟服务器)
+"""
+
+import os
+from typing import Optional, Tuple
+
+import pytest
+
+from shmtu_auth.src.core import account_health, get_query_string_requests, query_string
+from shmtu_auth.src.core.shmtu_auth import ShmtuNetAuth
+from shmtu_auth.src.simulator.eportal import EportalSimulator, EportalSimulatorConfig
+
+simulator_user_id = "202412300001"
+simulator_password = "password_1"
+
+
+@pytest.fixture
+def simulator_user() -> Tuple[str, str]:
+    """模拟服务器可以登录的账号 (学号, 密码)"""
+    return simulator_user_id, simulator_password
+
+
+@pytest.fixture
+def simulator(tmp_path, monkeypatch):
+    """
+    启动模拟服务器，联网检测与获取Query String指向模拟服务器
+    Query String缓存与账号健康记录保存在临时目录
+    """
+    config = EportalSimulatorConfig(user_dict={simulator_user_id: simulator_password}, seed=0)
+    with EportalSimulator(config) as simulator:
+        monkeypatch.setenv("SHMTU_AUTH_PROBE_URL_LIST", simulator.probe_url)
+        monkeypatch.setattr(get_query_string_requests, "QUERY_STRING_URL", simulator.query_string_url)
+        monkeypatch.setattr(
+            query_string,
+            "query_string_cache",
+            query_string.QueryStringCache(os.path.join(tmp_path, "query_string.json")),
+        )
+        monkeypatch.setattr(
+            account_health,
+            "account_health_store",
+            account_health.AccountHealthStore(os.path.join(tmp_path, "account_health.json")),
+        )
+        yield simulator
+
+
+@pytest.fixture
+def create_net_auth(simulator):
+    """返回创建指向模拟服务器的认证对象的函数"""
+
+    def create(net_auth_class=ShmtuNetAuth, net_status: Optional[bool] = None):
+        """
+        :param net_auth_class: 认证类，默认为ShmtuNetAuth
+        :param net_status: 预先设置的联网状态，为None时不设置
+        :return: 认证对象
+        """
+        net_auth = net_auth_class()
+        net_auth.url = simulator.interface_url
+        if net_status is not None:
+            net_auth.update_net_status(net_status)
+        return net_auth
+
+    return create
@@ -0,0 +1,337 @@
+import datetime
+import json
+import os
+import statistics
+import threading
+import time
+from typing import Callable, Dict, List, Optional, TypeVar
+
+from shmtu_auth.src.config.project_directory import get_directory_data_path
+from shmtu_auth.src.core.query_string import write_file_atomic
+from shmtu_auth.src.telemetry import metrics
+from shmtu_auth.src.telemetry.event_log import LoginAttemptEvent, emit_event
+from shmtu_auth.src.utils.env import get_env_bool, get_env_float, get_env_int
+from shmtu_auth.src.utils.logs import get_logger
+from shmtu_auth.src.utils.program_env_config import convert_number_to_star
+
+logger = get_logger()
+
+save_path = os.path.join(get_directory_data_path(), "account_health.json")
+
+# 是否根据账号健康度自动调整登录顺序
+account_health_enable = get_env_bool("SHMTU_AUTH_ACCOUNT_HEALTH", True)
+
+# 连续失败多少次后暂时隔离
+quarantine_failures = 3
+# 隔离时间，单位：秒
+quarantine_time = 600.0
+# 距离过期不足多少天时降低优先级
+expire_soon_days = 3
+# 保留最近多少次登录耗时用于计算中位数
+latency_sample_count = 20
+# 没有耗时记录时使用的参考耗时，单位：秒
+reference_latency = 1.0
+# 耗时对分数的影响程度(成功率优先)
+latency_weight = 0.2
+
+env_quarantine_failures = get_env_int("SHMTU_AUTH_ACCOUNT_QUARANTINE_FAILURES", -1)
+if env_quarantine_failures > 0:
+    quarantine_failures = env_quarantine_failures
+
+env_quarantine_time = get_env_float("SHMTU_AUTH_ACCOUNT_QUARANTINE_TIME", -1)
+if env_quarantine_time >= 0:
+    quarantine_time = env_quarantine_time
+
+# 与账号本身无关的失败(网络、门户异常)，不计入健康度
+ignored_message_list = [
+    "Network Error!",
+    "Network Timeout!",
+    "Response Parse Error!",
+    "Query String is Invalid!",
+    "Already Login",
+]
+
+T = TypeVar("T")
+
+
+class AccountHealth:
+    """单个账号的健康记录"""
+
+    user_id: str
+
+    success_count: int
+    failure_count: int
+    consecutive_failures: int
+
+    latency_list: List[float]
+
+    last_failure_message: str
+    last_failure_time: float
+    last_success_time: float
+
+    # 隔离结束时间(time.time)，0表示未隔离
+    quarantine_until: float
+
+    # 过期日期(如20250101)，0表示未知
+    expire_date_int: int
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+
+        self.success_count = 0
+        self.failure_count = 0
+        self.consecutive_failures = 0
+
+        self.latency_list = []
+
+        self.last_failure_message = ""
+        self.last_failure_time = 0.0
+        self.last_success_time = 0.0
+
+        self.quarantine_until = 0.0
+
+        self.expire_date_int = 0
+
+    @property
+    def success_rate(self) -> float:
+        # 拉普拉斯平滑，没有记录的账号视为0.5
+        return (self.success_count + 1) / (self.success_count + self.failure_count + 2)
+
+    @property
+    def median_latency(self) -> float:
+        if len(self.latency_list) == 0:
+            return reference_latency
+        return statistics.median(self.latency_list)
+
+    def is_quarantined(self, now: Optional[float] = None) -> bool:
+        if now is None:
+            now = time.time()
+        return self.quarantine_until > now
+
+    def days_to_expire(self, today: Optional[datetime.date] = None) -> Optional[int]:
+        if self.expire_date_int <= 0:
+            return None
+        if today is None:
+            today = datetime.date.today()
+        try:
+            expire_date = datetime.date(
+                self.expire_date_int // 10**4,
+                self.expire_date_int // 10**2 % 10**2,
+                self.expire_date_int % 10**2,
+            )
+        except ValueError:
+            return None
+        return (expire_date - today).days
+
+    def score(self) -> float:
+        """
+        健康分数，越高越优先
+        成功率越高、耗时越短分数越高，即将过期的账号分数减半
+        """
+        score = self.success_rate / (1 + latency_weight * self.median_latency / reference_latency)
+
+        days = self.days_to_expire()
+        if days is not None and days < expire_soon_days:
+            score *= 0.5
+
+        return score
+
+    def record(self, is_success: bool, latency: float, message: str = "", now: Optional[float] = None) -> None:
+        if now is None:
+            now = time.time()
+
+        self.latency_list.append(latency)
+        if len(self.latency_list) > latency_sample_count:
+            self.latency_list = self.latency_list[-latency_sample_count:]
+
+        if is_success:
+            self.success_count += 1
+            self.consecutive_failures = 0
+            self.last_success_time = now
+            self.quarantine_until = 0.0
+            return
+
+        self.failure_count += 1
+        self.consecutive_failures += 1
+        self.last_failure_message = message
+        self.last_failure_time = now
+
+        if self.consecutive_failures >= quarantine_failures:
+            self.quarantine_until = now + quarantine_time
+            logger.warning(
+                f"Account {convert_number_to_star(self.user_id)} quarantined for {quarantine_time}s "
+                f"after {self.consecutive_failures} failures: {message}"
+            )
+
+    def to_dict(self) -> dict:
+        return {
+            "success_count": self.success_count,
+            "failure_count": self.failure_count,
+            "consecutive_failures": self.consecutive_failures,
+            "latency_list": self.latency_list,
+            "last_failure_message": self.last_failure_message,
+            "last_failure_time": self.last_failure_time,
+            "last_success_time": self.last_success_time,
+            "quarantine_until": self.quarantine_until,
+            "expire_date_int": self.expire_date_int,
+        }
+
+    @staticmethod
+    def from_dict(user_id: str, data: dict) -> "AccountHealth":
+        health = AccountHealth(user_id)
+
+        health.success_count = int(data.get("success_count", 0))
+        health.failure_count = int(data.get("failure_count", 0))
+        health.consecutive_failures = int(data.get("consecutive_failures", 0))
+        health.latency_list = [float(latency) for latency in data.get("latency_list", [])][-latency_sample_count:]
+        health.last_failure_message = str(data.get("last_failure_message", ""))
+        health.last_failure_time = float(data.get("last_failure_time", 0))
+        health.last_success_time = float(data.get("last_success_time", 0))
+        health.quarantine_until = float(data.get("quarantine_until", 0))
+        health.expire_date_int = int(data.get("expire_date_int", 0))
+
+        return health
+
+
+class AccountHealthStore:
+    """
+    账号健康记录
+    保存在数据目录中，程序重启后依然有效
+    """
+
+    path: str
+
+    def __init__(self, path: str = save_path):
+        self.path = path
+
+        self._health_dict: Dict[str, AccountHealth] = {}
+
+        self._lock = threading.Lock()
+        self._is_loaded = False
+
+    def _load(self) -> None:
+        if self._is_loaded:
+            return
+        self._is_loaded = True
+
+        if not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            for user_id, item in data.get("accounts", {}).items():
+                self._health_dict[user_id] = AccountHealth.from_dict(user_id, item)
+        except Exception as e:
+            logger.error(f"Failed to load account health from {self.path}!")
+            logger.error(f"Error: {e}")
+
+    def _save(self) -> None:
+        data = {
+            "version": 1,
+            "accounts": {user_id: health.to_dict() for user_id, health in self._health_dict.items()},
+        }
+
+        try:
+            write_file_atomic(self.path, json.dumps(data, ensure_ascii=False))
+        except Exception as e:
+            logger.error(f"Failed to save account health to {self.path}!")
+            logger.error(f"Error: {e}")
+
+    def _get(self, user_id: str) -> AccountHealth:
+        health = self._health_dict.get(user_id)
+        if health is None:
+            health = AccountHealth(user_id)
+            self._health_dict[user_id] = health
+        return health
+
+    def get(self, user_id: str) -> AccountHealth:
+        with self._lock:
+            self._load()
+            return self._get(user_id)
+
+    def record(self, user_id: str, is_success: bool, latency: float, message: str = "") -> None:
+        """
+        记录一次登录结果
+        :param user_id: 学号
+        :param is_success: 是否成功
+        :param latency: 耗时，单位：秒
+        :param message: 认证服务器返回的信息
+        """
+        if message in ignored_message_list:
+            return
+
+        with self._lock:
+            self._load()
+            self._get(user_id).record(is_success, latency, message)
+            self._save()
+
+    def update_expire_date(self, user_id: str, expire_date_int: int) -> None:
+        with self._lock:
+            self._load()
+            health = self._get(user_id)
+            if health.expire_date_int != expire_date_int:
+                health.expire_date_int = expire_date_int
+                self._save()
+
+    def sort(self, item_list: List[T], get_user_id: Callable[[T], str]) -> List[T]:
+        """
+        按健康度排序(稳定排序，没有记录时保持原顺序)
+        被隔离的账号排在最后而不是被移除，防止所有账号都被隔离时无法登录
+        :param item_list: 账号列表
+        :param get_user_id: 从列表元素中获取学号
+        :return: 排序后的新列表
+        """
+        now = time.time()
+
+        with self._lock:
+            self._load()
+
+            def sort_key(index_item):
+                index, item = index_item
+                health = self._health_dict.get(get_user_id(item))
+                if health is None:
+                    return False, -AccountHealth("").score(), index
+                return health.is_quarantined(now), -health.score(), index
+
+            sorted_list = sorted(enumerate(item_list), key=sort_key)
+
+        return [item for _, item in sorted_list]
+
+
+account_health_store = AccountHealthStore()
+
+
+def sort_user_list_by_health(user_list: List[T], get_user_id: Callable[[T], str] = lambda user_3: user_3[0]) -> List[T]:
+    """
+    按账号健康度调整登录顺序(SHMTU_AUTH_ACCOUNT_HEALTH关闭时保持原顺序)
+    :param user_list: 账号列表，默认元素为(学号, 密码, 是否加密)
+    :param get_user_id: 从列表元素中获取学号
+    :return: 排序后的新列表
+    """
+    if not account_health_enable:
+        return list(user_list)
+    return account_health_store.sort(user_list, get_user_id)
+
+
+def record_login_result(user_id: str, is_success: bool, latency: float, message: str = "") -> None:
+    """
+    记录一次登录尝试(事件日志、指标与账号健康度)
+    :param user_id: 学号
+    :param is_success: 是否成功
+    :param latency: 耗时，单位：秒
+    :param message: 服务器返回的信息
+    """
+    emit_event(LoginAttemptEvent(user_id, is_success, message, latency))
+
+    if is_success:
+        result = "success"
+    elif message in ignored_message_list:
+        result = "error"
+    else:
+        result = "failure"
+    metrics.record_login(user_id, result, latency)
+
+    if not account_health_enable:
+        return
+    account_health_store.record(user_id, is_success, latency, message)
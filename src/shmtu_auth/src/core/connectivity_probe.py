@@ -0,0 +1,186 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional
+
+from shmtu_auth.src.telemetry import metrics
+from shmtu_auth.src.telemetry.event_log import ProbeEvent, emit_event
+from shmtu_auth.src.utils.deadline import get_remaining_time, get_timeout
+from shmtu_auth.src.utils.env import get_env_float, get_env_int, get_env_str
+from shmtu_auth.src.utils.http_session import get_session
+from shmtu_auth.src.utils.logs import get_logger
+
+logger = get_logger()
+
+# 默认的204检测地址(同时发起，任意一个返回204即认为已联网)
+default_probe_url_list: List[str] = [
+    "http://www.google.cn/generate_204",
+    "http://edge-http.microsoft.com/captiveportal/generate_204",
+    "http://connect.rom.miui.com/generate_204",
+    "https://www.v2ex.com/generate_204",
+]
+
+# 需要多少个地址返回204才认为已联网
+probe_quorum = 1
+# 单个地址的超时时间，单位：秒(SHMTU_AUTH_TIMEOUT_PROBE)
+probe_timeout = get_timeout("probe")
+# 整次检测的超时时间，单位：秒
+probe_deadline = 3.0
+
+env_probe_quorum = get_env_int("SHMTU_AUTH_PROBE_QUORUM", -1)
+if env_probe_quorum > 0:
+    probe_quorum = env_probe_quorum
+
+env_probe_timeout = get_env_float("SHMTU_AUTH_PROBE_TIMEOUT", -1)
+if env_probe_timeout > 0:
+    probe_timeout = env_probe_timeout
+
+env_probe_deadline = get_env_float("SHMTU_AUTH_PROBE_DEADLINE", -1)
+if env_probe_deadline > 0:
+    probe_deadline = env_probe_deadline
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_probe_url_list() -> List[str]:
+    """
+    获取检测地址列表，可通过SHMTU_AUTH_PROBE_URL_LIST(分号分隔)覆盖
+    例如加入校内的204地址
+    :return: 检测地址列表
+    """
+    env_url_list = get_env_str("SHMTU_AUTH_PROBE_URL_LIST", "")
+    url_list = [url.strip() for url in env_url_list.split(";") if len(url.strip()) > 0]
+    if len(url_list) > 0:
+        return url_list
+    return default_probe_url_list.copy()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="probe")
+    return _executor
+
+
+class ProbeResult:
+    is_connected: bool
+    success_count: int
+    finished_count: int
+    elapsed: float
+    url_status: Dict[str, int]
+
+    def __init__(self):
+        self.is_connected = False
+        self.success_count = 0
+        self.finished_count = 0
+        self.elapsed = 0.0
+        # 已经返回的地址及其状态码(0表示请求失败)
+        self.url_status = {}
+
+    def __repr__(self):
+        return (
+            f"ProbeResult(is_connected={self.is_connected}, "
+            f"success={self.success_count}/{self.finished_count}, "
+            f"elapsed={self.elapsed:.3f}s)"
+        )
+
+
+def probe_url(url: str, timeout: float = probe_timeout) -> int:
+    """
+    请求单个检测地址
+    :param url: 检测地址
+    :param timeout: 超时时间
+    :return: 状态码，请求失败返回0
+    """
+    start_time = time.monotonic()
+    # noinspection PyBroadException
+    try:
+        response = get_session().get(url, timeout=timeout, allow_redirects=False)
+        status_code = response.status_code
+    except Exception:
+        status_code = 0
+    metrics.record_probe(url, status_code, time.monotonic() - start_time)
+    return status_code
+
+
+def probe_connectivity(
+    url_list: Optional[List[str]] = None,
+    quorum: int = -1,
+    timeout: float = -1,
+    deadline: float = -1,
+) -> ProbeResult:
+    """
+    同时请求多个204地址，达到quorum个成功后立即返回，其余请求不再等待
+    :param url_list: 检测地址列表
+    :param quorum: 需要成功的数量
+    :param timeout: 单个地址的超时时间
+    :param deadline: 整次检测的超时时间
+    :return: ProbeResult
+    """
+    if url_list is None:
+        url_list = get_probe_url_list()
+    if quorum <= 0:
+        quorum = probe_quorum
+    if timeout <= 0:
+        timeout = probe_timeout
+    if deadline <= 0:
+        deadline = probe_deadline
+
+    # 不超过本轮剩余的时间预算
+    deadline = get_remaining_time(deadline)
+    timeout = min(timeout, deadline)
+
+    quorum = min(quorum, len(url_list))
+
+    result = ProbeResult()
+    if len(url_list) == 0 or deadline <= 0:
+        return result
+
+    start_time = time.monotonic()
+    end_time = start_time + deadline
+
+    executor = _get_executor()
+    future_dict = {executor.submit(probe_url, url, timeout): url for url in url_list}
+    pending = set(future_dict.keys())
+
+    while len(pending) > 0:
+        remaining = end_time - time.monotonic()
+        if remaining <= 0:
+            break
+
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            status_code = future.result()
+            result.url_status[future_dict[future]] = status_code
+            result.finished_count += 1
+            if status_code == 204:
+                result.success_count += 1
+
+        # 已经达到要求，或者剩余的请求全部成功也无法达到要求
+        if result.success_count >= quorum:
+            break
+        if result.success_count + len(pending) < quorum:
+            break
+
+    # 尚未开始的请求直接取消，正在进行的请求受单个超时时间约束
+    for future in pending:
+        future.cancel()
+
+    result.is_connected = result.success_count >= quorum
+    result.elapsed = time.monotonic() - start_time
+
+    emit_event(ProbeEvent(result.is_connected, result.success_count, result.finished_count, result.elapsed))
+
+    return result
+
+
+def is_connected_by_probe() -> bool:
+    return probe_connectivity().is_connected
+
+
+if __name__ == "__main__":
+    print(probe_connectivity())
@@ -1,14 +1,75 @@
 import json
+import time
+from typing import Optional
 
 import requests
 
-from shmtu_auth.src.core.core_exp import check_is_connected_retry, get_query_string
-from shmtu_auth.src.core.shmtu_auth_const_value import ServiceType
-from shmtu_auth.src.utils.env import get_env_str
+from shmtu_auth.src.core.core_exp import (
+    check_is_connected_retry,
+    get_query_string,
+    get_query_string_with_source,
+)
+from shmtu_auth.src.core.query_string import invalidate_query_string
+from shmtu_auth.src.core.shmtu_auth_const_value import (
+    EPORTAL_INTERFACE_URL,
+    ISMU_URL,
+    ServiceType,
+)
+from shmtu_auth.src.telemetry import metrics
+from shmtu_auth.src.telemetry.event_log import StateChangeEvent, emit_event
+from shmtu_auth.src.telemetry.tracing import span
+from shmtu_auth.src.utils.deadline import DeadlineExceededError, OperationTimeoutError, get_request_timeout
+from shmtu_auth.src.utils.env import get_env_float, get_env_str
+from shmtu_auth.src.utils.http_session import get_session, reset_session
 from shmtu_auth.src.utils.logs import get_logger
 
 logger = get_logger()
 
+# 联网状态的有效期，单位：秒
+# 有效期内登录时直接使用该结果，不再重复检测
+net_status_fresh_time = 30.0
+
+env_net_status_fresh_time = get_env_float("SHMTU_AUTH_NET_STATUS_FRESH_TIME", -1)
+if env_net_status_fresh_time >= 0:
+    net_status_fresh_time = env_net_status_fresh_time
+
+# test_net的重试次数与重试间隔，单位：秒
+net_check_retry_times = 3
+net_check_retry_wait_time = 5
+
+
+def get_default_header() -> dict:
+    """
+    获取认证请求使用的请求头
+    :return: 请求头字典
+    """
+    header: dict = {
+        "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
+        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+        "AppleWebKit/605.1.15 (KHTML, like Gecko) "
+        "Version/17.2.1 Safari/605.1.15",
+        "Accept-Encoding": "identify",
+    }
+
+    env_ua = get_env_str("SHMTU_AUTH_USER_AGENT", "")
+    if env_ua != "":
+        header["User-Agent"] = env_ua
+
+    return header
+
+
+def build_login_data(user: str, pwd: str, password_encrypt: bool, query_string: str) -> dict:
+    return {
+        "userId": user,
+        "password": pwd,
+        "service": ServiceType.EDU,
+        "operatorPwd": "",
+        "operatorUserId": "",
+        "validcode": "",
+        "passwordEncrypt": str(password_encrypt),
+        "queryString": query_string,
+    }
+
 
 class ShmtuNetAuthCore:
     userIndex: str
@@ -17,26 +78,24 @@ class ShmtuNetAuthCore:
     url: str
     header: dict
     isLogin: bool
+    isLoginTime: float
     allData: dict
+    session: requests.Session
 
     def __init__(self):
         self.userIndex = ""
         self.info = ""
         self.data = {}
-        self.url: str = "https://ismu.shmtu.edu.cn:8443/eportal/InterFace.do?method="
-        self.header: dict = {
-            "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-            "AppleWebKit/605.1.15 (KHTML, like Gecko) "
-            "Version/17.2.1 Safari/605.1.15",
-            "Accept-Encoding": "identify",
-        }
+        self.url: str = EPORTAL_INTERFACE_URL
+        self.header: dict = get_default_header()
         self.isLogin: bool = False
+        # isLogin的检测时间(time.monotonic)，0表示从未检测
+        self.isLoginTime: float = 0.0
         self.allData: dict = {}
 
-        env_ua = get_env_str("SHMTU_AUTH_USER_AGENT", "")
-        if env_ua != "":
-            self.header["User-Agent"] = env_ua
+        # 共享连接池，避免每次请求都重新握手
+        self.session = get_session()
+
         logger.info("ShmtuNetAuthCore initialization complete!")
 
     def test_net(self) -> bool:
@@ -44,11 +103,39 @@ class ShmtuNetAuthCore:
         测试网络是否认证
         :return: 是否已经认证
         """
-        self.isLogin = check_is_connected_retry(retry_times=3, wait_time=5)
+        self.update_net_status(
+            check_is_connected_retry(retry_times=net_check_retry_times, wait_time=net_check_retry_wait_time)
+        )
         if not self.isLogin:
             logger.info(f"Network Auth Status: {self.isLogin}")
         return self.isLogin
 
+    def update_net_status(self, is_login: bool, check_time: Optional[float] = None) -> None:
+        """
+        记录外部得到的联网状态
+        :param is_login: 是否已经认证
+        :param check_time: 检测时间(time.monotonic)，默认为当前时间
+        """
+        if check_time is None:
+            check_time = time.monotonic()
+        if self.isLoginTime == 0 or self.isLogin != is_login:
+            emit_event(StateChangeEvent(is_login, self.isLogin))
+        self.isLogin = is_login
+        self.isLoginTime = check_time
+        metrics.set_online(is_login)
+
+    def is_net_status_fresh(self, fresh_time: Optional[float] = None) -> bool:
+        """
+        联网状态是否仍在有效期内
+        :param fresh_time: 有效期，默认使用SHMTU_AUTH_NET_STATUS_FRESH_TIME
+        :return: 是否有效
+        """
+        if fresh_time is None:
+            fresh_time = net_status_fresh_time
+        if self.isLoginTime <= 0:
+            return False
+        return time.monotonic() - self.isLoginTime <= fresh_time
+
     def test_net_by_ismu(self) -> bool:
         """
         测试网络是否认证(通过ismu的认证界面)
@@ -61,43 +148,45 @@ class ShmtuNetAuthCore:
 
         # noinspection PyBroadException
         try:
-            res = requests.get("http://ismu.shmtu.edu.cn/", headers=self.header, verify=False)
+            res = self.session.get(ISMU_URL, headers=self.header, verify=False, timeout=get_request_timeout("ismu"))
             # print(res.geturl())
-            if res.url.find("success.jsp") > 0:
-                self.isLogin = True
-            else:
-                self.isLogin = False
+            self.update_net_status(res.url.find("success.jsp") > 0)
         except Exception:
-            self.isLogin = False
+            self.update_net_status(False)
         return self.isLogin
 
-    def login(self, user, pwd, password_encrypt=False) -> (bool, str):
+    def login(
+        self,
+        user,
+        pwd,
+        password_encrypt=False,
+        net_status: Optional[bool] = None,
+        net_status_time: Optional[float] = None,
+    ) -> (bool, str):
         """
         输入参数登入校园网，自动检测当前网络是否认证。
         :param user:登入id
         :param pwd:登入密码
         :param password_encrypt: 密码是否为密文
+        :param net_status: 调用方刚刚得到的联网状态，为None时使用上次检测的结果
+        :param net_status_time: net_status的检测时间(time.monotonic)
         :return:元组第一项：是否认证状态；第二项：详细信息
         """
         import urllib3
 
         urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-        # 执行登录前再进行一次状态检测
-        self.test_net()
+        if net_status is not None:
+            self.update_net_status(net_status, net_status_time)
+
+        # 执行登录前再进行一次状态检测(状态仍在有效期内则跳过)
+        if not self.is_net_status_fresh():
+            self.test_net()
         if not self.isLogin:
             if user == "" or pwd == "":
                 return False, "用户名或密码为空"
-            self.data = {
-                "userId": user,
-                "password": pwd,
-                "service": ServiceType.EDU,
-                "operatorPwd": "",
-                "operatorUserId": "",
-                "validcode": "",
-                "passwordEncrypt": str(password_encrypt),
-            }
-            current_query_string: str = get_query_string().strip()
+            current_query_string, is_from_cache = get_query_string_with_source()
+            current_query_string = current_query_string.strip()
 
             try:
                 if len(current_query_string) == 0:
@@ -107,24 +196,40 @@ class ShmtuNetAuthCore:
                 logger.debug("Query String: " + current_query_string)
                 logger.info("Get Query String Success!")
 
-                self.data["queryString"] = current_query_string
+                # 上一个账号留下的Cookie不能带到这个账号的登录请求中
+                self.session.cookies.clear()
 
-                res = requests.post(
-                    self.url + "login",
-                    headers=self.header,
-                    data=self.data,
-                    verify=False,
-                )
+                self.data = build_login_data(user, pwd, password_encrypt, current_query_string)
+                login_json = self.post_login(self.data)
+
+                if login_json["result"] != "success" and is_from_cache:
+                    # 缓存的Query String可能已经失效(如IP变化)，重新获取后再试一次
+                    invalidate_query_string()
+                    fresh_query_string = get_query_string(use_cache=False).strip()
+                    if len(fresh_query_string) > 0 and fresh_query_string != current_query_string:
+                        logger.info("Cached Query String was rejected, retry with a fresh one.")
+                        self.data = build_login_data(user, pwd, password_encrypt, fresh_query_string)
+                        login_json = self.post_login(self.data)
 
-                # login_json = json.loads(res.read().decode('utf-8'))
-                login_json = json.loads(res.text)
                 self.userIndex = login_json["userIndex"]
                 self.info = login_json["message"]
                 logger.info(f"Login: {login_json}")
                 if login_json["result"] == "success":
+                    self.update_net_status(True)
                     return True, "Login Success"
                 else:
+                    # 认证服务器拒绝登录，说明此刻仍未认证
+                    self.update_net_status(False)
                     return False, self.info
+            except (OperationTimeoutError, DeadlineExceededError) as e:
+                logger.error(f"Network Timeout: {e}")
+                return False, "Network Timeout!"
+            except requests.exceptions.ConnectionError as e:
+                # 门户断开后，连接池中的旧连接可能已经失效
+                reset_session()
+                self.session = get_session()
+                logger.exception(f"Network Error: {e}")
+                return False, "Network Error!"
             except Exception as e:
                 print(e)
                 logger.exception(f"Network Error: {e}")
@@ -133,6 +238,41 @@ class ShmtuNetAuthCore:
         logger.info("Already Login!")
         return True, "Already Login"
 
+    def post_login(
+        self,
+        data: dict,
+        timeout: Optional[float] = None,
+        session: Optional[requests.Session] = None,
+    ) -> dict:
+        """
+        发送登录请求
+        :param data: 登录表单
+        :param timeout: 超时时间，默认使用SHMTU_AUTH_TIMEOUT_LOGIN(不超过本轮剩余的时间预算)
+        :param session: 发送请求的会话，默认使用self.session
+        :return: 服务器返回的JSON
+        """
+        if timeout is None:
+            timeout = get_request_timeout("login")
+        if session is None:
+            session = self.session
+
+        with span("login.post", timeout=timeout) as current_span:
+            try:
+                res = session.post(
+                    self.url + "login",
+                    headers=self.header,
+                    data=data,
+                    verify=False,
+                    timeout=timeout,
+                )
+            except requests.exceptions.Timeout as e:
+                raise OperationTimeoutError("login", timeout) from e
+            current_span.set_attribute("status_code", res.status_code)
+
+        with span("login.decode_json", size=len(res.content)):
+            # login_json = json.loads(res.read().decode('utf-8'))
+            return json.loads(res.text)
+
     def get_all_data(self) -> dict:
         """
         获取当前认证账号全部信息
@@ -143,7 +283,12 @@ class ShmtuNetAuthCore:
 
         urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-        res = requests.get(self.url + "getOnlineUserInfo", headers=self.header, verify=False)
+        res = self.session.get(
+            self.url + "getOnlineUserInfo",
+            headers=self.header,
+            verify=False,
+            timeout=get_request_timeout("logout"),
+        )
         try:
             self.allData = json.loads(res.text)
             logger.info(f"Get All Data: {self.allData}")
@@ -166,7 +311,12 @@ class ShmtuNetAuthCore:
 
         urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-        res = requests.get(self.url + "logout", headers=self.header, verify=False)
+        res = self.session.get(
+            self.url + "logout",
+            headers=self.header,
+            verify=False,
+            timeout=get_request_timeout("logout"),
+        )
         logout_json = json.loads(res.text)
         self.info = logout_json["message"]
         logger.info(f"Logout: {logout_json}")
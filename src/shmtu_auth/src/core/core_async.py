@@ -0,0 +1,408 @@
+import asyncio
+import json
+import time
+from typing import List, Optional, Tuple
+
+from shmtu_auth.src.core import connectivity_probe, core, get_query_string_requests
+from shmtu_auth.src.core.account_health import record_login_result, sort_user_list_by_health
+from shmtu_auth.src.core.connectivity_probe import ProbeResult, get_probe_url_list
+from shmtu_auth.src.core.core import build_login_data, get_default_header
+from shmtu_auth.src.core.get_query_string_requests import parse_query_string
+from shmtu_auth.src.core.query_string import (
+    get_cached_query_string,
+    handle_query_string,
+    invalidate_query_string,
+)
+from shmtu_auth.src.core.shmtu_auth_const_value import ISMU_URL, get_default_query_string
+from shmtu_auth.src.telemetry import metrics
+from shmtu_auth.src.telemetry.event_log import StateChangeEvent, emit_event
+from shmtu_auth.src.utils import http_session
+from shmtu_auth.src.utils.deadline import get_timeout
+from shmtu_auth.src.utils.logs import get_logger
+
+# aiohttp为可选依赖(pip install shmtu-auth[async])
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+logger = get_logger()
+
+
+def is_async_available() -> bool:
+    return aiohttp is not None
+
+
+class AsyncShmtuNetAuth:
+    """
+    基于asyncio的认证引擎，与ShmtuNetAuthCore语义一致
+    所有网络操作均为协程，适合在同一个事件循环中驱动多个任务
+    """
+
+    userIndex: str
+    info: str
+    data: dict
+    url: str
+    header: dict
+    isLogin: bool
+    isLoginTime: float
+    allData: dict
+
+    def __init__(self, session=None):
+        if aiohttp is None:
+            raise RuntimeError("aiohttp is not installed, AsyncShmtuNetAuth is unavailable!")
+
+        self.userIndex = ""
+        self.info = ""
+        self.data = {}
+        self.url: str = core.EPORTAL_INTERFACE_URL
+        self.header: dict = get_default_header()
+        self.isLogin: bool = False
+        # isLogin的检测时间(time.monotonic)，0表示从未检测
+        self.isLoginTime: float = 0.0
+        self.allData: dict = {}
+
+        # 外部传入的会话由调用方负责关闭
+        self._session: Optional[aiohttp.ClientSession] = session
+        self._own_session: bool = session is None
+
+        logger.info("AsyncShmtuNetAuth initialization complete!")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=http_session.pool_connections * http_session.pool_maxsize,
+                limit_per_host=http_session.pool_maxsize,
+                force_close=not http_session.keep_alive,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._own_session = True
+        return self._session
+
+    async def close(self) -> None:
+        """关闭内部创建的会话"""
+        if self._own_session and self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    @staticmethod
+    def _timeout(operation: str):
+        return aiohttp.ClientTimeout(total=get_timeout(operation))
+
+    async def get_text_code(self, url: str) -> Tuple[str, int]:
+        # noinspection PyBroadException
+        try:
+            async with self._get_session().get(url, timeout=self._timeout("query_string")) as response:
+                return await response.text(), response.status
+        except Exception:
+            return "", 0
+
+    async def probe_url(self, url: str, timeout: float) -> int:
+        # noinspection PyBroadException
+        try:
+            async with self._get_session().get(
+                url,
+                timeout=aiohttp.ClientTimeout(total=timeout),
+                allow_redirects=False,
+            ) as response:
+                return response.status
+        except Exception:
+            return 0
+
+    async def probe_connectivity(self, url_list: Optional[List[str]] = None) -> ProbeResult:
+        """
+        同时请求多个204地址，达到quorum个成功后立即返回并取消其余请求
+        :param url_list: 检测地址列表
+        :return: ProbeResult
+        """
+        if url_list is None:
+            url_list = get_probe_url_list()
+        quorum = min(connectivity_probe.probe_quorum, len(url_list))
+
+        result = ProbeResult()
+        if len(url_list) == 0:
+            return result
+
+        start_time = time.monotonic()
+        end_time = start_time + connectivity_probe.probe_deadline
+
+        task_dict = {asyncio.ensure_future(self.probe_url(url, connectivity_probe.probe_timeout)): url for url in url_list}
+        pending = set(task_dict.keys())
+
+        while len(pending) > 0:
+            remaining = end_time - time.monotonic()
+            if remaining <= 0:
+                break
+
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                status_code = task.result()
+                result.url_status[task_dict[task]] = status_code
+                result.finished_count += 1
+                if status_code == 204:
+                    result.success_count += 1
+
+            if result.success_count >= quorum:
+                break
+            if result.success_count + len(pending) < quorum:
+                break
+
+        for task in pending:
+            task.cancel()
+
+        result.is_connected = result.success_count >= quorum
+        result.elapsed = time.monotonic() - start_time
+
+        return result
+
+    async def check_is_connected(self) -> bool:
+        return (await self.probe_connectivity()).is_connected
+
+    async def check_is_connected_retry(
+        self,
+        retry_times: int = 3,
+        wait_time: int = 5,
+    ) -> bool:
+        for _ in range(retry_times):
+            if await self.check_is_connected():
+                return True
+            else:
+                await asyncio.sleep(wait_time)
+        return False
+
+    async def get_query_string_by_url(self, url: str = "") -> str:
+        if len(url) == 0:
+            url = get_query_string_requests.QUERY_STRING_URL
+        if await self.check_is_connected():
+            return ""
+        res_string, res_code = await self.get_text_code(url)
+        if res_code != 200:
+            return ""
+        return parse_query_string(res_string)
+
+    async def get_query_string_with_source(self, use_cache: bool = True) -> Tuple[str, bool]:
+        """
+        获取Query String，优先使用未过期的缓存
+        :param use_cache: 是否优先使用缓存
+        :return: 元组第一项：Query String；第二项：是否来自缓存
+        """
+        if use_cache:
+            cached_str = get_cached_query_string()
+            if len(cached_str) > 0:
+                return cached_str, True
+
+        fetched_str: str = (await self.get_query_string_by_url()).strip()
+
+        try_str = handle_query_string(fetched_str)
+
+        if len(try_str) > 0:
+            return try_str, try_str != fetched_str
+        else:
+            return get_default_query_string().strip(), False
+
+    async def get_query_string(self, use_cache: bool = True) -> str:
+        return (await self.get_query_string_with_source(use_cache))[0]
+
+    async def test_net(self) -> bool:
+        """
+        测试网络是否认证
+        :return: 是否已经认证
+        """
+        self.update_net_status(
+            await self.check_is_connected_retry(
+                retry_times=core.net_check_retry_times,
+                wait_time=core.net_check_retry_wait_time,
+            )
+        )
+        if not self.isLogin:
+            logger.info(f"Network Auth Status: {self.isLogin}")
+        return self.isLogin
+
+    def update_net_status(self, is_login: bool, check_time: Optional[float] = None) -> None:
+        """
+        记录外部得到的联网状态
+        :param is_login: 是否已经认证
+        :param check_time: 检测时间(time.monotonic)，默认为当前时间
+        """
+        if check_time is None:
+            check_time = time.monotonic()
+        if self.isLoginTime == 0 or self.isLogin != is_login:
+            emit_event(StateChangeEvent(is_login, self.isLogin))
+        self.isLogin = is_login
+        self.isLoginTime = check_time
+        metrics.set_online(is_login)
+
+    def is_net_status_fresh(self, fresh_time: Optional[float] = None) -> bool:
+        if fresh_time is None:
+            fresh_time = core.net_status_fresh_time
+        if self.isLoginTime <= 0:
+            return False
+        return time.monotonic() - self.isLoginTime <= fresh_time
+
+    async def test_net_by_ismu(self) -> bool:
+        """
+        测试网络是否认证(通过ismu的认证界面)
+        :return: 是否已经认证
+        """
+        # noinspection PyBroadException
+        try:
+            async with self._get_session().get(ISMU_URL, headers=self.header, ssl=False, timeout=self._timeout("ismu")) as res:
+                self.update_net_status(str(res.url).find("success.jsp") > 0)
+        except Exception:
+            self.update_net_status(False)
+        return self.isLogin
+
+    async def login(
+        self,
+        user,
+        pwd,
+        password_encrypt=False,
+        net_status: Optional[bool] = None,
+        net_status_time: Optional[float] = None,
+    ) -> Tuple[bool, str]:
+        """
+        输入参数登入校园网，自动检测当前网络是否认证。
+        :param user:登入id
+        :param pwd:登入密码
+        :param password_encrypt: 密码是否为密文
+        :param net_status: 调用方刚刚得到的联网状态，为None时使用上次检测的结果
+        :param net_status_time: net_status的检测时间(time.monotonic)
+        :return:元组第一项：是否认证状态；第二项：详细信息
+        """
+        if net_status is not None:
+            self.update_net_status(net_status, net_status_time)
+
+        # 执行登录前再进行一次状态检测(状态仍在有效期内则跳过)
+        if not self.is_net_status_fresh():
+            await self.test_net()
+        if not self.isLogin:
+            if user == "" or pwd == "":
+                return False, "用户名或密码为空"
+            current_query_string, is_from_cache = await self.get_query_string_with_source()
+            current_query_string = current_query_string.strip()
+
+            try:
+                if len(current_query_string) == 0:
+                    logger.exception("Query String is Invalid!")
+                    return False, "Query String is Invalid!"
+
+                logger.debug("Query String: " + current_query_string)
+                logger.info("Get Query String Success!")
+
+                self.data = build_login_data(user, pwd, password_encrypt, current_query_string)
+                login_json = await self.post_login(self.data)
+
+                if login_json["result"] != "success" and is_from_cache:
+                    # 缓存的Query String可能已经失效(如IP变化)，重新获取后再试一次
+                    invalidate_query_string()
+                    fresh_query_string = (await self.get_query_string(use_cache=False)).strip()
+                    if len(fresh_query_string) > 0 and fresh_query_string != current_query_string:
+                        logger.info("Cached Query String was rejected, retry with a fresh one.")
+                        self.data = build_login_data(user, pwd, password_encrypt, fresh_query_string)
+                        login_json = await self.post_login(self.data)
+
+                self.userIndex = login_json["userIndex"]
+                self.info = login_json["message"]
+                logger.info(f"Login: {login_json}")
+                if login_json["result"] == "success":
+                    self.update_net_status(True)
+                    return True, "Login Success"
+                else:
+                    self.update_net_status(False)
+                    return False, self.info
+            except asyncio.TimeoutError as e:
+                logger.error(f"Network Timeout: {e}")
+                return False, "Network Timeout!"
+            except Exception as e:
+                logger.exception(f"Network Error: {e}")
+                return False, "Network Error!"
+
+        logger.info("Already Login!")
+        return True, "Already Login"
+
+    async def login_by_list(self, user_list, sort_by_health: bool = True) -> bool:
+        """
+        按顺序使用列表中的账号登录，直到成功
+        :param user_list: (学号, 密码, 是否加密)列表
+        :param sort_by_health: 是否先按账号健康度调整顺序
+        :return: 是否登录成功
+        """
+        if sort_by_health:
+            user_list = sort_user_list_by_health(user_list)
+
+        for user_id, user_pwd, is_encrypt in user_list:
+            start_time = time.monotonic()
+            status = await self.login(user_id, user_pwd, is_encrypt)
+            record_login_result(user_id, status[0], time.monotonic() - start_time, status[1])
+
+            if status[0]:
+                return True
+
+        return False
+
+    async def check_is_online(self) -> bool:
+        return await self.test_net()
+
+    async def post_login(self, data: dict) -> dict:
+        """
+        发送登录请求
+        :param data: 登录表单
+        :return: 服务器返回的JSON
+        """
+        async with self._get_session().post(
+            self.url + "login",
+            headers=self.header,
+            data=data,
+            ssl=False,
+            timeout=self._timeout("login"),
+        ) as res:
+            res_text = await res.text()
+        return json.loads(res_text)
+
+    async def get_all_data(self) -> dict:
+        """
+        获取当前认证账号全部信息
+        :return:全部数据的字典格式
+        """
+        async with self._get_session().get(
+            self.url + "getOnlineUserInfo", headers=self.header, ssl=False, timeout=self._timeout("logout")
+        ) as res:
+            res_text = await res.text()
+        try:
+            self.allData = json.loads(res_text)
+            logger.info(f"Get All Data: {self.allData}")
+        except json.decoder.JSONDecodeError as e:
+            logger.exception(f"Data Parse Error: {e}")
+        return self.allData
+
+    async def logout(self) -> Tuple[bool, str]:
+        """
+        登出
+        :return:元组第一项：是否操作成功；第二项：详细信息
+        """
+        async with self._get_session().get(
+            self.url + "logout", headers=self.header, ssl=False, timeout=self._timeout("logout")
+        ) as res:
+            res_text = await res.text()
+        logout_json = json.loads(res_text)
+        self.info = logout_json["message"]
+        logger.info(f"Logout: {logout_json}")
+        if logout_json["result"] == "success":
+            return True, "下线成功"
+        else:
+            return False, self.info
+
+
+if __name__ == "__main__":
+
+    async def main():
+        async with AsyncShmtuNetAuth() as net_auth:
+            print(await net_auth.check_is_connected())
+
+    asyncio.run(main())
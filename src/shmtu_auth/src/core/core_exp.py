@@ -1,18 +1,20 @@
 from time import sleep as time_sleep
+from typing import Tuple
 
-from shmtu_auth.src.core.get_query_string_requests import (
-    get_query_string_by_url,
-    is_connect_by_google,
-)
-from shmtu_auth.src.core.query_string import handle_query_string
+from shmtu_auth.src.core.connectivity_probe import is_connected_by_probe
+from shmtu_auth.src.core.get_query_string_requests import get_query_string_by_url
+from shmtu_auth.src.core.query_string import get_cached_query_string, handle_query_string
 from shmtu_auth.src.core.shmtu_auth_const_value import get_default_query_string
+from shmtu_auth.src.telemetry.tracing import traced
+from shmtu_auth.src.utils.deadline import get_remaining_time
 from shmtu_auth.src.utils.logs import get_logger
 
 logger = get_logger()
 
 
+@traced("check_is_connected")
 def check_is_connected() -> bool:
-    return is_connect_by_google()
+    return is_connected_by_probe()
 
 
 def check_is_connected_retry(
@@ -23,6 +25,10 @@ def check_is_connected_retry(
         if check_is_connected():
             return True
         else:
+            # 本轮的时间预算不足以再等待一次时直接返回
+            if get_remaining_time(wait_time) < wait_time:
+                logger.warning("Cycle deadline reached, stop checking internet connection.")
+                return False
             # logger.info("[SHMTU Auth] Checking internet connection failed!")
             # logger.info(f"Waiting for {wait_time} seconds...")
             time_sleep(wait_time)
@@ -30,12 +36,27 @@ def check_is_connected_retry(
     return False
 
 
-def get_query_string() -> str:
-    try_str: str = get_query_string_by_url().strip()
+def get_query_string_with_source(use_cache: bool = True) -> Tuple[str, bool]:
+    """
+    获取Query String，优先使用未过期的缓存
+    :param use_cache: 是否优先使用缓存
+    :return: 元组第一项：Query String；第二项：是否来自缓存
+    """
+    if use_cache:
+        cached_str = get_cached_query_string()
+        if len(cached_str) > 0:
+            logger.debug("Use cached Query String.")
+            return cached_str, True
 
-    try_str = handle_query_string(try_str)
+    fetched_str: str = get_query_string_by_url().strip()
+
+    try_str = handle_query_string(fetched_str)
 
     if len(try_str) > 0:
-        return try_str
+        return try_str, try_str != fetched_str
     else:
-        return get_default_query_string().strip()
+        return get_default_query_string().strip(), False
+
+
+def get_query_string(use_cache: bool = True) -> str:
+    return get_query_string_with_source(use_cache)[0]
@@ -1,38 +1,51 @@
 from typing import Tuple
 
-import requests
+from shmtu_auth.src.core.connectivity_probe import is_connected_by_probe, probe_url
+from shmtu_auth.src.telemetry.tracing import traced
+from shmtu_auth.src.utils.deadline import get_request_timeout
+from shmtu_auth.src.utils.env import get_env_str
+from shmtu_auth.src.utils.http_session import get_session
 
 
 def get_text_code(url: str) -> Tuple[str, int]:
     # noinspection PyBroadException
     try:
-        response = requests.get(url)
+        response = get_session().get(url, timeout=get_request_timeout("query_string"))
         return response.text, response.status_code
     except Exception:
         return "", 0
 
 
+# 联网检测地址(返回204表示已经联网)
+CONNECT_CHECK_URL = "http://www.google.cn/generate_204"
+# 未认证时会被重定向到认证页面的地址
+QUERY_STRING_URL = "http://www.shmtu.edu.cn"
+
+env_query_string_url = get_env_str("SHMTU_AUTH_QUERY_STRING_URL", "")
+if len(env_query_string_url) > 0:
+    QUERY_STRING_URL = env_query_string_url
+
+
 def is_connect_by_google() -> bool:
-    url = "http://www.google.cn/generate_204"
-    res_string, res_code = get_text_code(url)
-    # print("Connect Status Check", url, res_string, res_code)
+    url = CONNECT_CHECK_URL
+    res_code = probe_url(url)
+    # print("Connect Status Check", url, res_code)
     result = res_code == 204
     # print("Connect Status Check", url, result)
     return result
 
 
-def get_query_string_by_url(url: str = "http://www.shmtu.edu.cn") -> str:
-    if is_connect_by_google():
-        return ""
-    res_string, res_code = get_text_code(url)
-    # print(url, res_code)
-    if res_code != 200:
-        return ""
+def parse_query_string(res_string: str) -> str:
+    """
+    从认证跳转页面中解析Query String
+    :param res_string: 跳转页面内容
+    :return: Query String，解析失败返回空字符串
+    """
     list_spilt = res_string.split("'")
     if len(list_spilt) > 1:
         login_page_url = list_spilt[1]
         list_spilt_url = login_page_url.split("?")
-        if len(list_spilt_url) > 1 and list_spilt_url[0].index("index.jsp") > 0:
+        if len(list_spilt_url) > 1 and list_spilt_url[0].find("index.jsp") > 0:
             query_string = list_spilt_url[1]
             query_string = query_string.replace("&", "%26").replace("=", "%3D")
             # github上其他学校的锐捷都是下面这样操作的，不清楚以哪个为准。
@@ -42,9 +55,22 @@ def get_query_string_by_url(url: str = "http://www.shmtu.edu.cn") -> str:
     return ""
 
 
+@traced("get_query_string_by_url")
+def get_query_string_by_url(url: str = "") -> str:
+    if len(url) == 0:
+        url = QUERY_STRING_URL
+    if is_connected_by_probe():
+        return ""
+    res_string, res_code = get_text_code(url)
+    # print(url, res_code)
+    if res_code != 200:
+        return ""
+    return parse_query_string(res_string)
+
+
 def get_query_string_by_baidu(url="http://www.baidu.com"):
     return get_query_string_by_url(url)
 
 
 if __name__ == "__main__":
-    print(get_query_string_by_url("http://www.shmtu.edu.cn"))
+    print(get_query_string_by_url(QUERY_STRING_URL))
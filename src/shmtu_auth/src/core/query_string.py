@@ -1,43 +1,188 @@
+import json
 import os
+import re
+import threading
+import time
 
+from shmtu_auth.src.config.project_directory import get_directory_data_path
+from shmtu_auth.src.telemetry.tracing import traced
+from shmtu_auth.src.utils.env import get_env_int
 from shmtu_auth.src.utils.logs import get_logger
 
 logger = get_logger()
 
-save_path = "./logs/query_string.log"
+save_path = os.path.join(get_directory_data_path(), "query_string.json")
 
+# 旧版本保存的位置(相对于运行目录)，仅用于迁移
+legacy_save_path = "./logs/query_string.log"
 
-def save_query_string(query_string: str) -> bool:
-    dir_path = os.path.dirname(save_path)
-    if not os.path.exists(dir_path):
-        os.mkdir(dir_path)
-
-    try:
-        with open(save_path, "w") as f:
-            f.write(query_string)
-    except Exception as e:
-        logger.error(f"Failed to save query string to {save_path}!")
-        logger.error(f"Error: {e}")
+# Query String缓存有效期，单位：秒
+query_string_ttl = 6 * 60 * 60
+
+env_query_string_ttl = get_env_int("SHMTU_AUTH_QUERY_STRING_TTL", -1)
+if env_query_string_ttl >= 0:
+    query_string_ttl = env_query_string_ttl
+
+# 解析后的Query String形如 wlanuserip%3D...%26wlanacname%3D...
+query_string_pattern = re.compile(r"^[^\s'\"<>]+$")
+
+
+def is_valid_query_string(query_string: str) -> bool:
+    query_string = query_string.strip()
+    if len(query_string) == 0:
+        return False
+    if query_string_pattern.match(query_string) is None:
         return False
-    return True
+    return "%3D" in query_string
+
+
+def write_file_atomic(path: str, content: str) -> None:
+    """先写临时文件再替换，避免写入中途退出导致文件损坏"""
+    dir_path = os.path.dirname(path)
+    if len(dir_path) > 0:
+        os.makedirs(dir_path, exist_ok=True)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class QueryStringCache:
+    """
+    Query String缓存
+    内存中保留一份，每次成功获取后原子地写入数据目录
+    """
+
+    path: str
+    ttl: float
+
+    query_string: str
+    update_time: float
+
+    def __init__(self, path: str = save_path, ttl: float = query_string_ttl):
+        self.path = path
+        self.ttl = ttl
+
+        self.query_string = ""
+        self.update_time = 0.0
+
+        self._lock = threading.Lock()
+        self._is_loaded = False
+
+    def _load(self) -> None:
+        if self._is_loaded:
+            return
+        self._is_loaded = True
+
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    data = json.load(f)
+                query_string = str(data.get("query_string", "")).strip()
+                if is_valid_query_string(query_string):
+                    self.query_string = query_string
+                    self.update_time = float(data.get("update_time", 0))
+            except Exception as e:
+                logger.error(f"Failed to load query string from {self.path}!")
+                logger.error(f"Error: {e}")
+            return
+
+        # 迁移旧版本的纯文本文件(没有时间戳，视为已过期)
+        if os.path.exists(legacy_save_path):
+            try:
+                with open(legacy_save_path) as f:
+                    query_string = f.read().strip()
+                if is_valid_query_string(query_string):
+                    self.query_string = query_string
+                    self.update_time = 0.0
+            except Exception as e:
+                logger.error(f"Failed to load query string from {legacy_save_path}!")
+                logger.error(f"Error: {e}")
+
+    def is_fresh(self) -> bool:
+        with self._lock:
+            self._load()
+            return len(self.query_string) > 0 and time.time() - self.update_time < self.ttl
+
+    def get(self, allow_stale: bool = False) -> str:
+        """
+        获取缓存的Query String
+        :param allow_stale: 是否允许返回已过期的缓存
+        :return: Query String，没有可用缓存时返回空字符串
+        """
+        with self._lock:
+            self._load()
+            if len(self.query_string) == 0:
+                return ""
+            if not allow_stale and time.time() - self.update_time >= self.ttl:
+                return ""
+            return self.query_string
+
+    def update(self, query_string: str) -> bool:
+        """
+        更新缓存并持久化
+        :param query_string: 新获取的Query String
+        :return: 是否通过校验并保存成功
+        """
+        query_string = query_string.strip()
+        if not is_valid_query_string(query_string):
+            logger.warning("Query String format is invalid, ignored.")
+            return False
+
+        with self._lock:
+            self._is_loaded = True
+            self.query_string = query_string
+            self.update_time = time.time()
+
+            data = {
+                "version": 1,
+                "query_string": self.query_string,
+                "update_time": self.update_time,
+            }
+
+            try:
+                write_file_atomic(self.path, json.dumps(data, ensure_ascii=False))
+            except Exception as e:
+                logger.error(f"Failed to save query string to {self.path}!")
+                logger.error(f"Error: {e}")
+                return False
+        return True
+
+    def invalidate(self) -> None:
+        """使缓存过期(例如认证服务器拒绝了缓存的Query String)，保留内容作为兜底"""
+        with self._lock:
+            self._load()
+            self.update_time = 0.0
+
+
+query_string_cache = QueryStringCache()
+
+
+def save_query_string(query_string: str) -> bool:
+    return query_string_cache.update(query_string)
 
 
 def load_query_string_from_file() -> str:
-    if not os.path.exists(save_path):
-        return ""
-    try:
-        with open(save_path) as f:
-            query_string = f.read().strip()
-    except Exception as e:
-        logger.error(f"Failed to load query string from {save_path}!")
-        logger.error(f"Error: {e}")
-        return ""
-    return query_string
+    return query_string_cache.get(allow_stale=True)
+
+
+def get_cached_query_string() -> str:
+    """获取未过期的缓存，没有时返回空字符串"""
+    return query_string_cache.get()
+
+
+def invalidate_query_string() -> None:
+    query_string_cache.invalidate()
 
 
+@traced("handle_query_string")
 def handle_query_string(query_string: str) -> str:
     query_string = query_string.strip()
     if len(query_string) > 0:
+        save_query_string(query_string)
         return query_string
 
     query_string = load_query_string_from_file()
@@ -1,28 +1,293 @@
-from shmtu_auth.src.core.core import ShmtuNetAuthCore
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import List, Optional
+
+from requests.cookies import RequestsCookieJar
+
+from shmtu_auth.src.core.account_health import record_login_result, sort_user_list_by_health
+from shmtu_auth.src.core.core import ShmtuNetAuthCore, build_login_data
+from shmtu_auth.src.core.core_exp import get_query_string_with_source
+from shmtu_auth.src.core.query_string import invalidate_query_string
+from shmtu_auth.src.utils.deadline import (
+    DeadlineExceededError,
+    OperationTimeoutError,
+    get_current_deadline,
+    get_request_timeout,
+)
+from shmtu_auth.src.utils.env import get_env_float, get_env_int
+from shmtu_auth.src.utils.http_session import create_isolated_session
 from shmtu_auth.src.utils.logs import get_logger
 from shmtu_auth.src.utils.program_env_config import convert_number_to_star
 
 logger = get_logger()
 
+# 同时尝试登录的账号数量，小于等于1时按顺序逐个尝试
+login_race_count = 1
+# 第一个账号登录成功后，等待排序更靠前的账号返回结果的时间，单位：秒
+login_race_grace_time = 0.5
+
+env_login_race_count = get_env_int("SHMTU_AUTH_LOGIN_RACE_COUNT", -1)
+if env_login_race_count > 0:
+    login_race_count = env_login_race_count
+
+env_login_race_grace_time = get_env_float("SHMTU_AUTH_LOGIN_RACE_GRACE_TIME", -1)
+if env_login_race_grace_time >= 0:
+    login_race_grace_time = env_login_race_grace_time
+
+
+class LoginAttempt:
+    """单个账号的一次登录尝试"""
+
+    user_id: str
+    order: int
+    is_success: bool
+    message: str
+    latency: float
+    # 本次登录得到的Cookie
+    cookies: Optional[RequestsCookieJar]
+
+    def __init__(self, user_id: str, order: int):
+        self.user_id = user_id
+        # 在账号列表中的位置，越小越优先
+        self.order = order
+        self.is_success = False
+        self.message = ""
+        self.latency = 0.0
+        self.cookies = None
+
+    def __repr__(self):
+        return (
+            f"LoginAttempt(user={convert_number_to_star(self.user_id)}, "
+            f"success={self.is_success}, latency={self.latency:.3f}s, message={self.message!r})"
+        )
+
 
 class ShmtuNetAuth(ShmtuNetAuthCore):
+    # 最近一次login_by_list中每个账号的结果
+    last_login_attempts: List[LoginAttempt]
+
     def __init__(self):
         super().__init__()
 
-    def login_by_list(self, user_list) -> bool:
-        for user_3 in user_list:
+        self.last_login_attempts = []
+
+    def login_once(
+        self,
+        user_id: str,
+        user_pwd: str,
+        is_encrypt: bool,
+        query_string: str,
+        order: int = 0,
+        timeout: Optional[float] = None,
+    ) -> LoginAttempt:
+        """
+        直接发送一次登录请求，不检测联网状态，也不修改对象状态(可以并发调用)
+        :param timeout: 超时时间，在其他线程中调用时应由调用方根据预算计算
+        :return: LoginAttempt
+        """
+        attempt = LoginAttempt(user_id, order)
+
+        # 每个账号使用独立的Cookie，共用连接池
+        session = create_isolated_session()
+        attempt.cookies = session.cookies
+
+        start_time = time.monotonic()
+        try:
+            login_json = self.post_login(build_login_data(user_id, user_pwd, is_encrypt, query_string), timeout, session)
+            attempt.is_success = login_json["result"] == "success"
+            attempt.message = login_json.get("message", "")
+        except (OperationTimeoutError, DeadlineExceededError) as e:
+            logger.error(f"Network Timeout: {e}")
+            attempt.message = "Network Timeout!"
+        except json.decoder.JSONDecodeError as e:
+            logger.error(f"Login response parse error: {e}")
+            attempt.message = "Response Parse Error!"
+        except Exception as e:
+            logger.error(f"Network Error: {e}")
+            attempt.message = "Network Error!"
+        attempt.latency = time.monotonic() - start_time
+
+        return attempt
+
+    def login_race(self, user_list, race_count: int = login_race_count) -> Optional[LoginAttempt]:
+        """
+        每次同时向race_count个账号发起登录，取第一个成功的结果
+        第一个成功的结果返回后，再等待排序更靠前的账号SHMTU_AUTH_LOGIN_RACE_GRACE_TIME秒，
+        之后返回的结果只记录，不再参与选择
+        已经发出的请求无法取消，返回前会等待全部请求结束并记录结果；
+        有多个账号成功时，门户绑定的是最后完成的账号，因此会用采用的账号重新登录一次
+        (重新登录失败时无法保证门户绑定的是采用的账号)
+        :param user_list: (学号, 密码, 是否加密)列表
+        :param race_count: 同时尝试的账号数量
+        :return: 采用的成功结果，全部失败返回None
+        """
+        query_string, is_from_cache = get_query_string_with_source()
+        query_string = query_string.strip()
+        if len(query_string) == 0:
+            logger.error("Query String is Invalid!")
+            return None
+
+        candidate_list = [(i, user_3) for i, user_3 in enumerate(user_list) if user_3[0] != "" and user_3[1] != ""]
+        is_all_tried = True
+
+        executor = ThreadPoolExecutor(max_workers=max(race_count, 1), thread_name_prefix="login-race")
+        try:
+            for batch_start in range(0, len(candidate_list), race_count):
+                batch = candidate_list[batch_start : batch_start + race_count]
+
+                # 工作线程中没有本轮的预算，在这里计算好超时时间
+                try:
+                    login_timeout = get_request_timeout("login")
+                except DeadlineExceededError as e:
+                    logger.warning(f"{e}")
+                    is_all_tried = False
+                    break
+
+                future_order_dict = {
+                    executor.submit(
+                        self.login_once, user_3[0], user_3[1], user_3[2], query_string, order, login_timeout
+                    ): order
+                    for order, user_3 in batch
+                }
+                pending = set(future_order_dict.keys())
+                success_list: List[LoginAttempt] = []
+                grace_end_time: Optional[float] = None
+
+                while len(pending) > 0:
+                    timeout = None
+                    if grace_end_time is not None:
+                        timeout = grace_end_time - time.monotonic()
+                        if timeout <= 0:
+                            break
+
+                    done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        attempt = future.result()
+                        self.last_login_attempts.append(attempt)
+                        if attempt.is_success:
+                            success_list.append(attempt)
+
+                    if len(success_list) > 0:
+                        best_order = min(attempt.order for attempt in success_list)
+                        # 排在更前面的账号都已经返回，不必再等
+                        if all(future_order_dict[future] > best_order for future in pending):
+                            break
+                        if grace_end_time is None:
+                            grace_end_time = time.monotonic() + login_race_grace_time
+
+                if len(success_list) == 0:
+                    continue
+
+                best_attempt = min(success_list, key=lambda item: item.order)
+
+                # 剩余的请求已经发出，等待结束(每个请求都有超时时间)并记录结果
+                late_success_count = 0
+                for future in pending:
+                    if future.cancel():
+                        continue
+                    attempt = future.result()
+                    self.last_login_attempts.append(attempt)
+                    if attempt.is_success:
+                        late_success_count += 1
+
+                if len(success_list) + late_success_count > 1:
+                    user_3 = user_list[best_attempt.order]
+                    self.reassert_login(best_attempt, user_3[1], user_3[2], query_string)
+
+                return best_attempt
+        finally:
+            executor.shutdown(wait=False)
+
+        if is_from_cache and is_all_tried:
+            # 缓存的Query String可能已经失效，下次重新获取
+            invalidate_query_string()
+
+        return None
+
+    def reassert_login(self, attempt: LoginAttempt, user_pwd: str, is_encrypt: bool, query_string: str) -> bool:
+        """
+        多个账号同时登录成功后，用采用的账号重新登录，使门户绑定到该账号
+        :param attempt: 采用的结果，成功时更新其Cookie
+        :return: 是否重新登录成功
+        """
+        logger.info(f"Several accounts logged in, reassert {convert_number_to_star(attempt.user_id)}.")
+
+        try:
+            login_timeout = get_request_timeout("login")
+        except DeadlineExceededError as e:
+            logger.warning(f"{e}")
+            return False
+
+        reassert_attempt = self.login_once(attempt.user_id, user_pwd, is_encrypt, query_string, attempt.order, login_timeout)
+        if not reassert_attempt.is_success:
+            logger.warning(f"Reassert login failed, the portal may be bound to another account: {reassert_attempt.message}")
+            return False
+
+        attempt.cookies = reassert_attempt.cookies
+        return True
+
+    def login_by_list(self, user_list, race_count: Optional[int] = None, sort_by_health: bool = True) -> bool:
+        """
+        按顺序使用列表中的账号登录，直到成功
+        :param user_list: (学号, 密码, 是否加密)列表
+        :param race_count: 同时尝试的账号数量，默认使用SHMTU_AUTH_LOGIN_RACE_COUNT
+        :param sort_by_health: 是否先按账号健康度调整顺序
+        :return: 是否登录成功
+        """
+        if race_count is None:
+            race_count = login_race_count
+
+        if sort_by_health:
+            user_list = sort_user_list_by_health(user_list)
+
+        self.last_login_attempts = []
+
+        if race_count > 1:
+            if not self.is_net_status_fresh():
+                self.test_net()
+            if self.isLogin:
+                return True
+
+            best_attempt = self.login_race(user_list, race_count)
+
+            for attempt in self.last_login_attempts:
+                record_login_result(attempt.user_id, attempt.is_success, attempt.latency, attempt.message)
+
+            if best_attempt is None:
+                self.update_net_status(False)
+                return False
+
+            # 后续的登出、获取在线信息使用采用账号的Cookie
+            self.session.cookies.clear()
+            if best_attempt.cookies is not None:
+                self.session.cookies.update(best_attempt.cookies)
+
+            self.info = best_attempt.message
+            self.update_net_status(True)
+            return True
+
+        for i, user_3 in enumerate(user_list):
+            deadline = get_current_deadline()
+            if deadline is not None and deadline.is_expired():
+                logger.warning("Cycle deadline reached, remaining accounts will be tried next time.")
+                break
+
             user_id = user_3[0]
             user_pwd = user_3[1]
             is_encrypt = user_3[2]
 
+            attempt = LoginAttempt(user_id, i)
+            start_time = time.monotonic()
             status = self.login(user_id, user_pwd, is_encrypt)
+            attempt.latency = time.monotonic() - start_time
+            attempt.is_success = status[0]
+            attempt.message = status[1]
+            self.last_login_attempts.append(attempt)
+            record_login_result(user_id, attempt.is_success, attempt.latency, attempt.message)
 
             if status[0]:
                 return True
-            else:
-                encrypt_id = convert_number_to_star(user_id)
-                logger.exception(f"Login failed:{encrypt_id}")
-                logger.exception(f"{status[1]}")
 
         return False
 
@@ -1,3 +1,16 @@
+from shmtu_auth.src.utils.env import get_env_str
+
+# 锐捷eportal认证接口
+EPORTAL_INTERFACE_URL = "https://ismu.shmtu.edu.cn:8443/eportal/InterFace.do?method="
+# iSMU认证页面
+ISMU_URL = "http://ismu.shmtu.edu.cn/"
+
+# 可指向本地模拟服务器(见simulator/eportal.py)
+env_eportal_url = get_env_str("SHMTU_AUTH_EPORTAL_URL", "")
+if len(env_eportal_url) > 0:
+    EPORTAL_INTERFACE_URL = env_eportal_url
+
+
 class ServiceType:
     EDU = "%E6%A0%A1%E5%9B%AD%E7%BD%91"
     China_Mobile = ""
@@ -0,0 +1,82 @@
+"""
+测试账号健康度与登录排序
+
+运行示例:
+    python -m pytest src/shmtu_auth/src/core/test_account_health.py -v
+"""
+
+import datetime
+import os
+
+from shmtu_auth.src.core.account_health import AccountHealth, AccountHealthStore, quarantine_failures
+
+
+def get_user_id(user_3):
+    return user_3[0]
+
+
+class TestAccountHealth:
+    """账号健康度测试类"""
+
+    def test_keep_order_without_history(self, tmp_path):
+        """没有记录时保持原顺序"""
+        store = AccountHealthStore(os.path.join(tmp_path, "health.json"))
+        user_list = [("1", "a", False), ("2", "b", False), ("3", "c", False)]
+        assert store.sort(user_list, get_user_id) == user_list
+
+    def test_fast_account_first(self, tmp_path):
+        """成功且耗时短的账号排在前面"""
+        store = AccountHealthStore(os.path.join(tmp_path, "health.json"))
+        store.record("1", True, 2.0)
+        store.record("2", True, 0.1)
+        store.record("3", False, 0.1, "密码错误")
+
+        sorted_list = store.sort([("1",), ("2",), ("3",)], get_user_id)
+        assert [user_3[0] for user_3 in sorted_list] == ["2", "1", "3"]
+
+    def test_quarantine(self, tmp_path):
+        """连续失败的账号排在最后，成功后恢复"""
+        store = AccountHealthStore(os.path.join(tmp_path, "health.json"))
+        for _ in range(quarantine_failures):
+            store.record("1", False, 0.1, "账号已欠费")
+
+        health = store.get("1")
+        assert health.is_quarantined()
+        assert health.last_failure_message == "账号已欠费"
+        assert [user_3[0] for user_3 in store.sort([("1",), ("2",)], get_user_id)] == ["2", "1"]
+
+        store.record("1", True, 0.1)
+        assert not store.get("1").is_quarantined()
+
+    def test_network_error_ignored(self, tmp_path):
+        """网络错误不计入账号健康度"""
+        store = AccountHealthStore(os.path.join(tmp_path, "health.json"))
+        for _ in range(quarantine_failures):
+            store.record("1", False, 5.0, "Network Error!")
+
+        health = store.get("1")
+        assert health.failure_count == 0
+        assert not health.is_quarantined()
+
+    def test_expire_soon(self):
+        """即将过期的账号分数降低"""
+        health = AccountHealth("1")
+        score = health.score()
+
+        tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+        health.expire_date_int = tomorrow.year * 10**4 + tomorrow.month * 10**2 + tomorrow.day
+        assert health.days_to_expire() == 1
+        assert health.score() < score
+
+    def test_persistence(self, tmp_path):
+        """重新加载后记录依然存在"""
+        path = os.path.join(tmp_path, "health.json")
+        store = AccountHealthStore(path)
+        store.record("1", True, 0.5)
+        store.record("1", False, 0.3, "认证失败")
+
+        health = AccountHealthStore(path).get("1")
+        assert health.success_count == 1
+        assert health.failure_count == 1
+        assert health.latency_list == [0.5, 0.3]
+        assert health.median_latency == 0.4
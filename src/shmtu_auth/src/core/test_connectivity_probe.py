@@ -0,0 +1,86 @@
+"""
+测试并发联网检测(本地HTTP服务，无需访问外网)
+
+运行示例:
+    python -m pytest src/shmtu_auth/src/core/test_connectivity_probe.py -v
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from shmtu_auth.src.core.connectivity_probe import probe_connectivity
+
+
+class ProbeHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/slow"):
+            time.sleep(2)
+
+        if self.path.endswith("/generate_204"):
+            self.send_response(204)
+            self.end_headers()
+        else:
+            # 模拟认证页面的跳转
+            self.send_response(302)
+            self.send_header("Location", "http://127.0.0.1/eportal/index.jsp")
+            self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def base_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ProbeHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+class TestConnectivityProbe:
+    """并发联网检测测试类"""
+
+    def test_first_success_wins(self, base_url):
+        """慢地址不影响结果返回"""
+        result = probe_connectivity(
+            [f"{base_url}/slow/generate_204", f"{base_url}/generate_204"],
+            quorum=1,
+            timeout=5,
+            deadline=5,
+        )
+        assert result.is_connected
+        assert result.elapsed < 1.5
+
+    def test_captive_portal(self, base_url):
+        """被重定向视为未联网"""
+        result = probe_connectivity([f"{base_url}/portal", f"{base_url}/portal2"], quorum=1, timeout=1, deadline=2)
+        assert not result.is_connected
+        assert result.finished_count == 2
+
+    def test_deadline(self, base_url):
+        """整体超时后立即返回"""
+        result = probe_connectivity([f"{base_url}/slow/generate_204"], quorum=1, timeout=5, deadline=0.3)
+        assert not result.is_connected
+        assert result.elapsed < 1
+
+    def test_unreachable(self):
+        """地址不可达"""
+        result = probe_connectivity(["http://127.0.0.1:1/generate_204"], quorum=1, timeout=1, deadline=2)
+        assert not result.is_connected
+
+    def test_quorum(self, base_url):
+        """需要多个地址同时成功"""
+        result = probe_connectivity(
+            [f"{base_url}/generate_204", f"{base_url}/portal"],
+            quorum=2,
+            timeout=1,
+            deadline=2,
+        )
+        assert not result.is_connected
+        assert result.success_count <= 1
@@ -0,0 +1,92 @@
+"""
+测试认证核心的联网状态有效期与Query String失效重试
+
+运行示例:
+    python -m pytest src/shmtu_auth/src/core/test_core.py -v
+"""
+
+import time
+
+import pytest
+
+from shmtu_auth.src.core import core, query_string
+from shmtu_auth.src.core.core import ShmtuNetAuthCore
+from shmtu_auth.src.simulator.eportal import QUERY_STRING_FAIL_MESSAGE
+
+
+@pytest.fixture
+def create_core_net_auth(create_net_auth):
+    """返回创建ShmtuNetAuthCore的函数，记录test_net的调用次数(结果固定为未认证)"""
+
+    def create() -> ShmtuNetAuthCore:
+        net_auth = create_net_auth(ShmtuNetAuthCore)
+        net_auth.test_net_count = 0
+
+        def test_net() -> bool:
+            net_auth.test_net_count += 1
+            net_auth.update_net_status(False)
+            return False
+
+        net_auth.test_net = test_net
+        return net_auth
+
+    return create
+
+
+class TestNetStatusFresh:
+    def test_fresh_skip_test_net(self, create_core_net_auth, simulator_user):
+        """有效期内的联网状态直接使用，不再检测"""
+        user_id, password = simulator_user
+        net_auth = create_core_net_auth()
+        net_auth.update_net_status(False)
+
+        assert net_auth.login(user_id, password) == (True, "Login Success")
+        assert net_auth.test_net_count == 0
+
+    def test_caller_status_skip_test_net(self, create_core_net_auth, simulator_user):
+        """调用方传入刚得到的联网状态时不再检测"""
+        user_id, password = simulator_user
+        net_auth = create_core_net_auth()
+
+        assert net_auth.login(user_id, password, net_status=False, net_status_time=time.monotonic())[0]
+        assert net_auth.test_net_count == 0
+
+    def test_stale_call_test_net(self, monkeypatch, create_core_net_auth, simulator_user):
+        """超过有效期或从未检测时重新检测"""
+        user_id, password = simulator_user
+        net_auth = create_core_net_auth()
+        assert not net_auth.is_net_status_fresh()
+        assert net_auth.login(user_id, password)[0]
+        assert net_auth.test_net_count == 1
+
+        monkeypatch.setattr(core, "net_status_fresh_time", 10)
+        net_auth.update_net_status(False, time.monotonic() - 20)
+        assert not net_auth.is_net_status_fresh()
+        assert net_auth.login(user_id, password)[0]
+        assert net_auth.test_net_count == 2
+
+
+class TestQueryStringRetry:
+    def test_cached_rejected(self, simulator, create_core_net_auth, simulator_user):
+        """缓存的Query String被拒绝时，重新获取并重试一次"""
+        user_id, password = simulator_user
+        net_auth = create_core_net_auth()
+        old_query_string = simulator.query_string
+        query_string.save_query_string(old_query_string)
+
+        # IP变化后缓存失效
+        simulator.change_address("10.1.2.4")
+        assert simulator.query_string != old_query_string
+
+        assert net_auth.login(user_id, password, net_status=False) == (True, "Login Success")
+        assert simulator.request_count["login"] == 2
+        assert query_string.get_cached_query_string() == simulator.query_string
+
+    def test_fetched_rejected(self, simulator, monkeypatch, create_core_net_auth, simulator_user):
+        """刚获取的Query String被拒绝时不再重试"""
+        user_id, password = simulator_user
+        net_auth = create_core_net_auth()
+        monkeypatch.setattr(core, "get_query_string_with_source", lambda: ("invalid", False))
+
+        assert net_auth.login(user_id, password, net_status=False) == (False, QUERY_STRING_FAIL_MESSAGE)
+        assert simulator.request_count["login"] == 1
@@ -0,0 +1,99 @@
+"""
+测试基于asyncio的认证引擎(与阻塞引擎在模拟服务器上的结果一致)
+
+运行示例:
+    python -m pytest src/shmtu_auth/src/core/test_core_async.py -v
+"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from shmtu_auth.src.core.connectivity_probe import probe_connectivity  # noqa: E402
+from shmtu_auth.src.core.core_async import AsyncShmtuNetAuth  # noqa: E402
+from shmtu_auth.src.core.get_query_string_requests import get_query_string_by_url  # noqa: E402
+from shmtu_auth.src.simulator.eportal import EportalSimulator  # noqa: E402
+from shmtu_auth.src.telemetry import metrics  # noqa: E402
+
+
+def run_async(simulator: EportalSimulator, operation):
+    """创建指向模拟服务器的AsyncShmtuNetAuth并执行operation(net_auth)"""
+
+    async def main():
+        async with AsyncShmtuNetAuth() as net_auth:
+            net_auth.url = simulator.interface_url
+            return await operation(net_auth)
+
+    return asyncio.run(main())
+
+
+class TestAsyncShmtuNetAuth:
+    def test_probe(self, simulator):
+        """联网检测结果一致"""
+        for is_online in [False, True]:
+            simulator.set_online(is_online)
+            async_result = run_async(simulator, lambda net_auth: net_auth.probe_connectivity([simulator.probe_url]))
+            assert async_result.is_connected == probe_connectivity([simulator.probe_url]).is_connected == is_online
+
+    def test_query_string(self, simulator):
+        """从跳转页面解析得到相同的Query String"""
+        async_query_string = run_async(simulator, lambda net_auth: net_auth.get_query_string_by_url())
+        assert async_query_string == get_query_string_by_url() == simulator.query_string
+
+    def test_login_failed(self, simulator, create_net_auth, simulator_user):
+        """密码错误时返回相同的结果"""
+        user_id, _ = simulator_user
+        sync_result = create_net_auth().login(user_id, "wrong", net_status=False)
+        async_result = run_async(simulator, lambda net_auth: net_auth.login(user_id, "wrong", net_status=False))
+        assert not sync_result[0]
+        assert async_result == sync_result
+
+    def test_login_info_logout(self, simulator, create_net_auth, simulator_user):
+        """登录、获取在线信息、登出的返回值与阻塞引擎一致"""
+        user_id, password = simulator_user
+
+        def run_sync():
+            net_auth = create_net_auth()
+            return net_auth.login(user_id, password, net_status=False), net_auth.get_all_data(), net_auth.logout()
+
+        async def run(net_auth: AsyncShmtuNetAuth):
+            return (
+                await net_auth.login(user_id, password, net_status=False),
+                await net_auth.get_all_data(),
+                await net_auth.logout(),
+            )
+
+        sync_result = run_sync()
+        assert not simulator.is_online()
+        async_result = run_async(simulator, run)
+        assert not simulator.is_online()
+
+        assert sync_result[0] == (True, "Login Success")
+        assert sync_result[1]["userId"] == user_id
+        assert sync_result[2][0]
+        assert async_result == sync_result
+
+    def test_login_by_list(self, simulator, simulator_user):
+        """错误的账号失败后使用下一个账号"""
+        user_id, password = simulator_user
+        user_list = [("202412300002", "wrong", False), (user_id, password, False)]
+
+        async def run(net_auth: AsyncShmtuNetAuth):
+            net_auth.update_net_status(False)
+            return await net_auth.login_by_list(user_list, sort_by_health=False)
+
+        assert run_async(simulator, run)
+        assert simulator.online_user_id == user_id
+
+    def test_update_net_status(self, simulator):
+        """联网状态同步到指标，与阻塞引擎一致"""
+
+        async def run(net_auth: AsyncShmtuNetAuth):
+            net_auth.update_net_status(True)
+            is_online_1 = metrics.online_state.get()
+            net_auth.update_net_status(False)
+            return is_online_1, metrics.online_state.get()
+
+        assert run_async(simulator, run) == (1, 0)
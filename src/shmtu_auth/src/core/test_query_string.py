@@ -0,0 +1,79 @@
+"""
+测试Query String的解析与缓存
+
+运行示例:
+    python -m pytest src/shmtu_auth/src/core/test_query_string.py -v
+"""
+
+import json
+import os
+
+from shmtu_auth.src.core.get_query_string_requests import parse_query_string
+from shmtu_auth.src.core.query_string import QueryStringCache, is_valid_query_string
+
+redirect_page = (
+    "<script>top.self.location.href='http://172.16.0.1/eportal/index.jsp?"
+    "wlanuserip=10.1.2.3&wlanacname=ac&nasip=172.16.0.2&mac=001122334455'</script>\n"
+)
+
+parsed_query_string = "wlanuserip%3D10.1.2.3%26wlanacname%3Dac%26nasip%3D172.16.0.2%26mac%3D001122334455"
+
+
+class TestQueryString:
+    """Query String测试类"""
+
+    def test_parse(self):
+        """解析跳转页面"""
+        assert parse_query_string(redirect_page) == parsed_query_string
+
+    def test_parse_invalid_page(self):
+        """非跳转页面"""
+        assert parse_query_string("<html>Welcome</html>") == ""
+        assert parse_query_string("<a href='http://www.shmtu.edu.cn/news?id=1'>") == ""
+
+    def test_validate(self):
+        """格式校验"""
+        assert is_valid_query_string(parsed_query_string)
+        assert not is_valid_query_string("")
+        assert not is_valid_query_string("<html>")
+        assert not is_valid_query_string("wlanuserip 10.1.2.3")
+
+
+class TestQueryStringCache:
+    """Query String缓存测试类"""
+
+    def test_update_and_reload(self, tmp_path):
+        """保存后可以被新实例读取"""
+        path = str(tmp_path / "query_string.json")
+
+        cache = QueryStringCache(path=path, ttl=60)
+        assert cache.get() == ""
+        assert cache.update(parsed_query_string)
+        assert cache.get() == parsed_query_string
+
+        with open(path, encoding="utf-8") as f:
+            assert json.load(f)["query_string"] == parsed_query_string
+        # 没有残留的临时文件
+        assert os.listdir(str(tmp_path)) == ["query_string.json"]
+
+        reloaded_cache = QueryStringCache(path=path, ttl=60)
+        assert reloaded_cache.get() == parsed_query_string
+
+    def test_reject_invalid(self, tmp_path):
+        """不保存格式错误的内容"""
+        cache = QueryStringCache(path=str(tmp_path / "query_string.json"), ttl=60)
+        assert not cache.update("<html>")
+        assert cache.get(allow_stale=True) == ""
+
+    def test_ttl_and_invalidate(self, tmp_path):
+        """过期或失效后只能以兜底方式读取"""
+        cache = QueryStringCache(path=str(tmp_path / "query_string.json"), ttl=0)
+        cache.update(parsed_query_string)
+        assert cache.get() == ""
+        assert cache.get(allow_stale=True) == parsed_query_string
+
+        cache = QueryStringCache(path=str(tmp_path / "query_string.json"), ttl=60)
+        assert cache.is_fresh()
+        cache.invalidate()
+        assert not cache.is_fresh()
+        assert cache.get(allow_stale=True) == parsed_query_string
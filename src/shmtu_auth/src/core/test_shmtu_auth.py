@@ -0,0 +1,130 @@
+"""
+测试并发登录(login_race)
+
+运行示例:
+    python -m pytest src/shmtu_auth/src/core/test_shmtu_auth.py -v
+"""
+
+import os
+import threading
+import time
+
+import pytest
+
+from shmtu_auth.src.core import account_health, shmtu_auth
+from shmtu_auth.src.core.shmtu_auth import LoginAttempt, ShmtuNetAuth
+from shmtu_auth.src.utils.deadline import cycle_deadline
+
+
+class FakeLogin:
+    """
+    代替login_once，按学号返回预设的(延迟, 是否成功)
+    记录每个学号的调用次数
+    """
+
+    def __init__(self, result_dict):
+        self.result_dict = result_dict
+        self.call_dict = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, user_id, user_pwd, is_encrypt, query_string, order=0, timeout=None) -> LoginAttempt:
+        with self.lock:
+            self.call_dict[user_id] = self.call_dict.get(user_id, 0) + 1
+            is_first_call = self.call_dict[user_id] == 1
+
+        delay, is_success = self.result_dict[user_id]
+        if is_first_call:
+            time.sleep(delay)
+
+        attempt = LoginAttempt(user_id, order)
+        attempt.is_success = is_success
+        attempt.message = "" if is_success else "fail"
+        attempt.latency = delay
+        return attempt
+
+
+@pytest.fixture
+def race(tmp_path, monkeypatch):
+    """返回创建ShmtuNetAuth的函数，Query String固定来自缓存，记录缓存被清除的次数"""
+    invalidate_list = []
+    monkeypatch.setattr(shmtu_auth, "get_query_string_with_source", lambda: ("query_string", True))
+    monkeypatch.setattr(shmtu_auth, "invalidate_query_string", lambda: invalidate_list.append(True))
+    monkeypatch.setattr(
+        account_health,
+        "account_health_store",
+        account_health.AccountHealthStore(os.path.join(tmp_path, "account_health.json")),
+    )
+
+    def create(result_dict):
+        net_auth = ShmtuNetAuth()
+        net_auth.login_once = FakeLogin(result_dict)
+        net_auth.invalidate_list = invalidate_list
+        return net_auth
+
+    return create
+
+
+def get_user_list(count: int):
+    return [(str(i), "password", False) for i in range(count)]
+
+
+class TestLoginRace:
+    def test_first_success(self, race):
+        """只有一个账号成功时直接采用，不重新登录"""
+        net_auth = race({"0": (0, False), "1": (0.05, True)})
+
+        best_attempt = net_auth.login_race(get_user_list(2), race_count=2)
+        assert best_attempt.user_id == "1"
+        assert net_auth.login_once.call_dict == {"0": 1, "1": 1}
+        assert len(net_auth.last_login_attempts) == 2
+
+    def test_prefer_lower_order(self, race, monkeypatch):
+        """多个账号成功时采用排在前面的账号，并重新登录一次使门户绑定到该账号"""
+        monkeypatch.setattr(shmtu_auth, "login_race_grace_time", 2)
+        net_auth = race({"0": (0.2, True), "1": (0, True)})
+
+        best_attempt = net_auth.login_race(get_user_list(2), race_count=2)
+        assert best_attempt.user_id == "0"
+        assert net_auth.login_once.call_dict == {"0": 2, "1": 1}
+        assert sorted(attempt.user_id for attempt in net_auth.last_login_attempts) == ["0", "1"]
+
+    def test_grace_time(self, race, monkeypatch):
+        """宽限时间后返回的结果只记录，不参与选择；返回前等待全部请求结束"""
+        monkeypatch.setattr(shmtu_auth, "login_race_grace_time", 0.05)
+        net_auth = race({"0": (0.3, True), "1": (0, True)})
+
+        start_time = time.monotonic()
+        best_attempt = net_auth.login_race(get_user_list(2), race_count=2)
+        assert time.monotonic() - start_time >= 0.3
+
+        assert best_attempt.user_id == "1"
+        assert [attempt.user_id for attempt in net_auth.last_login_attempts] == ["1", "0"]
+        assert net_auth.last_login_attempts[1].is_success
+        # 较晚成功的账号可能覆盖了门户的绑定
+        assert net_auth.login_once.call_dict == {"0": 1, "1": 2}
+
+    def test_all_failed(self, race):
+        """全部失败时清除缓存的Query String"""
+        net_auth = race({"0": (0, False), "1": (0, False), "2": (0, False)})
+
+        assert net_auth.login_race(get_user_list(3), race_count=2) is None
+        assert len(net_auth.last_login_attempts) == 3
+        assert net_auth.invalidate_list == [True]
+
+    def test_deadline(self, race):
+        """本轮预算用完后不再尝试后面的账号，也不清除缓存"""
+        net_auth = race({"0": (0.2, False), "1": (0.2, False), "2": (0, True)})
+
+        with cycle_deadline(0.1):
+            assert net_auth.login_race(get_user_list(3), race_count=2) is None
+        assert "2" not in net_auth.login_once.call_dict
+        assert net_auth.invalidate_list == []
+
+    def test_login_by_list(self, race):
+        """login_by_list记录每个账号的结果并更新状态"""
+        net_auth = race({"0": (0, False), "1": (0, True)})
+        net_auth.update_net_status(False)
+
+        assert net_auth.login_by_list(get_user_list(2), race_count=2, sort_by_health=False)
+        assert net_auth.isLogin
+        assert account_health.account_health_store.get("0").failure_count == 1
@@ -0,0 +1,236 @@
+"""
+账号列表的持久化存储(SQLite)
+
+图形界面与后台认证共用，按学号、过期时间建立索引
+保存时只写入发生变化的行，并在同一个事务中完成
+首次启动时导入旧版本的user_list.pickle
+"""
+
+import datetime
+import os
+import pickle
+import sqlite3
+import threading
+from typing import List, Optional, Tuple
+
+from shmtu_auth.src.config.project_directory import get_directory_data_path
+from shmtu_auth.src.datatype.shmtu.auth.auth_user import UserItem
+from shmtu_auth.src.utils.env import get_env_str
+from shmtu_auth.src.utils.logs import get_logger
+
+logger = get_logger()
+
+db_path = os.path.join(get_directory_data_path(), "accounts.db")
+# 旧版本使用的pickle文件，首次启动时导入
+pickle_user_list_path = os.path.join(get_directory_data_path(), "user_list.pickle")
+
+env_db_path = get_env_str("SHMTU_AUTH_ACCOUNT_DB", "")
+if len(env_db_path) > 0:
+    db_path = env_db_path
+
+# 数据库结构的版本(PRAGMA user_version)
+schema_version = 1
+
+# (位置, 学号, 姓名, 密码, 是否加密, 是否启用, 支持类型, 过期时间)
+AccountRow = Tuple[int, str, str, str, int, int, str, str]
+
+
+def user_item_to_row(position: int, user: UserItem) -> AccountRow:
+    return (
+        position,
+        user.user_id,
+        user.user_name,
+        user.password,
+        int(user.is_encrypted),
+        int(user.in_use),
+        ",".join(str(support_type) for support_type in user.support_type_list),
+        user.expire_date.isoformat(),
+    )
+
+
+def row_to_user_item(row: AccountRow) -> UserItem:
+    support_type_list = [int(support_type) for support_type in row[6].split(",") if len(support_type) > 0]
+
+    user = UserItem(
+        user_id=row[1],
+        user_name=row[2],
+        password=row[3],
+        support_type_list=support_type_list,
+        expire_date=datetime.date.fromisoformat(row[7]),
+    )
+    user.is_encrypted = bool(row[4])
+    user.in_use = bool(row[5])
+    return user
+
+
+class AccountStore:
+    path: str
+    pickle_path: str
+
+    def __init__(self, path: str = db_path, pickle_path: str = pickle_user_list_path):
+        self.path = path
+        self.pickle_path = pickle_path
+
+        self._lock = threading.RLock()
+        self._connection: Optional[sqlite3.Connection] = None
+        # 与数据库中内容一致的行，用于计算需要写入的差异
+        self._saved_row_list: Optional[List[AccountRow]] = None
+
+    def exists(self) -> bool:
+        """是否已经保存过账号(数据库或旧版本的pickle文件)"""
+        return os.path.exists(self.path) or (len(self.pickle_path) > 0 and os.path.exists(self.pickle_path))
+
+    def _get_connection(self) -> sqlite3.Connection:
+        if self._connection is not None:
+            return self._connection
+
+        directory = os.path.dirname(self.path)
+        if len(directory) > 0:
+            os.makedirs(directory, exist_ok=True)
+
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        self._connection = connection
+
+        self._upgrade_schema()
+        self._migrate_pickle()
+
+        return connection
+
+    def _upgrade_schema(self) -> None:
+        """按PRAGMA user_version逐级升级数据库结构"""
+        connection = self._connection
+        version = connection.execute("PRAGMA user_version").fetchone()[0]
+        if version > schema_version:
+            logger.warning(f"Account store {self.path} has newer schema version {version}")
+            return
+
+        with connection:
+            if version < 1:
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS account ("
+                    "position INTEGER PRIMARY KEY, "
+                    "user_id TEXT NOT NULL, "
+                    "user_name TEXT NOT NULL, "
+                    "password TEXT NOT NULL, "
+                    "is_encrypted INTEGER NOT NULL, "
+                    "in_use INTEGER NOT NULL, "
+                    "support_type TEXT NOT NULL, "
+                    "expire_date TEXT NOT NULL)"
+                )
+                connection.execute("CREATE INDEX IF NOT EXISTS idx_account_user_id ON account (user_id)")
+                connection.execute("CREATE INDEX IF NOT EXISTS idx_account_expire_date ON account (expire_date)")
+
+            # PRAGMA不支持参数
+            connection.execute(f"PRAGMA user_version = {schema_version}")
+
+    def _migrate_pickle(self) -> None:
+        """导入旧版本的user_list.pickle，完成后重命名为user_list.pickle.bak"""
+        if len(self.pickle_path) == 0 or not os.path.exists(self.pickle_path):
+            return
+
+        if self._connection.execute("SELECT COUNT(*) FROM account").fetchone()[0] > 0:
+            logger.warning(f"Account store is not empty, skip migrating {self.pickle_path}")
+            return
+
+        try:
+            with open(self.pickle_path, "rb") as f:
+                user_list = pickle.load(f)
+        except Exception as e:
+            logger.error(f"Failed to read old user list file {self.pickle_path}: {e}")
+            return
+
+        self._write(user_list or [])
+
+        os.replace(self.pickle_path, self.pickle_path + ".bak")
+        logger.info(f"Migrated {len(user_list or [])} users from {self.pickle_path}")
+
+    def _load_rows(self) -> List[AccountRow]:
+        return self._get_connection().execute("SELECT * FROM account ORDER BY position").fetchall()
+
+    def _write(self, user_list: List[UserItem]) -> int:
+        """
+        在一个事务中写入与上次保存不同的行
+        :return: 写入(插入、修改、删除)的行数
+        """
+        connection = self._connection
+        if self._saved_row_list is None:
+            self._saved_row_list = connection.execute("SELECT * FROM account ORDER BY position").fetchall()
+
+        saved_row_list = self._saved_row_list
+        row_list = [user_item_to_row(i, user) for i, user in enumerate(user_list)]
+
+        changed_row_list = [row for row in row_list if row[0] >= len(saved_row_list) or saved_row_list[row[0]] != row]
+        removed_count = max(len(saved_row_list) - len(row_list), 0)
+
+        if len(changed_row_list) == 0 and removed_count == 0:
+            return 0
+
+        with connection:
+            connection.executemany("INSERT OR REPLACE INTO account VALUES (?, ?, ?, ?, ?, ?, ?, ?)", changed_row_list)
+            if removed_count > 0:
+                connection.execute("DELETE FROM account WHERE position >= ?", (len(row_list),))
+
+        self._saved_row_list = row_list
+        return len(changed_row_list) + removed_count
+
+    def load(self) -> List[UserItem]:
+        """按保存时的顺序读取全部账号"""
+        with self._lock:
+            row_list = self._load_rows()
+            self._saved_row_list = row_list
+            return [row_to_user_item(row) for row in row_list]
+
+    def save(self, user_list: List[UserItem]) -> int:
+        """
+        保存账号列表，只写入发生变化的行
+        :param user_list: 完整的账号列表
+        :return: 写入的行数
+        """
+        with self._lock:
+            self._get_connection()
+            try:
+                return self._write(user_list)
+            except sqlite3.Error as e:
+                # 事务已回滚，下次保存时重新与数据库比较
+                self._saved_row_list = None
+                logger.error(f"Failed to save user list: {e}")
+                return 0
+
+    def find_by_user_id(self, user_id: str) -> Optional[UserItem]:
+        with self._lock:
+            row = (
+                self._get_connection()
+                .execute("SELECT * FROM account WHERE user_id = ? ORDER BY position LIMIT 1", (user_id,))
+                .fetchone()
+            )
+        if row is None:
+            return None
+        return row_to_user_item(row)
+
+    def list_expire_before(self, date: datetime.date) -> List[UserItem]:
+        """过期时间早于date的账号，按过期时间排列"""
+        with self._lock:
+            row_list = (
+                self._get_connection()
+                .execute("SELECT * FROM account WHERE expire_date < ? ORDER BY expire_date", (date.isoformat(),))
+                .fetchall()
+            )
+        return [row_to_user_item(row) for row in row_list]
+
+    def get_login_list(self) -> List[Tuple[str, str, bool]]:
+        """
+        后台认证使用的账号
+        :return: 有效账号的(学号, 密码, 是否加密)列表
+        """
+        return [(user.user_id, user.password, user.is_encrypted) for user in self.load() if user.is_valid()]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+            self._saved_row_list = None
+
+
+account_store = AccountStore()
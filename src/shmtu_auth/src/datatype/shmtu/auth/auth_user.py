@@ -1,5 +1,5 @@
 import datetime
-from typing import List, Optional
+from typing import List, Optional, Set, Tuple
 
 program_support_list = ["校园网", "iSMU"]
 
@@ -68,22 +68,30 @@ class NetworkType:
 
 
 class UserItem:
-    in_use: bool = True
+    """
+    账号信息
+    过期时间、支持类型的派生字段在第一次访问时生成，修改原字段后自动失效
+    """
+
+    __slots__ = (
+        "in_use",
+        "user_name",
+        "user_id",
+        "password",
+        "is_encrypted",
+        "_support_type_list",
+        "_expire_date",
+        "_support_type_cache",
+        "_expire_date_cache",
+    )
+
+    in_use: bool
 
     user_name: str
 
     user_id: str
     password: str
-    is_encrypted: bool = False
-
-    support_type_list: List[int]
-    support_type_binary: int
-    support_type_str_list: List[str]
-    support_type_str: str
-
-    expire_date: datetime.date
-    expire_date_int: int
-    expire_date_str: str
+    is_encrypted: bool
 
     def __init__(
         self,
@@ -96,21 +104,22 @@ class UserItem:
         if expire_date is None:
             expire_date = datetime.date.today() + datetime.timedelta(days=3 * 365)
 
+        self.in_use = True
+
         self.user_id = user_id
         self.user_name = user_name
         self.password = password
+        self.is_encrypted = False
 
+        if support_type_list is None:
+            support_type_list = [NetworkType.ChinaEdu]
         self.support_type_list = support_type_list
-        if self.support_type_list is None:
-            self.support_type_list = [NetworkType.ChinaEdu]
 
         self.expire_date = expire_date
 
-        self.update_auto_generate_info()
-
     def __copy__(self):
-        # 创建一个新的实例，并复制所有属性
-        new_instance = self.__class__()
+        # 直接复制所有属性，已生成的派生字段一并复制
+        new_instance = self.__class__.__new__(self.__class__)
 
         new_instance.in_use = self.in_use
 
@@ -120,24 +129,108 @@ class UserItem:
         new_instance.password = self.password
         new_instance.is_encrypted = self.is_encrypted
 
-        new_instance.support_type_list = self.support_type_list.copy()
-
-        new_instance.expire_date = self.expire_date
+        new_instance._support_type_list = self._support_type_list.copy()
+        new_instance._support_type_cache = self._support_type_cache
 
-        new_instance.update_auto_generate_info()
+        new_instance._expire_date = self._expire_date
+        new_instance._expire_date_cache = self._expire_date_cache
 
         return new_instance
 
     def copy(self):
         return self.__copy__()
 
-    def update_auto_generate_info(self) -> None:
-        self.expire_date_str = self.expire_date.strftime("%Y-%m-%d")
-        self.expire_date_int = self.expire_date.year * (10**4) + self.expire_date.month * (10**2) + self.expire_date.day
+    def __getstate__(self) -> dict:
+        return {
+            "in_use": self.in_use,
+            "user_name": self.user_name,
+            "user_id": self.user_id,
+            "password": self.password,
+            "is_encrypted": self.is_encrypted,
+            "support_type_list": self._support_type_list,
+            "expire_date": self._expire_date,
+        }
+
+    def __setstate__(self, state) -> None:
+        """
+        兼容旧版本(没有__slots__)保存的对象，旧版本的派生字段会被忽略
+        """
+        if isinstance(state, tuple):
+            # (__dict__, __slots__的值)
+            state = {**(state[0] or {}), **(state[1] or {})}
+
+        self.in_use = state.get("in_use", True)
+        self.user_name = state.get("user_name", "")
+        self.user_id = state.get("user_id", "")
+        self.password = state.get("password", "")
+        self.is_encrypted = state.get("is_encrypted", False)
+        self.support_type_list = list(state.get("support_type_list") or [NetworkType.ChinaEdu])
+        self.expire_date = state.get("expire_date") or datetime.date.today()
+
+    @property
+    def support_type_list(self) -> List[int]:
+        return self._support_type_list
+
+    @support_type_list.setter
+    def support_type_list(self, value: List[int]) -> None:
+        self._support_type_list = value
+        self._support_type_cache = None
+
+    @property
+    def expire_date(self) -> datetime.date:
+        return self._expire_date
+
+    @expire_date.setter
+    def expire_date(self, value: datetime.date) -> None:
+        self._expire_date = value
+        self._expire_date_cache = None
+
+    def _get_support_type_cache(self) -> Tuple[int, List[str], str]:
+        if self._support_type_cache is None:
+            support_type_str_list = NetworkType.to_string(self._support_type_list)
+            self._support_type_cache = (
+                NetworkType.to_binary_by_binary_list(self._support_type_list),
+                support_type_str_list,
+                " ".join(support_type_str_list).strip(),
+            )
+        return self._support_type_cache
+
+    def _get_expire_date_cache(self) -> Tuple[str, int]:
+        if self._expire_date_cache is None:
+            expire_date = self._expire_date
+            self._expire_date_cache = (
+                expire_date.strftime("%Y-%m-%d"),
+                expire_date.year * (10**4) + expire_date.month * (10**2) + expire_date.day,
+            )
+        return self._expire_date_cache
+
+    @property
+    def support_type_binary(self) -> int:
+        return self._get_support_type_cache()[0]
+
+    @property
+    def support_type_str_list(self) -> List[str]:
+        return self._get_support_type_cache()[1]
+
+    @property
+    def support_type_str(self) -> str:
+        return self._get_support_type_cache()[2]
+
+    @property
+    def expire_date_str(self) -> str:
+        return self._get_expire_date_cache()[0]
+
+    @property
+    def expire_date_int(self) -> int:
+        return self._get_expire_date_cache()[1]
 
-        self.support_type_binary = NetworkType.to_binary_by_binary_list(self.support_type_list)
-        self.support_type_str_list = NetworkType.to_string(self.support_type_list)
-        self.support_type_str = " ".join(self.support_type_str_list).strip()
+    def update_auto_generate_info(self) -> None:
+        """
+        直接修改support_type_list中的元素后调用，重新生成派生字段
+        (为support_type_list、expire_date赋值时会自动更新)
+        """
+        self._support_type_cache = None
+        self._expire_date_cache = None
 
     def to_list(self) -> List[str]:
         return [
@@ -149,26 +242,49 @@ class UserItem:
             str(self.is_valid()),
         ]
 
+    def to_display_list(self) -> List[str]:
+        """
+        表格中显示的内容(密码用星号代替)，不会修改对象
+        """
+        return [
+            self.user_id,
+            self.user_name,
+            "*" * len(self.password),
+            self.support_type_str,
+            self.expire_date_str,
+            str(self.check_valid()),
+        ]
+
     def __iter__(self):
         return iter(self.to_list())
 
     # 比较运算符
+    # 相等只取决于学号；学号会被原地修改，所以不可哈希，去重时使用学号的集合(get_user_id_set)
     def __eq__(self, other) -> bool:
+        if not isinstance(other, UserItem):
+            return NotImplemented
         return self.user_id == other.user_id
 
-    def __ne__(self, other) -> bool:
-        return self.user_id != other.user_id
+    __hash__ = None
 
     def __lt__(self, other) -> bool:
+        if not isinstance(other, UserItem):
+            return NotImplemented
         return self.expire_date_int < other.expire_date_int
 
     def __gt__(self, other) -> bool:
+        if not isinstance(other, UserItem):
+            return NotImplemented
         return self.expire_date_int > other.expire_date_int
 
     def __le__(self, other) -> bool:
+        if not isinstance(other, UserItem):
+            return NotImplemented
         return self.expire_date_int <= other.expire_date_int
 
     def __ge__(self, other) -> bool:
+        if not isinstance(other, UserItem):
+            return NotImplemented
         return self.expire_date_int >= other.expire_date_int
 
     # 检测是否有效
@@ -177,11 +293,17 @@ class UserItem:
         self.user_name = self.user_name.strip()
         self.password = self.password.strip()
 
+        return self.check_valid()
+
+    def check_valid(self) -> bool:
+        """检测是否有效，不去除首尾空格(用于显示)"""
+        user_id = self.user_id.strip()
+
         valid = self.in_use
 
-        valid = valid and (self.user_id != "" and self.password != "")
+        valid = valid and (user_id != "" and self.password.strip() != "")
 
-        valid = valid and (self.user_id.isdigit() and len(self.user_id) == 12)
+        valid = valid and (user_id.isdigit() and len(user_id) == 12)
 
         valid = valid and (len(self.support_type_list) > 0)
 
@@ -189,24 +311,28 @@ class UserItem:
 
 
 def get_valid_user_list(original_user_list: List[UserItem]) -> List[UserItem]:
-    valid_user_list = []
-
-    for user in original_user_list:
-        if user.is_valid():
-            valid_user_list.append(user)
-
-    return valid_user_list
+    return [user for user in original_user_list if user.is_valid()]
 
 
 def user_is_exist_in_list(user_list: List[UserItem], user_id: str, excluded_indexes: List[int]) -> bool:
+    excluded_index_set = set(excluded_indexes)
     for i, user in enumerate(user_list):
-        if i not in excluded_indexes and user.user_id == user_id:
+        if user.user_id == user_id and i not in excluded_index_set:
             return True
     return False
 
 
+def get_user_id_set(user_list: List[UserItem]) -> Set[str]:
+    """
+    全部学号的集合，需要多次判断学号是否存在时使用
+    """
+    return {user.user_id for user in user_list}
+
+
 def generate_test_user_list(count: int = 10) -> List[UserItem]:
     user_list: List[UserItem] = []
+    # 按学号去重
+    user_id_set: Set[str] = set()
 
     for i in range(count // 4):
         user = UserItem(
@@ -217,7 +343,8 @@ def generate_test_user_list(count: int = 10) -> List[UserItem]:
             expire_date=datetime.date.today(),
         )
 
-        if user not in user_list:
+        if user.user_id not in user_id_set:
+            user_id_set.add(user.user_id)
             user_list.append(user)
 
     for i in range(count // 2):
@@ -229,7 +356,8 @@ def generate_test_user_list(count: int = 10) -> List[UserItem]:
             expire_date=datetime.date.today(),
         )
 
-        if user not in user_list:
+        if user.user_id not in user_id_set:
+            user_id_set.add(user.user_id)
             user_list.append(user)
 
     for i in range(count):
@@ -241,7 +369,8 @@ def generate_test_user_list(count: int = 10) -> List[UserItem]:
             expire_date=datetime.date.today(),
         )
 
-        if user not in user_list:
+        if user.user_id not in user_id_set:
+            user_id_set.add(user.user_id)
             user_list.append(user)
 
     return user_list
@@ -252,18 +381,11 @@ def convert_to_list_list(user_list: List[UserItem]) -> List[List[str]]:
 
 
 def print_user_list_id(user_list: List[UserItem]) -> None:
-    result_str = ""
-    for user in user_list:
-        result_str += f"{user.user_id} "
-
-    print(result_str)
+    print("".join(f"{user.user_id} " for user in user_list))
 
 
 def user_list_select_list_by_index(user_list: List[UserItem], index: List[int]) -> List[UserItem]:
-    result_list = []
-    for i in index:
-        result_list.append(user_list[i])
-    return result_list
+    return [user_list[i] for i in index]
 
 
 def user_list_swap_item(user_list: List[UserItem], index1: int, index2: int) -> None:
@@ -333,6 +455,19 @@ def user_list_move_down(user_list: List[UserItem], index: List[int], step: int =
     return final_selection_index
 
 
+def get_moved_row_range(original_index: List[int], final_index: List[int]) -> Tuple[int, int]:
+    """
+    移动后内容发生变化的行的范围
+    :param original_index: 移动前选中的行
+    :param final_index: 移动后选中的行
+    :return: (第一行, 最后一行)，没有移动时为(0, -1)
+    """
+    index_list = list(original_index) + list(final_index)
+    if len(index_list) == 0 or sorted(original_index) == sorted(final_index):
+        return 0, -1
+    return min(index_list), max(index_list)
+
+
 def user_list_move_to_top(user_list: List[UserItem], index: List[int]) -> List[int]:
     selected_items_count = len(index)
 
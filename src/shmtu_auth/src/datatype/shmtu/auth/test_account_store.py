@@ -0,0 +1,97 @@
+"""
+测试账号数据库
+
+运行示例:
+    python -m pytest src/shmtu_auth/src/datatype/shmtu/auth/test_account_store.py -v
+"""
+
+import datetime
+import os
+import pickle
+import sqlite3
+
+import pytest
+
+from shmtu_auth.src.datatype.shmtu.auth.account_store import AccountStore, schema_version
+from shmtu_auth.src.datatype.shmtu.auth.auth_user import NetworkType, UserItem, generate_test_user_list
+
+
+@pytest.fixture
+def store(tmp_path):
+    account_store = AccountStore(os.path.join(tmp_path, "accounts.db"), pickle_path="")
+    yield account_store
+    account_store.close()
+
+
+class TestAccountStore:
+    def test_round_trip(self, store):
+        """保存后读取的内容与顺序一致"""
+        user = UserItem(
+            user_id="202412300001",
+            user_name="User",
+            password="password",
+            support_type_list=[NetworkType.iSMU, NetworkType.ChinaEdu],
+            expire_date=datetime.date(2030, 1, 2),
+        )
+        user.is_encrypted = True
+        user.in_use = False
+        user_list = [user] + generate_test_user_list(8)
+
+        store.save(user_list)
+        loaded_list = store.load()
+
+        assert [item.user_id for item in loaded_list] == [item.user_id for item in user_list]
+        assert loaded_list[0].support_type_list == [NetworkType.iSMU, NetworkType.ChinaEdu]
+        assert loaded_list[0].expire_date == datetime.date(2030, 1, 2)
+        assert loaded_list[0].is_encrypted
+        assert not loaded_list[0].in_use
+
+    def test_incremental_save(self, store):
+        """只写入发生变化的行"""
+        user_list = generate_test_user_list(8)
+        assert store.save(user_list) == len(user_list)
+        assert store.save(user_list) == 0
+
+        user_list[2].user_name = "Changed"
+        assert store.save(user_list) == 1
+
+        user_list.pop()
+        assert store.save(user_list) == 1
+        assert len(store.load()) == len(user_list)
+        assert store.load()[2].user_name == "Changed"
+
+    def test_lookup(self, store):
+        """按学号、过期时间查询"""
+        user_list = [
+            UserItem(user_id="202412300001", password="a", expire_date=datetime.date(2025, 1, 1)),
+            UserItem(user_id="202412300002", password="b", expire_date=datetime.date(2035, 1, 1)),
+            UserItem(user_id="", password="", expire_date=datetime.date(2030, 1, 1)),
+        ]
+        store.save(user_list)
+
+        assert store.find_by_user_id("202412300002").password == "b"
+        assert store.find_by_user_id("202412300003") is None
+        assert [user.user_id for user in store.list_expire_before(datetime.date(2026, 1, 1))] == ["202412300001"]
+        assert store.get_login_list() == [("202412300001", "a", False), ("202412300002", "b", False)]
+
+    def test_schema_version(self, store):
+        """新建的数据库记录结构版本"""
+        store.load()
+        connection = sqlite3.connect(store.path)
+        assert connection.execute("PRAGMA user_version").fetchone()[0] == schema_version
+        connection.close()
+
+    def test_migrate_pickle(self, tmp_path):
+        """导入旧版本的pickle文件"""
+        pickle_path = os.path.join(tmp_path, "user_list.pickle")
+        user_list = generate_test_user_list(4)
+        with open(pickle_path, "wb") as f:
+            pickle.dump(user_list, f)
+
+        account_store = AccountStore(os.path.join(tmp_path, "accounts.db"), pickle_path=pickle_path)
+        assert account_store.exists()
+        assert [user.user_id for user in account_store.load()] == [user.user_id for user in user_list]
+        account_store.close()
+
+        assert not os.path.exists(pickle_path)
+        assert os.path.exists(pickle_path + ".bak")
@@ -0,0 +1,163 @@
+"""
+测试账号数据类型及列表操作
+
+运行示例:
+    python -m pytest src/shmtu_auth/src/datatype/shmtu/auth/test_auth_user.py -v
+"""
+
+import copyreg
+import datetime
+import pickle
+
+import pytest
+
+from shmtu_auth.src.datatype.shmtu.auth.auth_user import (
+    NetworkType,
+    UserItem,
+    generate_test_user_list,
+    get_moved_row_range,
+    get_user_id_set,
+    user_list_move_down,
+    user_list_move_to_top,
+    user_list_move_up,
+)
+
+
+def _make_user_list(count: int):
+    return [UserItem(user_id=f"2024123{i:05d}", password=f"password_{i}") for i in range(count)]
+
+
+class TestUserItem:
+    def test_check_valid_does_not_modify(self):
+        """check_valid不应去除首尾空格"""
+        user = UserItem(user_id=" 202412300001 ", password=" password ")
+        assert user.check_valid()
+        assert user.user_id == " 202412300001 "
+        assert user.password == " password "
+
+        assert user.is_valid()
+        assert user.user_id == "202412300001"
+
+    def test_display_list_masks_password(self):
+        """表格中不显示明文密码"""
+        user = UserItem(user_id="202412300001", password="secret")
+        display_list = user.to_display_list()
+        assert display_list[2] == "******"
+        assert "secret" not in display_list
+        assert display_list[-1] == "True"
+
+
+class TestMovedRowRange:
+    def test_move_up(self):
+        """上移时范围覆盖被交换的行"""
+        user_list = _make_user_list(6)
+        original_index = [2, 4]
+        final_index = user_list_move_up(user_list, original_index, step=1)
+        assert get_moved_row_range(original_index, final_index) == (1, 4)
+
+    def test_move_to_top(self):
+        """移动到顶部"""
+        user_list = _make_user_list(6)
+        original_index = [3, 5]
+        final_index = user_list_move_to_top(user_list, original_index)
+        assert final_index == [0, 1]
+        assert get_moved_row_range(original_index, final_index) == (0, 5)
+
+    def test_not_moved(self):
+        """已经在底部时没有需要刷新的行"""
+        user_list = _make_user_list(4)
+        original_index = [2, 3]
+        final_index = user_list_move_down(user_list, original_index, step=1)
+        assert get_moved_row_range(original_index, final_index) == (0, -1)
+        assert get_moved_row_range([], []) == (0, -1)
+
+
+class OldUserItemPickle:
+    """模拟旧版本(没有__slots__)的UserItem被pickle时的内容"""
+
+    def __init__(self, state: dict):
+        self.state = state
+
+    def __reduce__(self):
+        return copyreg._reconstructor, (UserItem, object, None), self.state
+
+
+class TestUserItemSlots:
+    def test_lazy_fields_follow_changes(self):
+        """修改原字段后派生字段随之更新"""
+        user = UserItem(user_id="202412300001", password="p", expire_date=datetime.date(2030, 1, 2))
+        assert user.expire_date_int == 20300102
+        assert user.support_type_str == "校园网"
+
+        user.expire_date = datetime.date(2031, 3, 4)
+        user.support_type_list = [NetworkType.ChinaEdu, NetworkType.iSMU]
+        assert user.expire_date_str == "2031-03-04"
+        assert user.support_type_binary == NetworkType.ChinaEdu | NetworkType.iSMU
+        assert user.support_type_str == "校园网 iSMU"
+
+        user.support_type_list.pop()
+        user.update_auto_generate_info()
+        assert user.support_type_str_list == ["校园网"]
+
+    def test_no_dict(self):
+        """使用__slots__，没有__dict__"""
+        assert not hasattr(UserItem(), "__dict__")
+
+    def test_eq_and_unhashable(self):
+        """按学号判断相等；学号可以原地修改，所以不可哈希，去重使用学号的集合"""
+        user_1 = UserItem(user_id="202412300001")
+        user_2 = UserItem(user_id="202412300001", password="other")
+        assert user_1 == user_2
+        assert user_1 != "202412300001"
+
+        with pytest.raises(TypeError):
+            hash(user_1)
+
+        user_2.user_id = "202412300002"
+        assert get_user_id_set([user_1, user_2]) == {"202412300001", "202412300002"}
+
+    def test_generate_test_user_list(self):
+        """生成的测试账号按学号去重"""
+        user_list = generate_test_user_list(8)
+        assert [user.user_id for user in user_list] == [f"2024123{i:05d}" for i in range(8)]
+
+    def test_copy(self):
+        """复制后修改不影响原对象"""
+        user = UserItem(user_id="202412300001", password="p")
+        user.is_encrypted = True
+        new_user = user.copy()
+        new_user.support_type_list.append(NetworkType.iSMU)
+        new_user.update_auto_generate_info()
+        assert new_user.is_encrypted
+        assert user.support_type_list == [NetworkType.ChinaEdu]
+        assert user.support_type_str == "校园网"
+
+    def test_pickle(self):
+        """pickle前后内容一致"""
+        user = UserItem(user_id="202412300001", user_name="User", password="p")
+        user.in_use = False
+        new_user = pickle.loads(pickle.dumps(user))
+        assert new_user.to_list() == user.to_list()
+        assert not new_user.in_use
+
+    def test_unpickle_old_version(self):
+        """读取旧版本保存的对象(in_use使用类属性的默认值，未保存)"""
+        state = {
+            "user_id": "202412300001",
+            "user_name": "User",
+            "password": "p",
+            "support_type_list": [NetworkType.iSMU],
+            "expire_date": datetime.date(2030, 1, 2),
+            "expire_date_str": "2030-01-02",
+            "expire_date_int": 20300102,
+            "support_type_binary": NetworkType.iSMU,
+            "support_type_str_list": ["iSMU"],
+            "support_type_str": "iSMU",
+        }
+        user = pickle.loads(pickle.dumps(OldUserItemPickle(state)))
+        assert isinstance(user, UserItem)
+        assert user.in_use
+        assert not user.is_encrypted
+        assert user.support_type_str == "iSMU"
+        assert user.expire_date_int == 20300102
+        assert user.is_valid()
@@ -0,0 +1,301 @@
+"""
+GUI日志表格的持久化存储(SQLite)
+
+新的记录先放入内存，延迟一段时间后批量写入，每条记录只写入一次
+超过保留条数的旧记录会被删除，启动时只需读取最近的一页
+"""
+
+import atexit
+import os
+import pickle
+import sqlite3
+import threading
+from typing import Iterator, List, Optional, Tuple
+
+from shmtu_auth.src.config.project_directory import get_directory_data_path
+from shmtu_auth.src.utils.env import get_env_float, get_env_int
+from shmtu_auth.src.utils.logs import get_logger
+
+logger = get_logger()
+
+db_path = os.path.join(get_directory_data_path(), "logs.db")
+# 旧版本使用的pickle文件，首次启动时导入
+pickle_log_path = os.path.join(get_directory_data_path(), "logs.pickle")
+
+# 最多保留的日志条数
+log_retention_count = 10000
+# 新记录延迟写入的时间，单位：秒
+log_flush_delay = 2.0
+# 未写入的记录达到该数量时立即写入
+log_flush_batch_size = 100
+
+env_log_retention_count = get_env_int("SHMTU_AUTH_GUI_LOG_RETENTION", -1)
+if env_log_retention_count > 0:
+    log_retention_count = env_log_retention_count
+
+env_log_flush_delay = get_env_float("SHMTU_AUTH_GUI_LOG_FLUSH_DELAY", -1)
+if env_log_flush_delay >= 0:
+    log_flush_delay = env_log_flush_delay
+
+# (id, 时间, 事件, 状态)
+LogRecord = Tuple[int, str, str, str]
+
+
+class LogFilter:
+    """
+    日志筛选条件，为空的条件不生效
+    时间格式为 YYYY-MM-DD HH:MM:SS ，可以直接按字符串比较
+    """
+
+    event: str
+    keyword: str
+    start_time: str
+    end_time: str
+
+    def __init__(self, event: str = "", keyword: str = "", start_time: str = "", end_time: str = ""):
+        # 事件完全一致
+        self.event = event
+        # 事件或状态中包含的文字
+        self.keyword = keyword.strip()
+        # 时间范围(包含两端)
+        self.start_time = start_time
+        self.end_time = end_time
+
+    def is_empty(self) -> bool:
+        return len(self.event) == 0 and len(self.keyword) == 0 and len(self.start_time) == 0 and len(self.end_time) == 0
+
+    def to_sql(self) -> Tuple[str, list]:
+        """
+        :return: (WHERE子句中的条件, 参数)，没有条件时为("1", [])
+        """
+        condition_list = []
+        param_list = []
+        if len(self.event) > 0:
+            condition_list.append("event = ?")
+            param_list.append(self.event)
+        if len(self.keyword) > 0:
+            # instr不需要转义%和_
+            condition_list.append("(instr(event, ?) > 0 OR instr(status, ?) > 0)")
+            param_list.extend([self.keyword, self.keyword])
+        if len(self.start_time) > 0:
+            condition_list.append("time >= ?")
+            param_list.append(self.start_time)
+        if len(self.end_time) > 0:
+            condition_list.append("time <= ?")
+            param_list.append(self.end_time)
+
+        if len(condition_list) == 0:
+            return "1", []
+        return " AND ".join(condition_list), param_list
+
+    def matches(self, time: str, event: str, status: str) -> bool:
+        """判断一条新记录是否符合条件(与to_sql一致)"""
+        if len(self.event) > 0 and event != self.event:
+            return False
+        if len(self.keyword) > 0 and self.keyword not in event and self.keyword not in status:
+            return False
+        if len(self.start_time) > 0 and time < self.start_time:
+            return False
+        if len(self.end_time) > 0 and time > self.end_time:
+            return False
+        return True
+
+
+class LogStore:
+    path: str
+    retention_count: int
+    flush_delay: float
+
+    def __init__(
+        self,
+        path: str = db_path,
+        retention_count: int = log_retention_count,
+        flush_delay: float = log_flush_delay,
+        pickle_path: str = pickle_log_path,
+    ):
+        self.path = path
+        self.retention_count = retention_count
+        self.flush_delay = flush_delay
+        self.pickle_path = pickle_path
+
+        self._lock = threading.RLock()
+        self._connection: Optional[sqlite3.Connection] = None
+        # 尚未写入的(时间, 事件, 状态)
+        self._pending_list: List[Tuple[str, str, str]] = []
+        self._flush_timer: Optional[threading.Timer] = None
+
+    def _get_connection(self) -> sqlite3.Connection:
+        if self._connection is not None:
+            return self._connection
+
+        directory = os.path.dirname(self.path)
+        if len(directory) > 0:
+            os.makedirs(directory, exist_ok=True)
+
+        # GUI线程写入，延迟写入在定时器线程中执行，由self._lock保证串行
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS log ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "time TEXT NOT NULL, "
+            "event TEXT NOT NULL, "
+            "status TEXT NOT NULL)"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS idx_log_event ON log (event, id)")
+        connection.execute("CREATE INDEX IF NOT EXISTS idx_log_time ON log (time)")
+        connection.commit()
+        self._connection = connection
+
+        self._migrate_pickle()
+
+        return connection
+
+    def _migrate_pickle(self) -> None:
+        """导入旧版本的logs.pickle，完成后重命名为logs.pickle.bak"""
+        if len(self.pickle_path) == 0 or not os.path.exists(self.pickle_path):
+            return
+
+        try:
+            with open(self.pickle_path, "rb") as f:
+                record_list = pickle.load(f)
+        except Exception as e:
+            logger.error(f"Failed to read old log file {self.pickle_path}: {e}")
+            return
+
+        row_list = [(str(record[0]), str(record[1]), str(record[2])) for record in (record_list or []) if len(record) >= 3]
+        with self._connection:
+            self._connection.executemany("INSERT INTO log (time, event, status) VALUES (?, ?, ?)", row_list)
+        self._apply_retention()
+
+        os.replace(self.pickle_path, self.pickle_path + ".bak")
+        logger.info(f"Migrated {len(row_list)} log records from {self.pickle_path}")
+
+    def _apply_retention(self) -> None:
+        self._connection.execute(
+            "DELETE FROM log WHERE id <= (SELECT MAX(id) FROM log) - ?",
+            (self.retention_count,),
+        )
+        self._connection.commit()
+
+    def append(self, time: str, event: str, status: str) -> None:
+        """
+        添加一条记录(延迟批量写入)
+        """
+        with self._lock:
+            self._pending_list.append((time, event, status))
+
+            if len(self._pending_list) >= log_flush_batch_size or self.flush_delay == 0:
+                self.flush()
+            elif self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.flush_delay, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def flush(self) -> None:
+        """立即写入所有未写入的记录"""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+
+            if len(self._pending_list) == 0:
+                return
+
+            pending_list = self._pending_list
+            self._pending_list = []
+
+            try:
+                connection = self._get_connection()
+                with connection:
+                    connection.executemany("INSERT INTO log (time, event, status) VALUES (?, ?, ?)", pending_list)
+                self._apply_retention()
+            except sqlite3.Error as e:
+                logger.error(f"Failed to save log records: {e}")
+
+    def count(self, log_filter: Optional[LogFilter] = None) -> int:
+        condition, param_list = ("1", []) if log_filter is None else log_filter.to_sql()
+        with self._lock:
+            self.flush()
+            return self._get_connection().execute(f"SELECT COUNT(*) FROM log WHERE {condition}", param_list).fetchone()[0]
+
+    def load_page(
+        self,
+        limit: int,
+        before_id: int = -1,
+        log_filter: Optional[LogFilter] = None,
+        newest_first: bool = False,
+    ) -> List[LogRecord]:
+        """
+        读取一页记录
+        :param limit: 最多读取的条数
+        :param before_id: 只读取id小于该值的记录，-1表示从最新的开始
+        :param log_filter: 筛选条件
+        :param newest_first: 是否按从新到旧排列
+        :return: 默认按时间先后排列的记录
+        """
+        condition, param_list = ("1", []) if log_filter is None else log_filter.to_sql()
+        if before_id >= 0:
+            condition += " AND id < ?"
+            param_list = param_list + [before_id]
+
+        with self._lock:
+            self.flush()
+            record_list = (
+                self._get_connection()
+                .execute(
+                    f"SELECT id, time, event, status FROM log WHERE {condition} ORDER BY id DESC LIMIT ?",
+                    param_list + [limit],
+                )
+                .fetchall()
+            )
+
+        if not newest_first:
+            record_list.reverse()
+        return record_list
+
+    def list_events(self) -> List[str]:
+        """全部出现过的事件类型"""
+        with self._lock:
+            self.flush()
+            cursor = self._get_connection().execute("SELECT DISTINCT event FROM log ORDER BY event")
+            return [row[0] for row in cursor.fetchall()]
+
+    def iter_records(self, batch_size: int = 1000) -> Iterator[LogRecord]:
+        """按时间先后遍历全部记录(用于导出)"""
+        last_id = 0
+        while True:
+            with self._lock:
+                self.flush()
+                record_list = (
+                    self._get_connection()
+                    .execute(
+                        "SELECT id, time, event, status FROM log WHERE id > ? ORDER BY id LIMIT ?",
+                        (last_id, batch_size),
+                    )
+                    .fetchall()
+                )
+            if len(record_list) == 0:
+                return
+            yield from record_list
+            last_id = record_list[-1][0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pending_list = []
+            connection = self._get_connection()
+            with connection:
+                connection.execute("DELETE FROM log")
+
+    def close(self) -> None:
+        with self._lock:
+            self.flush()
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+log_store = LogStore()
+
+atexit.register(log_store.close)
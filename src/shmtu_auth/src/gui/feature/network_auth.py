@@ -1,9 +1,15 @@
 import threading
-from time import sleep as time_sleep
+import time
 from typing import List
 
+from shmtu_auth.src.core.account_health import (
+    account_health_enable,
+    account_health_store,
+    record_login_result,
+    sort_user_list_by_health,
+)
 from shmtu_auth.src.core.core_exp import check_is_connected
-from shmtu_auth.src.core.shmtu_auth import ShmtuNetAuth
+from shmtu_auth.src.core.shmtu_auth import ShmtuNetAuth, login_race_count
 from shmtu_auth.src.datatype.shmtu.auth.auth_user import UserItem, get_valid_user_list
 from shmtu_auth.src.gui.common.signal_bus import (
     auth_attempt,
@@ -14,6 +20,10 @@ from shmtu_auth.src.gui.common.signal_bus import (
     auth_thread_stopped,
     log_new,
 )
+from shmtu_auth.src.monitor.check_scheduler import CheckScheduler, create_check_scheduler
+from shmtu_auth.src.monitor.link_watcher import create_wake_event, release_wake_event
+from shmtu_auth.src.telemetry import metrics
+from shmtu_auth.src.utils.deadline import Deadline, cycle_deadline
 
 
 class AuthThread(threading.Thread):
@@ -28,6 +38,11 @@ class AuthThread(threading.Thread):
 
     shmtu_auth_obj: ShmtuNetAuth
 
+    check_scheduler: CheckScheduler
+
+    # 停止或网卡状态变化时唤醒等待中的线程
+    wake_event: threading.Event
+
     def __init__(
         self,
         user_list: List[UserItem] = None,
@@ -49,23 +64,34 @@ class AuthThread(threading.Thread):
 
         self.shmtu_auth_obj = ShmtuNetAuth()
 
+        self.check_scheduler = create_check_scheduler(self.check_internet_interval)
+
+        self.wake_event = threading.Event()
+
     def check_is_connected_retry(self):
         for _ in range(self.check_internet_retry_times):
             if check_is_connected():
                 return True
             else:
-                for _ in range(self.check_internet_retry_wait_time):
-                    if not self.need_work:
-                        return False
-                    time_sleep(1)
+                if not self.need_work:
+                    return False
+                # 停止时不清除事件，后续的等待也会立即返回
+                if self.wake_event.wait(self.check_internet_retry_wait_time) and self.need_work:
+                    self.wake_event.clear()
+                if not self.need_work:
+                    return False
         return False
 
-    def main_loop(self):
+    def main_loop(self) -> bool:
+        """
+        检测并在需要时认证
+        :return: 本次检测时是否已联网
+        """
         # 检查状态
         network_status = self.check_is_connected_retry()
         # 阻塞任务后必须检查是否需要继续工作
         if not self.need_work:
-            return
+            return network_status
 
         # 更新状态
         if self.shmtu_auth_obj.isLogin != network_status:
@@ -76,30 +102,78 @@ class AuthThread(threading.Thread):
                 log_new("Auth", "检测到网络未连接(状态变动)")
                 auth_status_changed(False)
 
-        self.shmtu_auth_obj.isLogin = network_status
+        # 记录检测结果，登录时无需再次检测
+        self.shmtu_auth_obj.update_net_status(network_status)
 
         # 如果已经认证，直接跳过后续操作
         if network_status:
-            return
+            return network_status
 
         # 这里没有认证，因此要进行认证
-        for user in self.user_list:
+        # 重试等待时间由用户设置，时间预算只约束获取Query String与登录
+        with cycle_deadline() as deadline:
+            self.login_user_list(deadline)
+
+        return network_status
+
+    def login_user_list(self, deadline: Deadline) -> bool:
+        """
+        按健康度顺序使用账号登录
+        :param deadline: 本轮的时间预算
+        :return: 是否登录成功
+        """
+        if account_health_enable:
+            for user in self.user_list:
+                account_health_store.update_expire_date(user.user_id, user.expire_date_int)
+
+        if login_race_count > 1:
+            return self.login_race()
+
+        # 健康的账号优先尝试
+        for user in sort_user_list_by_health(self.user_list, lambda item: item.user_id):
             # 实例化时已经过滤过了，按理来说这句话没啥用~
             if not user.is_valid():
                 continue
 
+            if deadline.is_expired() or not self.need_work:
+                break
+
             # 发送认证尝试信号
             auth_attempt(user.user_id)
 
+            start_time = time.monotonic()
             login_result = self.shmtu_auth_obj.login(user.user_id, user.password, user.is_encrypted)
+            record_login_result(user.user_id, login_result[0], time.monotonic() - start_time, login_result[1])
 
             if login_result[0]:  # 登录成功
                 auth_success(user.user_id)
-                break
+                return True
             else:  # 登录失败
                 error_msg = login_result[1] if len(login_result) > 1 else "未知错误"
                 auth_failed(user.user_id, error_msg)
 
+        return False
+
+    def login_race(self) -> bool:
+        """
+        同时使用多个账号尝试登录(SHMTU_AUTH_LOGIN_RACE_COUNT大于1时)
+        :return: 是否登录成功
+        """
+        user_list_3 = [(user.user_id, user.password, user.is_encrypted) for user in self.user_list if user.is_valid()]
+
+        is_success = self.shmtu_auth_obj.login_by_list(user_list_3, login_race_count)
+
+        # 按返回顺序补发信号
+        for attempt in self.shmtu_auth_obj.last_login_attempts:
+            auth_attempt(attempt.user_id)
+            if attempt.is_success:
+                auth_success(attempt.user_id)
+            else:
+                error_msg = attempt.message if len(attempt.message) > 0 else "未知错误"
+                auth_failed(attempt.user_id, error_msg)
+
+        return is_success
+
     def run(self):
         if self.user_list is None or len(self.user_list) == 0:
             return
@@ -107,19 +181,28 @@ class AuthThread(threading.Thread):
         # 发送线程启动信号
         auth_thread_started()
 
+        _, link_callback = create_wake_event(self.wake_event)
+
         while self.need_work:
-            self.main_loop()
+            start_time = time.monotonic()
+            network_status = self.main_loop()
+            metrics.record_cycle("gui", time.monotonic() - start_time)
 
-            for _ in range(self.check_internet_interval):
-                if not self.need_work:
-                    break
-                time_sleep(1)
+            if not self.need_work:
+                break
+
+            # 停止工作或网卡状态变化时会被立即唤醒(只有stop会结束循环，因此停止时不清除事件)
+            if self.wake_event.wait(self.check_scheduler.next_interval(network_status)) and self.need_work:
+                self.wake_event.clear()
+
+        release_wake_event(link_callback)
 
         # 发送线程停止信号
         auth_thread_stopped()
 
     def stop(self):
         self.need_work = False
+        self.wake_event.set()
 
     def check_is_stop(self):
         return self.is_alive()
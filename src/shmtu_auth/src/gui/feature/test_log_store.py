@@ -0,0 +1,111 @@
+"""
+测试GUI日志存储
+
+运行示例:
+    python -m pytest src/shmtu_auth/src/gui/feature/test_log_store.py -v
+"""
+
+import os
+import pickle
+
+import pytest
+
+from shmtu_auth.src.gui.feature.log_store import LogFilter, LogStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    log_store = LogStore(
+        os.path.join(tmp_path, "logs.db"),
+        retention_count=50,
+        flush_delay=60,
+        pickle_path=os.path.join(tmp_path, "logs.pickle"),
+    )
+    yield log_store
+    log_store.close()
+
+
+class TestLogStore:
+    """日志存储测试类"""
+
+    def test_append(self, store):
+        """记录延迟写入，读取前自动写入"""
+        store.append("2024-01-01 00:00:00", "Auth", "认证成功")
+        assert not os.path.exists(store.path)
+
+        assert store.count() == 1
+        assert store.load_page(10) == [(1, "2024-01-01 00:00:00", "Auth", "认证成功")]
+
+    def test_page(self, store):
+        """分页读取，每页按时间先后排列"""
+        for i in range(30):
+            store.append(str(i), "Event", "")
+
+        page = store.load_page(10)
+        assert [record[1] for record in page] == [str(i) for i in range(20, 30)]
+
+        page = store.load_page(10, before_id=page[0][0])
+        assert [record[1] for record in page] == [str(i) for i in range(10, 20)]
+
+        assert [record[1] for record in store.iter_records(batch_size=7)] == [str(i) for i in range(30)]
+
+    def test_retention(self, store):
+        """超过保留条数时删除最早的记录"""
+        for i in range(120):
+            store.append(str(i), "Event", "")
+        store.flush()
+
+        assert store.count() == 50
+        assert store.load_page(1, before_id=10**9)[0][1] == "119"
+        assert next(store.iter_records())[1] == "70"
+
+    def test_reopen(self, store):
+        """关闭后重新打开，记录仍然存在"""
+        store.append("time", "Event", "status")
+        store.close()
+
+        new_store = LogStore(store.path, pickle_path="")
+        try:
+            assert new_store.count() == 1
+        finally:
+            new_store.close()
+
+    def test_clear(self, store):
+        """清空后未写入的记录也被丢弃"""
+        store.append("time", "Event", "status")
+        store.clear()
+        assert store.count() == 0
+
+    def test_migrate_pickle(self, store):
+        """首次打开时导入旧的pickle文件"""
+        with open(store.pickle_path, "wb") as f:
+            pickle.dump([["time_1", "Auth", "a"], ["time_2", "Auth", "b"]], f)
+
+        assert [record[1] for record in store.load_page(10)] == ["time_1", "time_2"]
+        assert not os.path.exists(store.pickle_path)
+        assert os.path.exists(store.pickle_path + ".bak")
+
+    def test_filter(self, store):
+        """按事件、关键字与时间范围筛选"""
+        store.append("2024-01-01 08:00:00", "Auth", "认证成功: 2024*****001")
+        store.append("2024-01-01 09:00:00", "Update", "Get Latest Version Failed.")
+        store.append("2024-01-02 08:00:00", "Auth", "认证失败: 2024*****002 - 密码错误")
+        store.append("2024-01-03 08:00:00", "Info", "MainWindow initialized.")
+
+        def get_time_list(log_filter: LogFilter):
+            return [record[1] for record in store.load_page(10, log_filter=log_filter, newest_first=True)]
+
+        assert get_time_list(LogFilter(event="Auth")) == ["2024-01-02 08:00:00", "2024-01-01 08:00:00"]
+        assert get_time_list(LogFilter(keyword="失败")) == ["2024-01-02 08:00:00"]
+        assert get_time_list(LogFilter(keyword="100%")) == []
+        assert get_time_list(LogFilter(start_time="2024-01-01 08:30:00", end_time="2024-01-02 23:59:59")) == [
+            "2024-01-02 08:00:00",
+            "2024-01-01 09:00:00",
+        ]
+        assert store.count(LogFilter(event="Auth", keyword="成功")) == 1
+        assert store.list_events() == ["Auth", "Info", "Update"]
+
+        log_filter = LogFilter(event="Auth", keyword="失败")
+        assert log_filter.matches("2024-01-05 00:00:00", "Auth", "认证失败: x")
+        assert not log_filter.matches("2024-01-05 00:00:00", "Update", "失败")
+        assert LogFilter().is_empty()
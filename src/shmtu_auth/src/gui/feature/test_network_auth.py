@@ -0,0 +1,47 @@
+"""
+测试图形界面的认证线程(需要PySide6)
+
+运行示例:
+    python -m pytest src/shmtu_auth/src/gui/feature/test_network_auth.py -v
+"""
+
+import time
+
+import pytest
+
+pytest.importorskip("PySide6")
+
+from shmtu_auth.src.datatype.shmtu.auth.auth_user import UserItem  # noqa: E402
+from shmtu_auth.src.gui.feature import network_auth  # noqa: E402
+
+
+class TestAuthThread:
+    def test_stop_during_retry(self, monkeypatch):
+        """重试等待期间停止，线程立即退出，不会再等待下一轮的检测间隔"""
+        monkeypatch.setenv("SHMTU_AUTH_LINK_WATCHER", "off")
+        check_count_list = []
+
+        def check_is_connected() -> bool:
+            check_count_list.append(True)
+            return False
+
+        monkeypatch.setattr(network_auth, "check_is_connected", check_is_connected)
+
+        thread = network_auth.AuthThread(
+            [UserItem(user_id="202412300001", password="password_1")],
+            check_internet_interval=300,
+            check_internet_retry_times=3,
+            check_internet_retry_wait_time=60,
+        )
+        thread.daemon = True
+        thread.start()
+
+        start_time = time.monotonic()
+        while len(check_count_list) == 0 and time.monotonic() - start_time < 5:
+            time.sleep(0.01)
+        time.sleep(0.1)
+
+        thread.stop()
+        thread.join(2)
+        assert not thread.is_alive()
+        assert len(check_count_list) == 1
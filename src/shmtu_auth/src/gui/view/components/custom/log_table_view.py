@@ -0,0 +1,190 @@
+import datetime
+from typing import List, Optional
+
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt
+from PySide6.QtWidgets import QHeaderView
+from qfluentwidgets import TableView
+
+from shmtu_auth.src.gui.feature.log_store import LogFilter, LogRecord, LogStore, log_store
+
+table_header = ["日志时间", "事件", "状态"]
+
+time_range_text_list = ["全部时间", "最近1小时", "今天", "最近7天", "最近30天"]
+
+
+class LogTableModel(QAbstractTableModel):
+    """
+    按需从日志存储中读取记录的表格模型
+    最新的记录显示在最上面，向下滚动时通过fetchMore读取更早的记录
+    """
+
+    page_size: int = 200
+    # 内存中最多保留的记录数，超出后丢弃最旧的记录(可通过筛选条件查看更早的记录)
+    max_record_count: int = 5000
+
+    store: LogStore
+    log_filter: LogFilter
+
+    # 已读取的记录，从新到旧排列
+    record_list: List[LogRecord]
+    # 已读取的最早一条记录的id
+    oldest_id: int
+    has_more: bool
+
+    def __init__(self, store: LogStore = log_store, parent=None):
+        super().__init__(parent)
+
+        self.store = store
+        self.log_filter = LogFilter()
+
+        self.record_list = []
+        self.oldest_id = -1
+        self.has_more = False
+
+        self.reload()
+
+    def reload(self):
+        """按当前的筛选条件重新读取第一页"""
+        self.beginResetModel()
+        self.record_list = self.store.load_page(self.page_size, log_filter=self.log_filter, newest_first=True)
+        self.has_more = len(self.record_list) == self.page_size
+        self.oldest_id = self.record_list[-1][0] if len(self.record_list) > 0 else -1
+        self.endResetModel()
+
+    def set_filter(self, log_filter: LogFilter):
+        self.log_filter = log_filter
+        self.reload()
+
+    def append_record(self, time: str, event: str, status: str):
+        """
+        添加一条新记录(同时写入存储)，只插入一行，不刷新其他行
+        """
+        self.store.append(time, event, status)
+
+        if not self.log_filter.matches(time, event, status):
+            return
+
+        # 新记录尚未写入数据库，没有id，不影响按oldest_id读取更早的记录
+        self.beginInsertRows(QModelIndex(), 0, 0)
+        self.record_list.insert(0, (-1, time, event, status))
+        self.endInsertRows()
+
+        if len(self.record_list) > self.max_record_count:
+            self.trim_records()
+
+    def trim_records(self):
+        """丢弃超出max_record_count的最旧记录，并从剩余的最旧记录继续读取"""
+        row_count = len(self.record_list)
+        self.beginRemoveRows(QModelIndex(), self.max_record_count, row_count - 1)
+        del self.record_list[self.max_record_count :]
+        self.endRemoveRows()
+
+        # 新添加的记录没有id，取剩余记录中最旧的有效id
+        self.oldest_id = next((record[0] for record in reversed(self.record_list) if record[0] >= 0), -1)
+        self.has_more = self.oldest_id >= 0
+
+    def clear(self):
+        self.store.clear()
+        self.reload()
+
+    def rowCount(self, parent: Optional[QModelIndex] = None) -> int:
+        if parent is not None and parent.isValid():
+            return 0
+        return len(self.record_list)
+
+    def columnCount(self, parent: Optional[QModelIndex] = None) -> int:
+        if parent is not None and parent.isValid():
+            return 0
+        return len(table_header)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.DisplayRole or role == Qt.ItemDataRole.ToolTipRole:
+            return self.record_list[index.row()][index.column() + 1]
+        return None
+
+    def headerData(self, section: int, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return table_header[section]
+        return None
+
+    def canFetchMore(self, parent: Optional[QModelIndex] = None) -> bool:
+        if parent is not None and parent.isValid():
+            return False
+        return self.has_more and len(self.record_list) < self.max_record_count
+
+    def fetchMore(self, parent: Optional[QModelIndex] = None):
+        if (parent is not None and parent.isValid()) or not self.canFetchMore():
+            return
+
+        page_size = min(self.page_size, self.max_record_count - len(self.record_list))
+        page = self.store.load_page(
+            page_size,
+            before_id=self.oldest_id,
+            log_filter=self.log_filter,
+            newest_first=True,
+        )
+        self.has_more = len(page) == page_size
+        if len(page) == 0:
+            return
+
+        row_count = len(self.record_list)
+        self.beginInsertRows(QModelIndex(), row_count, row_count + len(page) - 1)
+        self.record_list.extend(page)
+        self.oldest_id = page[-1][0]
+        self.endInsertRows()
+
+
+class LogTableView(TableView):
+    log_model: LogTableModel
+
+    def __init__(self, parent=None, store: LogStore = log_store):
+        super().__init__(parent)
+
+        self.verticalHeader().hide()
+        self.setBorderRadius(8)
+        self.setBorderVisible(True)
+
+        self.log_model = LogTableModel(store, self)
+        self.setModel(self.log_model)
+
+        # 固定行高，滚动时不需要逐行计算
+        self.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        # 只按第一页调整一次列宽，之后添加记录不再重新计算
+        self.resizeColumnsToContents()
+        self.horizontalHeader().setStretchLastSection(True)
+
+        # 禁止直接编辑
+        self.setEditTriggers(TableView.EditTrigger.NoEditTriggers)
+        self.setSelectionBehavior(TableView.SelectionBehavior.SelectRows)
+
+    def add_record(self, time: str = "", event: str = "", status: str = ""):
+        self.log_model.append_record(time, event, status)
+
+    def set_filter(self, log_filter: LogFilter):
+        self.log_model.set_filter(log_filter)
+        self.scrollToTop()
+
+    def clear_all_logs(self):
+        self.log_model.clear()
+
+
+def get_time_range_start(range_index: int) -> str:
+    """
+    时间范围下拉框对应的开始时间
+    :param range_index: 0全部 1最近1小时 2今天 3最近7天 4最近30天
+    :return: 开始时间，全部时为空字符串
+    """
+    now = datetime.datetime.now()
+    if range_index == 1:
+        start = now - datetime.timedelta(hours=1)
+    elif range_index == 2:
+        start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    elif range_index == 3:
+        start = now - datetime.timedelta(days=7)
+    elif range_index == 4:
+        start = now - datetime.timedelta(days=30)
+    else:
+        return ""
+    return start.strftime("%Y-%m-%d %H:%M:%S")
@@ -1,25 +1,152 @@
-from typing import List, Optional
+from typing import Callable, List, Optional
 
-from PySide6.QtCore import Signal
-from PySide6.QtWidgets import QTableWidgetItem
-from qfluentwidgets import TableWidget
+from PySide6.QtCore import QAbstractTableModel, QItemSelection, QItemSelectionModel, QModelIndex, Qt, Signal
+from qfluentwidgets import TableView
 
 from shmtu_auth.src.datatype.shmtu.auth.auth_user import (
     UserItem,
-    convert_to_list_list,
     generate_test_user_list,
+    get_moved_row_range,
 )
-from shmtu_auth.src.gui.view.components.fluent.widget_table import QFluentTableWidget
 
 table_header = ["学号", "姓名", "密码", "支持类型", "过期时间", "有效"]
 
 
-class UserListTableWidget(QFluentTableWidget):
+class UserListTableModel(QAbstractTableModel):
+    """
+    账号列表的表格模型
+    列表的修改通过本类的方法进行，只通知发生变化的行，显示的文字按行缓存
+    """
+
+    # 列表内容发生变化(用于保存)
+    slot_user_list_updated: Signal = Signal()
+
+    user_list: List[UserItem]
+
+    def __init__(self, user_list: List[UserItem], parent=None):
+        super().__init__(parent)
+
+        self.user_list = user_list
+        # 每行显示的文字，None表示需要重新生成
+        self._display_cache: List[Optional[List[str]]] = [None] * len(user_list)
+
+    def rowCount(self, parent: Optional[QModelIndex] = None) -> int:
+        if parent is not None and parent.isValid():
+            return 0
+        return len(self.user_list)
+
+    def columnCount(self, parent: Optional[QModelIndex] = None) -> int:
+        if parent is not None and parent.isValid():
+            return 0
+        return len(table_header)
+
+    def get_display_list(self, row: int) -> List[str]:
+        display_list = self._display_cache[row]
+        if display_list is None:
+            display_list = self.user_list[row].to_display_list()
+            self._display_cache[row] = display_list
+        return display_list
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        return self.get_display_list(index.row())[index.column()]
+
+    def headerData(self, section: int, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return table_header[section]
+        return None
+
+    def reset(self):
+        """列表被整体替换后调用"""
+        self.beginResetModel()
+        self._display_cache = [None] * len(self.user_list)
+        self.endResetModel()
+        self.slot_user_list_updated.emit()
+
+    def _rows_changed(self, first: int, last: int):
+        if last < first:
+            return
+        for row in range(first, last + 1):
+            self._display_cache[row] = None
+        self.dataChanged.emit(self.index(first, 0), self.index(last, self.columnCount() - 1))
+
+    def user_changed(self, row: int):
+        """某一行的账号被修改"""
+        if row < 0 or row >= len(self.user_list):
+            return
+        self._rows_changed(row, row)
+        self.slot_user_list_updated.emit()
+
+    def insert_users(self, insert_index: int, new_user_list: List[UserItem]):
+        """
+        插入账号
+        :param insert_index: 插入的位置，-1表示添加到末尾
+        :param new_user_list: 新的账号
+        """
+        if len(new_user_list) == 0:
+            return
+        if insert_index < 0 or insert_index > len(self.user_list):
+            insert_index = len(self.user_list)
+
+        self.beginInsertRows(QModelIndex(), insert_index, insert_index + len(new_user_list) - 1)
+        self.user_list[insert_index:insert_index] = new_user_list
+        self._display_cache[insert_index:insert_index] = [None] * len(new_user_list)
+        self.endInsertRows()
+        self.slot_user_list_updated.emit()
+
+    def remove_rows(self, row_list: List[int]):
+        """删除账号，连续的行一次删除"""
+        row_list = sorted(set(row_list), reverse=True)
+        if len(row_list) == 0:
+            return
+
+        index = 0
+        while index < len(row_list):
+            last = row_list[index]
+            first = last
+            while index + 1 < len(row_list) and row_list[index + 1] == first - 1:
+                index += 1
+                first = row_list[index]
+
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self.user_list[first : last + 1]
+            del self._display_cache[first : last + 1]
+            self.endRemoveRows()
+
+            index += 1
+
+        self.slot_user_list_updated.emit()
+
+    def move_rows(self, move_function: Callable[..., List[int]], index: List[int], **kwargs) -> List[int]:
+        """
+        使用auth_user中的移动函数移动账号，只刷新位置发生变化的行
+        :param move_function: 例如user_list_move_up
+        :param index: 选中的行
+        :return: 移动后选中的行
+        """
+        original_index = index.copy()
+        final_index = move_function(user_list=self.user_list, index=original_index, **kwargs)
+
+        first, last = get_moved_row_range(original_index, final_index)
+        if last >= first:
+            self._rows_changed(first, last)
+            self.slot_user_list_updated.emit()
+
+        return final_index
+
+
+class UserListTableWidget(TableView):
     slot_user_list_updated: Signal = Signal()
+    itemSelectionChanged: Signal = Signal()
 
     column_count: int = len(table_header)
 
     user_list: Optional[List[UserItem]]
+    user_model: UserListTableModel
+
+    selected_items_count: int
+    selected_index: List[int]
 
     def __init__(self, parent=None, user_list=None):
         super().__init__(parent)
@@ -28,36 +155,48 @@ class UserListTableWidget(QFluentTableWidget):
         self.setBorderRadius(8)
         self.setBorderVisible(True)
 
-        self.setColumnCount(self.column_count)
-        self.setHorizontalHeaderLabels(table_header)
-
         self.user_list = user_list
         if self.user_list is None:
             self.user_list = generate_test_user_list(20)
 
-        self.update_user_list()
+        self.selected_items_count = 0
+        self.selected_index = []
+
+        self.user_model = UserListTableModel(self.user_list, self)
+        self.user_model.slot_user_list_updated.connect(self.slot_user_list_updated.emit)
+        self.setModel(self.user_model)
 
         self.resizeColumnsToContents()
 
         # 禁止直接编辑
-        self.setEditTriggers(TableWidget.EditTrigger.NoEditTriggers)
+        self.setEditTriggers(TableView.EditTrigger.NoEditTriggers)
+        self.setSelectionBehavior(TableView.SelectionBehavior.SelectRows)
 
-    def update_user_list(self):
-        user_count = self.user_list.__len__()
+        self.selectionModel().selectionChanged.connect(self.__selected_item_changed)
 
-        self.setRowCount(user_count)
+    def __selected_item_changed(self):
+        selected_index = sorted(index.row() for index in self.selectionModel().selectedRows())
 
-        user_list: List[List[str]] = convert_to_list_list(self.user_list)
+        self.selected_items_count = len(selected_index)
 
-        for i, user_info_str_list in enumerate(user_list):
-            for j in range(user_info_str_list.__len__()):
-                text = user_info_str_list[j]
+        self.selected_index.clear()
+        self.selected_index.extend(selected_index)
 
-                # 密码用星号展示
-                if j == 2:
-                    text = "*" * len(text)
+        self.itemSelectionChanged.emit()
 
-                self.setItem(i, j, QTableWidgetItem(text))
+    def rowCount(self) -> int:
+        return self.user_model.rowCount()
 
+    def update_user_list(self):
+        """整体刷新(读取新的列表后使用)"""
+        self.user_model.reset()
         self.resizeColumnsToContents()
-        self.slot_user_list_updated.emit()
+
+    def set_select_index_list(self, index: List[int]):
+        selection = QItemSelection()
+        for i in index:
+            selection.select(self.user_model.index(i, 0), self.user_model.index(i, self.column_count - 1))
+        self.selectionModel().select(
+            selection,
+            QItemSelectionModel.SelectionFlag.ClearAndSelect | QItemSelectionModel.SelectionFlag.Rows,
+        )
@@ -1,8 +1,11 @@
 import threading
-from time import sleep as time_sleep
+import time
 from typing import List, Optional
 
 from shmtu_auth.src.core.shmtu_auth import ShmtuNetAuth
+from shmtu_auth.src.monitor.check_scheduler import create_check_scheduler
+from shmtu_auth.src.monitor.link_watcher import create_wake_event, release_wake_event
+from shmtu_auth.src.telemetry import metrics
 from shmtu_auth.src.utils.logs import get_logger
 from shmtu_auth.src.utils.program_env_config import (
     convert_number_to_star,
@@ -19,8 +22,10 @@ class GuiWorker:
     time_interval: int = 60
     user_list_3: List
 
+    wake_event: threading.Event
+
     def __init__(self):
-        pass
+        self.wake_event = threading.Event()
 
     def set_user_list_3(self, user_list_3: List):
         self.user_list_3 = user_list_3
@@ -44,19 +49,27 @@ class GuiWorker:
                 password = convert_password_to_star(user[1])
                 logger.info(f"[{i + 1}]User: {user_name}, Password: {password}")
 
+            check_scheduler = create_check_scheduler(self.time_interval)
+
+            wake_event, link_callback = create_wake_event(self.wake_event)
+
             logger.info("Auth status monitor started.")
 
             while self.need_work:
-                if not net_auth.check_is_online():
+                start_time = time.monotonic()
+                is_online = net_auth.check_is_online()
+                if not is_online:
                     if net_auth.login_by_list(user_list_3):
                         logger.info("Login success.")
                     else:
                         logger.error("Login failed.")
+                metrics.record_cycle("gui_worker", time.monotonic() - start_time)
+
+                # 停止工作或网卡状态变化时会被立即唤醒
+                wake_event.wait(check_scheduler.next_interval(is_online))
+                wake_event.clear()
 
-                count = 0
-                while self.need_work and count < self.time_interval:
-                    count += 1
-                    time_sleep(1)
+            release_wake_event(link_callback)
 
         logger.info("Create Thread")
         self.work_thread = threading.Thread(target=monitor_auth)
@@ -70,6 +83,7 @@ class GuiWorker:
 
     def stop_work(self):
         self.need_work = False
+        self.wake_event.set()
         self.work_thread.join()
         self.work_thread = None
 
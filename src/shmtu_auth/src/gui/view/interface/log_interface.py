@@ -1,24 +1,24 @@
 import csv
 import datetime
 import os.path
-import pickle
-from typing import List
 
-from PySide6.QtCore import Qt
-from PySide6.QtWidgets import QFileDialog, QHBoxLayout, QTableWidgetItem, QWidget
-from qfluentwidgets import InfoBar, InfoBarIcon, InfoBarPosition, TableWidget
+from PySide6.QtCore import Qt, QTimer
+from PySide6.QtWidgets import QFileDialog, QHBoxLayout, QWidget
+from qfluentwidgets import ComboBox, InfoBar, InfoBarIcon, InfoBarPosition, SearchLineEdit
 
-from shmtu_auth.src.config.project_directory import get_directory_data_path
 from shmtu_auth.src.gui.common.signal_bus import signal_bus
+from shmtu_auth.src.gui.feature.log_store import LogFilter, log_store
+from shmtu_auth.src.gui.view.components.custom.log_table_view import (
+    LogTableView,
+    get_time_range_start,
+    time_range_text_list,
+)
 from shmtu_auth.src.gui.view.components.fluent.widget_push_button import FPushButton
 from shmtu_auth.src.gui.view.interface.gallery_interface import GalleryInterface
 from shmtu_auth.src.utils.logs import get_logger
 
 logger = get_logger()
 
-pickle_log_path = "logs.pickle"
-pickle_log_path = os.path.join(get_directory_data_path(), pickle_log_path)
-
 
 class LogInterface(GalleryInterface):
     def __init__(self, parent=None):
@@ -54,20 +54,73 @@ class LogInterface(GalleryInterface):
         button_layout.addWidget(button_clear_log)
         button_layout.addStretch()  # 添加弹性空间，让按钮靠左对齐
 
+        # 筛选条件
+        self.combo_box_event = ComboBox(self)
+        self.combo_box_event.setFixedWidth(120)
+        self.update_event_list()
+        self.combo_box_event.currentIndexChanged.connect(self.apply_filter)
+
+        self.combo_box_time_range = ComboBox(self)
+        self.combo_box_time_range.setFixedWidth(120)
+        self.combo_box_time_range.addItems(time_range_text_list)
+        self.combo_box_time_range.currentIndexChanged.connect(self.apply_filter)
+
+        self.search_line_edit = SearchLineEdit(self)
+        self.search_line_edit.setPlaceholderText("搜索事件或状态")
+        self.search_line_edit.setFixedWidth(200)
+
+        # 输入时延迟筛选，避免每输入一个字都查询一次
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(300)
+        self.search_timer.timeout.connect(self.apply_filter)
+        self.search_line_edit.textChanged.connect(self.search_timer.start)
+
+        button_layout.addWidget(self.combo_box_event)
+        button_layout.addWidget(self.combo_box_time_range)
+        button_layout.addWidget(self.search_line_edit)
+
         self.vBoxLayout.addWidget(button_widget)
 
-        self.logTable = LogTableFrame(self)
+        self.logTable = LogTableView(self)
         self.vBoxLayout.addWidget(self.logTable)
 
+        signal_bus.signal_log_new.connect(self.add_new_log)
+
+    def add_new_log(self, event: str, status: str):
+        now = datetime.datetime.now()
+        time = now.strftime("%Y-%m-%d %H:%M:%S")
+        self.add_new_record(time=time, event=event, status=status)
+
     def add_new_record(self, time: str = "", event: str = "", status: str = ""):
+        logger.info(f"添加日志记录：{str([time, event, status])}")
         self.logTable.add_record(time=time, event=event, status=status)
 
+        if self.combo_box_event.findText(event) < 0:
+            self.combo_box_event.addItem(event)
+
+    def update_event_list(self):
+        self.combo_box_event.clear()
+        self.combo_box_event.addItem("全部事件")
+        self.combo_box_event.addItems(log_store.list_events())
+
+    def apply_filter(self):
+        """按当前的筛选条件刷新表格"""
+        event = self.combo_box_event.currentText() if self.combo_box_event.currentIndex() > 0 else ""
+        log_filter = LogFilter(
+            event=event,
+            keyword=self.search_line_edit.text(),
+            start_time=get_time_range_start(self.combo_box_time_range.currentIndex()),
+        )
+        self.logTable.set_filter(log_filter)
+
     def export_logs(self):
         """导出日志到文件"""
         logger.info("用户点击导出日志按钮")
 
         # 检查是否有日志数据
-        if not self.logTable.record_list:
+        record_count = log_store.count()
+        if record_count == 0:
             InfoBar.warning(title="无数据", content="当前没有日志记录可导出", duration=2000, parent=self)
             return
 
@@ -92,21 +145,21 @@ class LogInterface(GalleryInterface):
                     # 写入表头
                     writer.writerow(["日志时间", "事件", "状态"])
                     # 写入数据
-                    for record in self.logTable.record_list:
-                        writer.writerow(record)
+                    for record in log_store.iter_records():
+                        writer.writerow(record[1:])
             else:
                 # 导出为文本格式
                 with open(file_path, "w", encoding="utf-8") as txtfile:
                     txtfile.write("SHMTU Auth 日志导出\n")
                     txtfile.write("=" * 50 + "\n")
                     txtfile.write(f"导出时间: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                    txtfile.write(f"总记录数: {len(self.logTable.record_list)}\n")
+                    txtfile.write(f"总记录数: {record_count}\n")
                     txtfile.write("=" * 50 + "\n\n")
 
-                    for record in self.logTable.record_list:
-                        txtfile.write(f"时间: {record[0]}\n")
-                        txtfile.write(f"事件: {record[1]}\n")
-                        txtfile.write(f"状态: {record[2]}\n")
+                    for record in log_store.iter_records():
+                        txtfile.write(f"时间: {record[1]}\n")
+                        txtfile.write(f"事件: {record[2]}\n")
+                        txtfile.write(f"状态: {record[3]}\n")
                         txtfile.write("-" * 30 + "\n")
 
             logger.info(f"日志导出成功: {file_path}")
@@ -131,120 +184,9 @@ class LogInterface(GalleryInterface):
             logger.info("用户确认清空日志")
             # 清空日志表格
             self.logTable.clear_all_logs()
+            self.update_event_list()
 
             # 显示成功提示
             InfoBar.success(title="清空成功", content="所有日志记录已清空", duration=2000, parent=self)
         else:
             logger.info("用户取消清空日志")
-
-
-class LogTableFrame(TableWidget):
-    column_count = 3
-
-    record_count = 0
-    record_list: List[List[str]] = []
-
-    def __init__(self, parent=None):
-        super().__init__(parent)
-
-        self.verticalHeader().hide()
-        self.setBorderRadius(8)
-        self.setBorderVisible(True)
-
-        self.setColumnCount(self.column_count)
-        self.setHorizontalHeaderLabels(
-            [
-                "日志时间",
-                "事件",
-                "状态",
-            ]
-        )
-
-        # self.add_record("2024年01月01日 12:34:56", "检测到网络断开", "成功")
-
-        self.resizeColumnsToContents()
-
-        # 禁止直接编辑
-        self.setEditTriggers(TableWidget.EditTrigger.NoEditTriggers)
-
-        if os.path.exists(pickle_log_path):
-            self.read_status()
-
-        signal_bus.signal_log_new.connect(self.add_new_record)
-
-    def add_new_record(self, event: str, status: str):
-        now = datetime.datetime.now()
-        time = now.strftime("%Y-%m-%d %H:%M:%S")
-        self.add_record(time=time, event=event, status=status)
-
-    def read_status(self):
-        if not os.path.exists(pickle_log_path):
-            return
-
-        try:
-            with open(pickle_log_path, "rb") as f:
-                self.record_list = pickle.load(f)
-        except Exception:
-            return
-
-        if self.record_list is not None:
-            self.update_by_list()
-
-    def save_status(self):
-        with open(pickle_log_path, "wb") as f:
-            pickle.dump(self.record_list, f)
-
-    def update_record(self, index: int, current_record: List[str]):
-        for j in range(min(current_record.__len__(), self.column_count)):
-            current_text = current_record[j]
-            self.setItem(index, j, QTableWidgetItem(current_text))
-
-    def update_by_list(self, record_list: List[List[str]] = None):
-        if record_list is not None:
-            self.record_list = record_list.copy()
-
-        self.record_count = self.record_list.__len__()
-
-        self.setRowCount(self.record_count)
-
-        for i, record_item in enumerate(self.record_list):
-            self.update_record(i, record_item)
-
-        self.resizeColumnsToContents()
-        self.save_status()
-
-    def add_record(self, time: str = "", event: str = "", status: str = ""):
-        self.setRowCount(self.record_count + 1)
-
-        # 生成结构化数据
-        current_record = [time, event, status]
-
-        # 添加到记录列表
-        self.record_list.append(current_record)
-        logger.info(f"添加日志记录：{str(current_record)}")
-
-        # 更新UI
-        self.update_record(self.record_count, current_record)
-
-        self.record_count += 1
-
-        self.resizeColumnsToContents()
-        self.save_status()
-
-        self.resizeColumnsToContents()
-
-    def clear_all_logs(self):
-        """清空所有日志记录"""
-        logger.info("开始清空所有日志记录")
-
-        # 清空记录列表
-        self.record_list = []
-        self.record_count = 0
-
-        # 清空表格显示
-        self.setRowCount(0)
-
-        # 保存清空后的状态到文件
-        self.save_status()
-
-        logger.info("所有日志记录已清空")
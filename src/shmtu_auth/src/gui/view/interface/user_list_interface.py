@@ -1,16 +1,14 @@
-import os.path
-import pickle
 from typing import List
 
-from PySide6.QtCore import Qt
+from PySide6.QtCore import QCoreApplication, Qt, QTimer
 from PySide6.QtWidgets import QHBoxLayout, QWidget
 from qfluentwidgets import Action, Dialog, RoundMenu
 from qfluentwidgets import FluentIcon as FIF
 
-from shmtu_auth.src.config.project_directory import get_directory_data_path
+from shmtu_auth.src.datatype.shmtu.auth.account_store import account_store
 from shmtu_auth.src.datatype.shmtu.auth.auth_user import (
     UserItem,
-    user_is_exist_in_list,
+    get_user_id_set,
     user_list_move_down,
     user_list_move_to_bottom,
     user_list_move_to_top,
@@ -32,10 +30,11 @@ from shmtu_auth.src.utils.logs import get_logger
 
 logger = get_logger()
 
-pickle_user_list_path = "user_list.pickle"
-pickle_user_list_path = os.path.join(get_directory_data_path(), pickle_user_list_path)
 # Log the path for debugging
-logger.info(f"User list pickle path: {pickle_user_list_path}")
+logger.info(f"User list database path: {account_store.path}")
+
+# 连续修改时合并保存，单位：毫秒
+save_delay = 1000
 
 
 class UserListInterface(GalleryInterface):
@@ -58,6 +57,12 @@ class UserListInterface(GalleryInterface):
 
         self.user_list = user_list
 
+        # 合并短时间内的多次修改，只保存一次
+        self.save_timer = QTimer(self)
+        self.save_timer.setSingleShot(True)
+        self.save_timer.setInterval(save_delay)
+        self.save_timer.timeout.connect(self.save_status)
+
         self.__init_widget()
 
         self.read_status()
@@ -65,7 +70,9 @@ class UserListInterface(GalleryInterface):
         # 生成测试数据
         # self.user_list.clear()
         # self.user_list.extend(generate_test_user_list(20))
-        self.table_widget.update_user_list()
+
+        # 退出前保存尚未保存的修改
+        QCoreApplication.instance().aboutToQuit.connect(self.flush_save)
 
     def __init_widget(self):
         user_info_widget = QWidget(self)
@@ -95,32 +102,44 @@ class UserListInterface(GalleryInterface):
         self.table_widget.itemSelectionChanged.connect(self.__table_item_selected)
         self.__table_item_selected()
 
-        self.user_info_edit_widget.onModifyButtonClick.connect(lambda: self.table_widget.update_user_list())
+        self.user_info_edit_widget.onModifyButtonClick.connect(self.__user_modified)
 
     def read_status(self):
-        if not os.path.exists(pickle_user_list_path):
+        if not account_store.exists():
             return
 
         try:
-            with open(pickle_user_list_path, "rb") as f:
-                user_list = pickle.load(f)
+            user_list = account_store.load()
 
             self.user_list.clear()
             self.user_list.extend(user_list)
 
             logger.info(f"读取用户列表成功，共{len(user_list)}个用户")
-        except Exception:
+        except Exception as e:
+            logger.error(f"Failed to read user list: {e}")
             return
 
         if self.user_list is not None:
             self.table_widget.update_user_list()
+            # 刚读取的列表无需再次保存
+            self.save_timer.stop()
 
     def save_status(self):
-        with open(pickle_user_list_path, "wb") as f:
-            pickle.dump(self.user_list, f)
+        # 只写入发生变化的账号
+        account_store.save(self.user_list)
+
+    def flush_save(self):
+        if self.save_timer.isActive():
+            self.save_timer.stop()
+            self.save_status()
 
     def __user_list_updated(self):
-        self.save_status()
+        self.save_timer.start()
+
+    def __user_modified(self):
+        # 只刷新被修改的行
+        if len(self.selected_index) > 0:
+            self.table_widget.user_model.user_changed(self.selected_index[0])
 
     def __table_item_selected(self):
         self.selected_index.clear()
@@ -240,26 +259,17 @@ class UserListInterface(GalleryInterface):
         if len(user_item) == 0:
             return
 
+        user_id_set = get_user_id_set(self.user_list)
+
         new_item_list: List[UserItem] = []
         for item in user_item:
             current_item = item.copy()
-            if user_is_exist_in_list(
-                user_list=self.user_list,
-                user_id=current_item.user_id,
-                excluded_indexes=[],
-            ):
+            if current_item.user_id in user_id_set:
                 current_item.user_id = ""
 
             new_item_list.append(current_item)
 
-        if insert_index == -1:
-            self.user_list.extend(new_item_list)
-        else:
-            # new_item_list.reverse()
-            for item in new_item_list:
-                self.user_list.insert(insert_index, item)
-                insert_index += 1
-        self.table_widget.update_user_list()
+        self.table_widget.user_model.insert_users(insert_index, new_item_list)
 
     def __menu_action_create(self):
         insert_index = -1
@@ -278,29 +288,26 @@ class UserListInterface(GalleryInterface):
         self.__add_item(selected_list, insert_index=insert_index)
 
     def __menu_action_del(self):
-        selected_index: List[int] = self.selected_index.copy()
-        selected_index.sort(reverse=True)
-        for i in selected_index:
-            self.user_list.pop(i)
-
-        self.table_widget.update_user_list()
+        self.table_widget.user_model.remove_rows(self.selected_index.copy())
 
     def __menu_action_move_to_top(self):
-        final_selection_index: List[int] = user_list_move_to_top(user_list=self.user_list, index=self.selected_index)
-        self.table_widget.update_user_list()
+        final_selection_index: List[int] = self.table_widget.user_model.move_rows(user_list_move_to_top, self.selected_index)
         self.table_widget.set_select_index_list(final_selection_index)
 
     def __menu_action_move_to_bottom(self):
-        final_selection_index: List[int] = user_list_move_to_bottom(user_list=self.user_list, index=self.selected_index)
-        self.table_widget.update_user_list()
+        final_selection_index: List[int] = self.table_widget.user_model.move_rows(
+            user_list_move_to_bottom, self.selected_index
+        )
         self.table_widget.set_select_index_list(final_selection_index)
 
     def __menu_action_move_up(self):
-        final_selection_index: List[int] = user_list_move_up(user_list=self.user_list, index=self.selected_index, step=1)
-        self.table_widget.update_user_list()
+        final_selection_index: List[int] = self.table_widget.user_model.move_rows(
+            user_list_move_up, self.selected_index, step=1
+        )
         self.table_widget.set_select_index_list(final_selection_index)
 
     def __menu_action_move_down(self):
-        final_selection_index: List[int] = user_list_move_down(user_list=self.user_list, index=self.selected_index, step=1)
-        self.table_widget.update_user_list()
+        final_selection_index: List[int] = self.table_widget.user_model.move_rows(
+            user_list_move_down, self.selected_index, step=1
+        )
         self.table_widget.set_select_index_list(final_selection_index)
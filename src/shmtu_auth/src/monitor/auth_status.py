@@ -1,14 +1,24 @@
+import asyncio
 import threading
-from time import sleep as time_sleep
+from typing import List, Optional
 
+from shmtu_auth.src.core.core_async import AsyncShmtuNetAuth, is_async_available
 from shmtu_auth.src.core.shmtu_auth import ShmtuNetAuth
-from shmtu_auth.src.utils.env import get_env_int
+from shmtu_auth.src.datatype.shmtu.auth.account_store import account_store
+from shmtu_auth.src.monitor.check_scheduler import create_check_scheduler
+from shmtu_auth.src.monitor.link_watcher import create_wake_event, release_wake_event
+from shmtu_auth.src.telemetry import metrics
+from shmtu_auth.src.telemetry.metrics import start_metrics_server
+from shmtu_auth.src.telemetry.tracing import span
+from shmtu_auth.src.utils.deadline import cycle_deadline
+from shmtu_auth.src.utils.env import get_env_bool, get_env_int
 from shmtu_auth.src.utils.logs import get_logger
 from shmtu_auth.src.utils.program_env_config import (
     convert_number_to_star,
     convert_password_to_star,
     get_user_list,
 )
+from shmtu_auth.src.webhook import notifier, wework
 
 logger = get_logger()
 
@@ -19,17 +29,28 @@ env_time_interval = get_env_int("SHMTU_AUTH_TIME_INTERVAL", -1)
 if env_time_interval > 0:
     time_interval = env_time_interval
 
+# 是否使用基于asyncio的认证引擎(需要安装aiohttp)
+use_async_engine = get_env_bool("SHMTU_AUTH_ASYNC_ENGINE", False)
 
-def monitor_auth():
-    logger.info("Initializing...")
-    net_auth = ShmtuNetAuth()
 
-    logger.info("Reading user information...")
-    user_list_3 = get_user_list()
+def load_user_list(user_list_3: Optional[List] = None) -> List:
+    """
+    获取要登录的账号列表并输出到日志
+    :param user_list_3: (学号, 密码, 是否加密)列表，默认从配置读取，配置中没有时从账号数据库读取
+    :return: 账号列表
+    """
+    if user_list_3 is None:
+        logger.info("Reading user information...")
+        user_list_3 = get_user_list()
+
+        # 未通过环境变量配置时，使用图形界面保存的账号
+        if len(user_list_3) == 0 and account_store.exists():
+            logger.info(f"Reading user information from {account_store.path}")
+            user_list_3 = account_store.get_login_list()
 
     if len(user_list_3) == 0:
         logger.error("No user information found.")
-        return
+        return user_list_3
 
     user_count = len(user_list_3)
     logger.info(f"Found {user_count} user:")
@@ -39,21 +60,148 @@ def monitor_auth():
         password = convert_password_to_star(user[1])
         logger.info(f"[{i + 1}]User: {user_name}, Password: {password}")
 
+    return user_list_3
+
+
+def monitor_auth(
+    user_list_3: Optional[List] = None,
+    stop_event: Optional[threading.Event] = None,
+    wake_event: Optional[threading.Event] = None,
+):
+    """
+    检测并自动认证
+    :param user_list_3: (学号, 密码, 是否加密)列表，默认从配置读取，配置中没有时从账号数据库读取
+    :param stop_event: 设置后退出循环(需同时设置wake_event以立即唤醒)，为None时一直运行
+    :param wake_event: 用于唤醒等待的事件，为None时新建
+    """
+    logger.info("Initializing...")
+    net_auth = ShmtuNetAuth()
+
+    user_list_3 = load_user_list(user_list_3)
+    if len(user_list_3) == 0:
+        return
+
+    check_scheduler = create_check_scheduler(time_interval)
+
+    # 网卡状态变化时立即唤醒，无需等待本轮间隔结束
+    wake_event, link_callback = create_wake_event(wake_event)
+
+    # SHMTU_AUTH_METRICS_PORT未设置时不启动
+    start_metrics_server()
+
+    # 继续发送上次退出前未发送的通知
+    if wework.is_configured():
+        wework.resume_send_text_queue()
+    notifier.resume_notification_queue()
+    # 连续失败时只通知一次，短时间内反复断开的通知会被合并
+    is_login_failed = False
+    user_id_list = [user[0] for user in user_list_3]
+
     logger.info("Auth status monitor started.")
 
-    while True:
-        if not net_auth.check_is_online():
-            if net_auth.login_by_list(user_list_3):
-                logger.info("Login success.")
-            else:
-                logger.error("Login failed.")
+    while stop_event is None or not stop_event.is_set():
+        # 检测与登录共享本轮的时间预算
+        with cycle_deadline() as deadline, span("auth_cycle"):
+            is_online = net_auth.check_is_online()
+            if not is_online:
+                if net_auth.login_by_list(user_list_3):
+                    logger.info("Login success.")
+                    if is_login_failed:
+                        notifier.send_auth_recovered_notification(user_id_list)
+                    is_login_failed = False
+                else:
+                    logger.error("Login failed.")
+                    if not is_login_failed:
+                        notifier.send_auth_failed_notification(user_id_list)
+                    is_login_failed = True
+        metrics.record_cycle("daemon", deadline.elapsed())
+
+        if wake_event.wait(check_scheduler.next_interval(is_online)):
+            wake_event.clear()
+            if stop_event is not None and stop_event.is_set():
+                break
+            logger.info("Woken up by link change.")
 
-        time_sleep(time_interval)
+    release_wake_event(link_callback)
+    logger.info("Auth status monitor stopped.")
+
+
+async def monitor_auth_async(
+    user_list_3: Optional[List] = None,
+    stop_event: Optional[threading.Event] = None,
+    wake_event: Optional[threading.Event] = None,
+):
+    """
+    检测并自动认证(使用AsyncShmtuNetAuth)，参数与monitor_auth相同
+    """
+    logger.info("Initializing...")
+
+    user_list_3 = load_user_list(user_list_3)
+    if len(user_list_3) == 0:
+        return
+
+    check_scheduler = create_check_scheduler(time_interval)
+    wake_event, link_callback = create_wake_event(wake_event)
+
+    start_metrics_server()
+
+    if wework.is_configured():
+        wework.resume_send_text_queue()
+    notifier.resume_notification_queue()
+    is_login_failed = False
+    user_id_list = [user[0] for user in user_list_3]
+
+    loop = asyncio.get_running_loop()
+
+    logger.info("Auth status monitor started(async engine).")
+
+    async with AsyncShmtuNetAuth() as net_auth:
+        while stop_event is None or not stop_event.is_set():
+            with cycle_deadline() as deadline, span("auth_cycle"):
+                is_online = await net_auth.check_is_online()
+                if not is_online:
+                    if await net_auth.login_by_list(user_list_3):
+                        logger.info("Login success.")
+                        if is_login_failed:
+                            notifier.send_auth_recovered_notification(user_id_list)
+                        is_login_failed = False
+                    else:
+                        logger.error("Login failed.")
+                        if not is_login_failed:
+                            notifier.send_auth_failed_notification(user_id_list)
+                        is_login_failed = True
+            metrics.record_cycle("daemon", deadline.elapsed())
+
+            # 网卡变化事件由其他线程触发，在线程池中等待，不阻塞事件循环
+            if await loop.run_in_executor(None, wake_event.wait, check_scheduler.next_interval(is_online)):
+                wake_event.clear()
+                if stop_event is not None and stop_event.is_set():
+                    break
+                logger.info("Woken up by link change.")
+
+    release_wake_event(link_callback)
+    logger.info("Auth status monitor stopped.")
+
+
+def run_monitor_auth_async(
+    user_list_3: Optional[List] = None,
+    stop_event: Optional[threading.Event] = None,
+    wake_event: Optional[threading.Event] = None,
+):
+    """在当前线程中运行monitor_auth_async"""
+    asyncio.run(monitor_auth_async(user_list_3, stop_event, wake_event))
 
 
 def start_monitor_auth():
+    target = monitor_auth
+    if use_async_engine:
+        if is_async_available():
+            target = run_monitor_auth_async
+        else:
+            logger.warning("aiohttp is not installed, fall back to the blocking engine.")
+
     logger.info("Create Thread")
-    t = threading.Thread(target=monitor_auth)
+    t = threading.Thread(target=target)
     logger.info("Created Thread")
     logger.info("Start Thread")
     t.start()
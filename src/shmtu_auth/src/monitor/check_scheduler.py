@@ -0,0 +1,177 @@
+import random
+from typing import Optional, Tuple
+
+from shmtu_auth.src.utils.env import get_env_float, get_env_str
+from shmtu_auth.src.utils.logs import get_logger
+
+logger = get_logger()
+
+# 自适应检测间隔的下限，单位：秒
+check_interval_min = 5.0
+# 自适应检测间隔的上限，单位：秒
+check_interval_max = 300.0
+# 网络稳定时检测间隔的增长倍数
+check_backoff_factor = 1.5
+# 随机抖动比例(避免多台机器同时检测)
+check_jitter = 0.1
+
+
+def get_adaptive_config() -> Tuple[float, float, float, float]:
+    """
+    读取自适应间隔的配置
+    在调用时读取环境变量(TOML配置在导入本模块之后才加载)
+    :return: (下限, 上限, 增长倍数, 抖动比例)
+    """
+    interval_min = check_interval_min
+    interval_max = check_interval_max
+    backoff_factor = check_backoff_factor
+    jitter = check_jitter
+
+    env_check_interval_min = get_env_float("SHMTU_AUTH_CHECK_INTERVAL_MIN", -1)
+    if env_check_interval_min > 0:
+        interval_min = env_check_interval_min
+
+    env_check_interval_max = get_env_float("SHMTU_AUTH_CHECK_INTERVAL_MAX", -1)
+    if env_check_interval_max > 0:
+        interval_max = env_check_interval_max
+
+    env_check_backoff_factor = get_env_float("SHMTU_AUTH_CHECK_BACKOFF_FACTOR", -1)
+    if env_check_backoff_factor >= 1:
+        backoff_factor = env_check_backoff_factor
+
+    env_check_jitter = get_env_float("SHMTU_AUTH_CHECK_JITTER", -1)
+    if 0 <= env_check_jitter < 1:
+        jitter = env_check_jitter
+
+    return interval_min, interval_max, backoff_factor, jitter
+
+
+class CheckScheduler:
+    """检测间隔调度器基类"""
+
+    def next_interval(self, is_online: bool) -> float:
+        """
+        根据本次检测结果计算距离下次检测的时间
+        :param is_online: 本次检测是否已联网
+        :return: 等待时间，单位：秒
+        """
+        raise NotImplementedError
+
+    def reset(self) -> None:
+        """重置调度状态"""
+        pass
+
+
+class FixedCheckScheduler(CheckScheduler):
+    """固定间隔(原有行为)"""
+
+    interval: float
+
+    def __init__(self, interval: float = 60):
+        self.interval = interval
+
+    def next_interval(self, is_online: bool) -> float:
+        return self.interval
+
+
+class AdaptiveCheckScheduler(CheckScheduler):
+    """
+    自适应间隔：
+    - 状态变化(掉线或刚恢复)后立即收紧到下限，快速确认链路
+    - 持续在线时按倍数退避，直到上限
+    - 持续离线时从下限开始退避，但不超过基础间隔
+    """
+
+    base_interval: float
+    min_interval: float
+    max_interval: float
+    backoff_factor: float
+    jitter: float
+
+    current_interval: float
+    last_online: Optional[bool]
+    offline_count: int
+
+    def __init__(
+        self,
+        base_interval: float = 60,
+        min_interval: Optional[float] = None,
+        max_interval: Optional[float] = None,
+        backoff_factor: Optional[float] = None,
+        jitter: Optional[float] = None,
+    ):
+        """
+        未指定的参数使用SHMTU_AUTH_CHECK_INTERVAL_MIN等配置
+        """
+        config_min, config_max, config_backoff_factor, config_jitter = get_adaptive_config()
+        if min_interval is None:
+            min_interval = config_min
+        if max_interval is None:
+            max_interval = config_max
+        if backoff_factor is None:
+            backoff_factor = config_backoff_factor
+        if jitter is None:
+            jitter = config_jitter
+
+        self.min_interval = min(min_interval, max_interval)
+        self.max_interval = max_interval
+        self.base_interval = min(max(base_interval, self.min_interval), self.max_interval)
+        self.backoff_factor = backoff_factor
+        self.jitter = jitter
+
+        self.reset()
+
+    def reset(self) -> None:
+        self.current_interval = self.base_interval
+        self.last_online = None
+        self.offline_count = 0
+
+    def next_interval(self, is_online: bool) -> float:
+        if is_online:
+            if self.last_online is False:
+                # 刚刚恢复，链路可能仍不稳定
+                self.current_interval = self.min_interval
+            elif self.last_online is True:
+                self.current_interval = min(self.current_interval * self.backoff_factor, self.max_interval)
+            self.offline_count = 0
+        else:
+            self.offline_count += 1
+            self.current_interval = min(
+                self.min_interval * (self.backoff_factor ** (self.offline_count - 1)),
+                self.base_interval,
+            )
+
+        self.last_online = is_online
+
+        interval = self.current_interval
+        if self.jitter > 0:
+            interval *= 1 + random.uniform(-self.jitter, self.jitter)
+
+        return min(max(interval, self.min_interval), self.max_interval)
+
+
+def create_check_scheduler(base_interval: float = 60) -> CheckScheduler:
+    """
+    根据配置创建调度器(SHMTU_AUTH_CHECK_SCHEDULER: adaptive/fixed)
+    :param base_interval: 基础检测间隔，即原有的固定间隔
+    :return: CheckScheduler
+    """
+    scheduler_type = get_env_str("SHMTU_AUTH_CHECK_SCHEDULER", "adaptive").lower()
+
+    if scheduler_type == "fixed":
+        logger.info(f"Check scheduler: fixed({base_interval}s)")
+        return FixedCheckScheduler(base_interval)
+
+    scheduler = AdaptiveCheckScheduler(base_interval)
+    logger.info(
+        f"Check scheduler: adaptive(base={scheduler.base_interval}s, "
+        f"min={scheduler.min_interval}s, max={scheduler.max_interval}s, "
+        f"factor={scheduler.backoff_factor}, jitter={scheduler.jitter})"
+    )
+    return scheduler
+
+
+if __name__ == "__main__":
+    scheduler = AdaptiveCheckScheduler(base_interval=60)
+    for status in [True, True, True, False, False, True, True, True, True]:
+        print(status, round(scheduler.next_interval(status), 2))
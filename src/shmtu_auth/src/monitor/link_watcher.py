@@ -0,0 +1,334 @@
+import errno
+import os
+import socket
+import struct
+import sys
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from shmtu_auth.src.utils.env import get_env_float, get_env_str
+from shmtu_auth.src.utils.logs import get_logger
+
+logger = get_logger()
+
+# rtnetlink 常量(linux/rtnetlink.h)
+NETLINK_ROUTE = 0
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV6_IFADDR = 0x100
+
+RTM_NEWLINK = 16
+RTM_DELLINK = 17
+RTM_NEWADDR = 20
+RTM_DELADDR = 21
+
+NLMSG_HEADER = struct.Struct("=LHHLL")
+IFINFO_MSG = struct.Struct("=BxHiII")
+IFADDR_MSG = struct.Struct("=BBBBI")
+
+IFF_UP = 0x1
+IFF_LOOPBACK = 0x8
+IFF_RUNNING = 0x40
+IFF_LOWER_UP = 0x10000
+
+RT_SCOPE_HOST = 254
+
+SYSFS_NET_PATH = "/sys/class/net"
+
+# sysfs 轮询间隔，单位：秒
+sysfs_poll_interval = 2.0
+
+env_sysfs_poll_interval = get_env_float("SHMTU_AUTH_LINK_WATCHER_POLL_INTERVAL", -1)
+if env_sysfs_poll_interval > 0:
+    sysfs_poll_interval = env_sysfs_poll_interval
+
+
+def is_netlink_supported() -> bool:
+    return sys.platform.startswith("linux") and hasattr(socket, "AF_NETLINK")
+
+
+def is_sysfs_supported() -> bool:
+    return sys.platform.startswith("linux") and os.path.isdir(SYSFS_NET_PATH)
+
+
+def parse_netlink_messages(data: bytes) -> List[Tuple[int, bytes]]:
+    """
+    拆分一次recv得到的多条netlink消息
+    :param data: 原始数据
+    :return: (消息类型, 消息体)列表
+    """
+    message_list = []
+    offset = 0
+    while offset + NLMSG_HEADER.size <= len(data):
+        msg_len, msg_type, _, _, _ = NLMSG_HEADER.unpack_from(data, offset)
+        if msg_len < NLMSG_HEADER.size:
+            break
+        message_list.append((msg_type, data[offset + NLMSG_HEADER.size : offset + msg_len]))
+        # 消息按4字节对齐
+        offset += (msg_len + 3) & ~3
+    return message_list
+
+
+class LinkWatcher:
+    """
+    监听网卡状态变化(载波、IP地址)，变化时立即通知监听者
+    Linux上优先使用rtnetlink，不可用时退化为轮询/sys/class/net
+    """
+
+    backend: str
+    is_running: bool
+
+    def __init__(self, backend: str = "auto"):
+        self.backend = backend
+        self.is_running = False
+
+        self._listener_list: List[Callable[[str], None]] = []
+        self._listener_lock = threading.Lock()
+
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+        # 每个网卡上次的状态标志，用于过滤无关的RTM_NEWLINK
+        self._link_flags: Dict[int, int] = {}
+
+    def add_listener(self, callback: Callable[[str], None]) -> None:
+        with self._listener_lock:
+            if callback not in self._listener_list:
+                self._listener_list.append(callback)
+
+    def remove_listener(self, callback: Callable[[str], None]) -> None:
+        with self._listener_lock:
+            if callback in self._listener_list:
+                self._listener_list.remove(callback)
+
+    def notify(self, reason: str) -> None:
+        logger.info(f"Link change detected: {reason}")
+
+        with self._listener_lock:
+            listener_list = self._listener_list.copy()
+
+        for callback in listener_list:
+            try:
+                callback(reason)
+            except Exception as e:
+                logger.exception(f"Link watcher listener error: {e}")
+
+    def start(self) -> bool:
+        """
+        启动监听线程
+        :return: 是否成功启动
+        """
+        if self.is_running:
+            return True
+
+        backend = self.backend
+        if backend == "auto":
+            if is_netlink_supported():
+                backend = "netlink"
+            elif is_sysfs_supported():
+                backend = "sysfs"
+            else:
+                logger.info("Link watcher is not supported on this platform.")
+                return False
+
+        if backend == "netlink":
+            try:
+                sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+                sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV6_IFADDR))
+                sock.settimeout(1.0)
+            except Exception as e:
+                logger.warning(f"Netlink is unavailable({e}), fallback to sysfs.")
+                if not is_sysfs_supported():
+                    return False
+                backend = "sysfs"
+            else:
+                target = self._run_netlink
+                args = (sock,)
+
+        if backend == "sysfs":
+            if not is_sysfs_supported():
+                return False
+            target = self._run_sysfs
+            args = ()
+
+        if backend not in ("netlink", "sysfs"):
+            logger.error(f"Unknown link watcher backend: {backend}")
+            return False
+
+        self.backend = backend
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=target, args=args, name="link-watcher", daemon=True)
+        self._thread.start()
+        self.is_running = True
+
+        logger.info(f"Link watcher started({backend}).")
+        return True
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=3)
+        self._thread = None
+        self.is_running = False
+
+    def _handle_link_message(self, msg_type: int, payload: bytes) -> Optional[str]:
+        if len(payload) < IFINFO_MSG.size:
+            return None
+        _, _, index, flags, _ = IFINFO_MSG.unpack_from(payload)
+        if flags & IFF_LOOPBACK:
+            return None
+
+        if msg_type == RTM_DELLINK:
+            self._link_flags.pop(index, None)
+            return f"interface {index} removed"
+
+        state = flags & (IFF_UP | IFF_RUNNING | IFF_LOWER_UP)
+        last_state = self._link_flags.get(index)
+        self._link_flags[index] = state
+        # 第一次收到某个网卡的消息时只记录状态(新网卡获得地址时会收到RTM_NEWADDR)
+        if last_state is None or last_state == state:
+            return None
+        return f"interface {index} flags {state:#x}"
+
+    @staticmethod
+    def _handle_addr_message(msg_type: int, payload: bytes) -> Optional[str]:
+        if len(payload) < IFADDR_MSG.size:
+            return None
+        _, _, _, scope, index = IFADDR_MSG.unpack_from(payload)
+        if scope == RT_SCOPE_HOST:
+            return None
+        action = "added" if msg_type == RTM_NEWADDR else "removed"
+        return f"interface {index} address {action}"
+
+    def _run_netlink(self, sock: socket.socket) -> None:
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    data = sock.recv(65536)
+                except socket.timeout:
+                    continue
+                except OSError as e:
+                    if e.errno == errno.ENOBUFS:
+                        # 接收缓冲区溢出，丢失的消息中可能包含状态变化
+                        self.notify("netlink buffer overrun")
+                        continue
+                    logger.error(f"Netlink receive error: {e}")
+                    break
+
+                reason_list = []
+                for msg_type, payload in parse_netlink_messages(data):
+                    if msg_type in (RTM_NEWLINK, RTM_DELLINK):
+                        reason = self._handle_link_message(msg_type, payload)
+                    elif msg_type in (RTM_NEWADDR, RTM_DELADDR):
+                        reason = self._handle_addr_message(msg_type, payload)
+                    else:
+                        reason = None
+                    if reason is not None:
+                        reason_list.append(reason)
+
+                # 同一批消息只通知一次
+                if len(reason_list) > 0:
+                    self.notify("; ".join(reason_list))
+        finally:
+            sock.close()
+            self.is_running = False
+
+    @staticmethod
+    def read_sysfs_state() -> Dict[str, Tuple[str, str]]:
+        state_dict = {}
+        for name in os.listdir(SYSFS_NET_PATH):
+            if name == "lo":
+                continue
+            interface_state = []
+            for item in ("carrier", "operstate"):
+                try:
+                    with open(os.path.join(SYSFS_NET_PATH, name, item)) as f:
+                        interface_state.append(f.read().strip())
+                except OSError:
+                    # 网卡down时读取carrier会失败
+                    interface_state.append("")
+            state_dict[name] = tuple(interface_state)
+        return state_dict
+
+    def _run_sysfs(self) -> None:
+        last_state = self.read_sysfs_state()
+        while not self._stop_event.wait(sysfs_poll_interval):
+            try:
+                current_state = self.read_sysfs_state()
+            except OSError as e:
+                logger.error(f"Read sysfs error: {e}")
+                continue
+
+            if current_state != last_state:
+                changed = sorted(
+                    name for name in set(current_state) | set(last_state) if current_state.get(name) != last_state.get(name)
+                )
+                last_state = current_state
+                self.notify(f"interface {','.join(changed)} changed")
+
+        self.is_running = False
+
+
+_link_watcher: Optional[LinkWatcher] = None
+_link_watcher_lock = threading.Lock()
+
+
+def get_link_watcher() -> Optional[LinkWatcher]:
+    """
+    获取共享的网卡监听器(SHMTU_AUTH_LINK_WATCHER: auto/netlink/sysfs/off)
+    :return: 已启动的监听器，不支持或已关闭时返回None
+    """
+    global _link_watcher
+
+    backend = get_env_str("SHMTU_AUTH_LINK_WATCHER", "auto").lower()
+    if backend in ("off", "false", "0", "none"):
+        return None
+
+    with _link_watcher_lock:
+        if _link_watcher is None:
+            watcher = LinkWatcher(backend)
+            if not watcher.start():
+                return None
+            _link_watcher = watcher
+        elif not _link_watcher.is_running:
+            if not _link_watcher.start():
+                return None
+
+    return _link_watcher
+
+
+def create_wake_event(
+    wake_event: Optional[threading.Event] = None,
+) -> Tuple[threading.Event, Optional[Callable[[str], None]]]:
+    """
+    创建(或复用)一个在网卡变化时被唤醒的事件，用于替代固定的sleep
+    :param wake_event: 已有的事件，为None时新建
+    :return: (事件, 已注册的回调)，不支持监听时回调为None
+    """
+    if wake_event is None:
+        wake_event = threading.Event()
+
+    link_watcher = get_link_watcher()
+    if link_watcher is None:
+        return wake_event, None
+
+    def on_link_changed(reason: str):
+        wake_event.set()
+
+    link_watcher.add_listener(on_link_changed)
+    return wake_event, on_link_changed
+
+
+def release_wake_event(callback: Optional[Callable[[str], None]]) -> None:
+    if callback is None or _link_watcher is None:
+        return
+    _link_watcher.remove_listener(callback)
+
+
+if __name__ == "__main__":
+    watcher = get_link_watcher()
+    if watcher is None:
+        print("Link watcher is not supported.")
+    else:
+        watcher.add_listener(lambda reason: print("Changed:", reason))
+        threading.Event().wait()
@@ -0,0 +1,65 @@
+"""
+测试检测间隔调度器
+
+运行示例:
+    python -m pytest src/shmtu_auth/src/monitor/test_check_scheduler.py -v
+"""
+
+from shmtu_auth.src.monitor.check_scheduler import (
+    AdaptiveCheckScheduler,
+    FixedCheckScheduler,
+    create_check_scheduler,
+)
+
+
+class TestCheckScheduler:
+    """检测间隔调度器测试类"""
+
+    def test_fixed(self):
+        """固定间隔"""
+        scheduler = FixedCheckScheduler(60)
+        assert scheduler.next_interval(True) == 60
+        assert scheduler.next_interval(False) == 60
+
+    def test_backoff_when_stable(self):
+        """持续在线时逐渐退避，但不超过上限"""
+        scheduler = AdaptiveCheckScheduler(base_interval=10, min_interval=2, max_interval=40, backoff_factor=2, jitter=0)
+        assert scheduler.next_interval(True) == 10
+        assert scheduler.next_interval(True) == 20
+        assert scheduler.next_interval(True) == 40
+        assert scheduler.next_interval(True) == 40
+
+    def test_tighten_after_drop(self):
+        """掉线与恢复后收紧到下限"""
+        scheduler = AdaptiveCheckScheduler(base_interval=10, min_interval=2, max_interval=40, backoff_factor=2, jitter=0)
+        scheduler.next_interval(True)
+        scheduler.next_interval(True)
+
+        assert scheduler.next_interval(False) == 2
+        assert scheduler.next_interval(False) == 4
+        assert scheduler.next_interval(False) == 8
+        # 持续离线不超过基础间隔
+        assert scheduler.next_interval(False) == 10
+
+        # 刚恢复时仍使用下限
+        assert scheduler.next_interval(True) == 2
+        assert scheduler.next_interval(True) == 4
+
+    def test_jitter_bounds(self):
+        """抖动后仍在上下限之内"""
+        scheduler = AdaptiveCheckScheduler(base_interval=10, min_interval=5, max_interval=20, backoff_factor=2, jitter=0.5)
+        for status in [True, True, True, False, True] * 20:
+            interval = scheduler.next_interval(status)
+            assert 5 <= interval <= 20
+
+    def test_config_read_on_create(self, monkeypatch):
+        """创建时读取配置(导入之后加载的TOML配置同样生效)"""
+        monkeypatch.setenv("SHMTU_AUTH_CHECK_SCHEDULER", "adaptive")
+        monkeypatch.setenv("SHMTU_AUTH_CHECK_INTERVAL_MIN", "3")
+        monkeypatch.setenv("SHMTU_AUTH_CHECK_INTERVAL_MAX", "30")
+        monkeypatch.setenv("SHMTU_AUTH_CHECK_BACKOFF_FACTOR", "3")
+        monkeypatch.setenv("SHMTU_AUTH_CHECK_JITTER", "0")
+
+        scheduler = create_check_scheduler(10)
+        assert (scheduler.min_interval, scheduler.max_interval) == (3, 30)
+        assert (scheduler.backoff_factor, scheduler.jitter) == (3, 0)
@@ -0,0 +1,65 @@
+"""
+测试网卡状态监听中的netlink消息解析
+
+运行示例:
+    python -m pytest src/shmtu_auth/src/monitor/test_link_watcher.py -v
+"""
+
+from shmtu_auth.src.monitor.link_watcher import (
+    IFADDR_MSG,
+    IFF_LOOPBACK,
+    IFF_LOWER_UP,
+    IFF_RUNNING,
+    IFF_UP,
+    IFINFO_MSG,
+    NLMSG_HEADER,
+    RT_SCOPE_HOST,
+    RTM_DELADDR,
+    RTM_NEWADDR,
+    RTM_NEWLINK,
+    LinkWatcher,
+    parse_netlink_messages,
+)
+
+
+def build_message(msg_type: int, payload: bytes) -> bytes:
+    msg_len = NLMSG_HEADER.size + len(payload)
+    padding = b"\0" * (((msg_len + 3) & ~3) - msg_len)
+    return NLMSG_HEADER.pack(msg_len, msg_type, 0, 0, 0) + payload + padding
+
+
+def build_link_payload(index: int, flags: int) -> bytes:
+    return IFINFO_MSG.pack(0, 1, index, flags, 0xFFFFFFFF)
+
+
+class TestLinkWatcher:
+    """netlink消息解析测试类"""
+
+    def test_parse_multiple_messages(self):
+        """一次recv中包含多条消息"""
+        data = build_message(RTM_NEWLINK, build_link_payload(2, IFF_UP)) + build_message(
+            RTM_NEWADDR, IFADDR_MSG.pack(2, 24, 0, 0, 2)
+        )
+        message_list = parse_netlink_messages(data)
+        assert [msg_type for msg_type, _ in message_list] == [RTM_NEWLINK, RTM_NEWADDR]
+
+    def test_link_state_change(self):
+        """只有状态标志变化时才通知，第一次收到的消息只记录状态"""
+        watcher = LinkWatcher("netlink")
+        up_flags = IFF_UP | IFF_RUNNING | IFF_LOWER_UP
+
+        assert watcher._handle_link_message(RTM_NEWLINK, build_link_payload(2, up_flags)) is None
+        assert watcher._handle_link_message(RTM_NEWLINK, build_link_payload(2, up_flags)) is None
+        assert watcher._handle_link_message(RTM_NEWLINK, build_link_payload(2, IFF_UP)) is not None
+
+    def test_ignore_loopback(self):
+        """忽略回环网卡"""
+        watcher = LinkWatcher("netlink")
+        payload = build_link_payload(1, IFF_UP | IFF_LOOPBACK)
+        assert watcher._handle_link_message(RTM_NEWLINK, payload) is None
+
+    def test_address_change(self):
+        """IP地址变化(如DHCP续租得到新地址)"""
+        assert LinkWatcher._handle_addr_message(RTM_NEWADDR, IFADDR_MSG.pack(2, 24, 0, 0, 2)) is not None
+        assert LinkWatcher._handle_addr_message(RTM_DELADDR, IFADDR_MSG.pack(2, 24, 0, 0, 2)) is not None
+        assert LinkWatcher._handle_addr_message(RTM_NEWADDR, IFADDR_MSG.pack(2, 8, 0, RT_SCOPE_HOST, 1)) is None
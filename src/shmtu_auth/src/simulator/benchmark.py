@@ -0,0 +1,492 @@
+"""
+端到端恢复时间基准测试
+在本地模拟服务器上反复制造掉线，统计从掉线到重新认证成功的时间
+
+运行示例:
+    python -m shmtu_auth.src.simulator.benchmark --samples 20 --output benchmark.json
+    python -m shmtu_auth.src.simulator.benchmark --scenario slow_204 --driver monitor_auth
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from shmtu_auth.src.simulator.eportal import EportalSimulator, EportalSimulatorConfig
+
+try:
+    import resource
+except ImportError:
+    # Windows
+    resource = None
+
+# 单次恢复的最长等待时间，超过视为未恢复，单位：秒
+recovery_timeout = 30.0
+# 检测是否恢复的轮询间隔，单位：秒
+poll_interval = 0.01
+
+
+class Scenario:
+    """基准测试场景"""
+
+    name: str
+    description: str
+
+    config: EportalSimulatorConfig
+
+    # (学号, 密码)列表，只有与user_dict一致的账号能登录
+    user_list: List[Tuple[str, str]]
+
+    # 掉线时是否同时产生网卡变化事件(唤醒等待中的检测线程)
+    link_event: bool
+    # 恢复后保持在线多久再次掉线，单位：秒
+    online_time: float
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        config: EportalSimulatorConfig,
+        user_list: List[Tuple[str, str]],
+        link_event: bool = True,
+        online_time: float = 1.0,
+    ):
+        self.name = name
+        self.description = description
+        self.config = config
+        self.user_list = user_list
+        self.link_event = link_event
+        self.online_time = online_time
+
+
+def create_user_list(count: int, valid_index_list: List[int]) -> Tuple[List[Tuple[str, str]], Dict[str, str]]:
+    """
+    生成账号列表
+    :param count: 账号数量
+    :param valid_index_list: 密码正确的账号下标
+    :return: (客户端使用的账号列表, 服务器接受的账号)
+    """
+    user_list = []
+    user_dict = {}
+    for i in range(count):
+        user_id = f"2024123{i:05d}"
+        password = f"password_{i}"
+        user_dict[user_id] = password
+        if i not in valid_index_list:
+            password = "wrong_password"
+        user_list.append((user_id, password))
+    return user_list, user_dict
+
+
+def get_scenario_list(seed: int = 0) -> List[Scenario]:
+    scenario_list = []
+
+    user_list, user_dict = create_user_list(1, [0])
+    scenario_list.append(
+        Scenario(
+            "single_account",
+            "One valid account, fast portal, link event on loss",
+            EportalSimulatorConfig(latency=0.005, user_dict=user_dict, seed=seed),
+            user_list,
+        )
+    )
+
+    user_list, user_dict = create_user_list(8, [5, 6, 7])
+    scenario_list.append(
+        Scenario(
+            "many_accounts_failures",
+            "Eight accounts, first five rejected, 10% dropped connections",
+            EportalSimulatorConfig(latency=0.02, latency_jitter=0.02, failure_rate=0.1, user_dict=user_dict, seed=seed),
+            user_list,
+        )
+    )
+
+    user_list, user_dict = create_user_list(1, [0])
+    config = EportalSimulatorConfig(latency=0.005, user_dict=user_dict, seed=seed)
+    config.latency_dict["probe"] = 1.5
+    scenario_list.append(
+        Scenario(
+            "slow_204",
+            "generate_204 answers after 1.5s",
+            config,
+            user_list,
+        )
+    )
+
+    user_list, user_dict = create_user_list(2, [0, 1])
+    scenario_list.append(
+        Scenario(
+            "portal_flapping",
+            "Portal drops authentication shortly after every login, no link event, 10% malformed responses",
+            EportalSimulatorConfig(latency=0.01, malformed_rate=0.1, user_dict=user_dict, seed=seed),
+            user_list,
+            link_event=False,
+            online_time=0.3,
+        )
+    )
+
+    return scenario_list
+
+
+# 基准测试使用的时间参数(按比例缩短，保持各参数间的关系)
+benchmark_settings = {
+    "check_interval": 2.0,
+    "check_interval_min": 0.2,
+    "check_interval_max": 2.0,
+    "check_jitter": 0.0,
+    "net_check_retry_times": 3,
+    "net_check_retry_wait_time": 0.5,
+    "net_status_fresh_time": 1.0,
+}
+
+
+@contextmanager
+def patch_attributes(patch_list: List[Tuple[object, str, object]]):
+    """临时修改模块属性，退出时恢复"""
+    original_list = [(target, name, getattr(target, name)) for target, name, _ in patch_list]
+    for target, name, value in patch_list:
+        setattr(target, name, value)
+    try:
+        yield
+    finally:
+        for target, name, value in reversed(original_list):
+            setattr(target, name, value)
+
+
+@contextmanager
+def patch_environ(key: str, value: str):
+    original_value = os.environ.get(key)
+    os.environ[key] = value
+    try:
+        yield
+    finally:
+        if original_value is None:
+            os.environ.pop(key, None)
+        else:
+            os.environ[key] = original_value
+
+
+@contextmanager
+def use_simulator(simulator: EportalSimulator, data_dir: str):
+    """
+    让认证流程使用模拟服务器，缓存写入临时目录
+    """
+    from shmtu_auth.src.core import account_health, core, get_query_string_requests, query_string
+    from shmtu_auth.src.monitor import auth_status, check_scheduler
+
+    patch_list = [
+        (core, "EPORTAL_INTERFACE_URL", simulator.interface_url),
+        (get_query_string_requests, "QUERY_STRING_URL", simulator.query_string_url),
+        (query_string, "query_string_cache", query_string.QueryStringCache(os.path.join(data_dir, "query_string.json"))),
+        (
+            account_health,
+            "account_health_store",
+            account_health.AccountHealthStore(os.path.join(data_dir, "account_health.json")),
+        ),
+        (core, "net_check_retry_times", benchmark_settings["net_check_retry_times"]),
+        (core, "net_check_retry_wait_time", benchmark_settings["net_check_retry_wait_time"]),
+        (core, "net_status_fresh_time", benchmark_settings["net_status_fresh_time"]),
+        (auth_status, "time_interval", benchmark_settings["check_interval"]),
+        (check_scheduler, "check_interval_min", benchmark_settings["check_interval_min"]),
+        (check_scheduler, "check_interval_max", benchmark_settings["check_interval_max"]),
+        (check_scheduler, "check_jitter", benchmark_settings["check_jitter"]),
+    ]
+
+    with patch_attributes(patch_list), patch_environ("SHMTU_AUTH_PROBE_URL_LIST", simulator.probe_url):
+        # 网卡变化由基准测试模拟
+        with patch_environ("SHMTU_AUTH_LINK_WATCHER", "off"):
+            yield
+
+
+class Driver:
+    """被测的检测循环"""
+
+    name: str
+
+    wake_event: Optional[threading.Event]
+
+    def start(self, user_list: List[Tuple[str, str]]) -> None:
+        raise NotImplementedError
+
+    def stop(self) -> None:
+        raise NotImplementedError
+
+
+class MonitorAuthDriver(Driver):
+    name = "monitor_auth"
+
+    def __init__(self):
+        self.wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, user_list: List[Tuple[str, str]]) -> None:
+        from shmtu_auth.src.monitor.auth_status import monitor_auth
+
+        user_list_3 = [(user_id, password, False) for user_id, password in user_list]
+        self._thread = threading.Thread(
+            target=monitor_auth,
+            args=(user_list_3, self._stop_event, self.wake_event),
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.wake_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=recovery_timeout)
+
+
+class AsyncMonitorAuthDriver(MonitorAuthDriver):
+    name = "monitor_auth_async"
+
+    def __init__(self):
+        from shmtu_auth.src.core.core_async import is_async_available
+
+        # 依赖aiohttp，未安装时跳过
+        if not is_async_available():
+            raise ImportError("aiohttp is not installed")
+
+        super().__init__()
+
+    def start(self, user_list: List[Tuple[str, str]]) -> None:
+        from shmtu_auth.src.monitor.auth_status import run_monitor_auth_async
+
+        user_list_3 = [(user_id, password, False) for user_id, password in user_list]
+        self._thread = threading.Thread(
+            target=run_monitor_auth_async,
+            args=(user_list_3, self._stop_event, self.wake_event),
+            daemon=True,
+        )
+        self._thread.start()
+
+
+class GuiWorkerDriver(Driver):
+    name = "gui_worker"
+
+    def __init__(self):
+        from shmtu_auth.src.gui.view.gui_worker import GuiWorker
+
+        self._worker = GuiWorker()
+        self.wake_event = self._worker.wake_event
+
+    def start(self, user_list: List[Tuple[str, str]]) -> None:
+        self._worker.time_interval = benchmark_settings["check_interval"]
+        self._worker.set_user_list_3([(user_id, password, False) for user_id, password in user_list])
+        self._worker.create_thread()
+        self._worker.work_thread.daemon = True
+        self._worker.start_work()
+
+    def stop(self) -> None:
+        self._worker.stop_work()
+
+
+class AuthThreadDriver(Driver):
+    name = "auth_thread"
+
+    def __init__(self):
+        # 依赖PySide6(信号)，未安装时跳过
+        from shmtu_auth.src.gui.feature.network_auth import AuthThread
+
+        self._thread_class = AuthThread
+        self._thread = None
+        self.wake_event = None
+
+    def start(self, user_list: List[Tuple[str, str]]) -> None:
+        from shmtu_auth.src.datatype.shmtu.auth.auth_user import UserItem
+
+        user_item_list = [UserItem(user_id=user_id, password=password) for user_id, password in user_list]
+        self._thread = self._thread_class(
+            user_item_list,
+            check_internet_interval=int(benchmark_settings["check_interval"]),
+            check_internet_retry_times=benchmark_settings["net_check_retry_times"],
+            check_internet_retry_wait_time=benchmark_settings["net_check_retry_wait_time"],
+        )
+        self._thread.daemon = True
+        self.wake_event = self._thread.wake_event
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._thread.stop()
+            self._thread.join(timeout=recovery_timeout)
+
+
+driver_dict: Dict[str, Callable[[], Driver]] = {
+    MonitorAuthDriver.name: MonitorAuthDriver,
+    AsyncMonitorAuthDriver.name: AsyncMonitorAuthDriver,
+    GuiWorkerDriver.name: GuiWorkerDriver,
+    AuthThreadDriver.name: AuthThreadDriver,
+}
+
+
+def percentile(value_list: List[float], percent: float) -> Optional[float]:
+    """
+    线性插值计算百分位数
+    :param value_list: 数据
+    :param percent: 0~100
+    :return: 百分位数，没有数据时返回None
+    """
+    if len(value_list) == 0:
+        return None
+    sorted_list = sorted(value_list)
+    position = (len(sorted_list) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_list) - 1)
+    return sorted_list[lower] + (sorted_list[upper] - sorted_list[lower]) * (position - lower)
+
+
+def get_rss_kb() -> int:
+    """当前进程的常驻内存，单位：KB"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def wait_until(condition: Callable[[], bool], timeout: float) -> Optional[float]:
+    """
+    等待条件成立
+    :return: 等待的时间，超时返回None
+    """
+    start_time = time.monotonic()
+    while True:
+        if condition():
+            return time.monotonic() - start_time
+        if time.monotonic() - start_time > timeout:
+            return None
+        time.sleep(poll_interval)
+
+
+def run_scenario(scenario: Scenario, driver_name: str, samples: int) -> dict:
+    """
+    运行一个场景
+    :param scenario: 场景
+    :param driver_name: 被测的检测循环
+    :param samples: 掉线次数
+    :return: 统计结果
+    """
+    result = {
+        "scenario": scenario.name,
+        "description": scenario.description,
+        "driver": driver_name,
+        "samples": samples,
+    }
+
+    try:
+        driver = driver_dict[driver_name]()
+    except ImportError as e:
+        result["skipped"] = f"{e}"
+        return result
+
+    recovery_list: List[float] = []
+    request_list: List[int] = []
+
+    simulator = EportalSimulator(scenario.config)
+    with tempfile.TemporaryDirectory() as data_dir, simulator:
+        with use_simulator(simulator, data_dir):
+            simulator.set_online(True)
+
+            cpu_start = time.process_time()
+            driver.start(scenario.user_list)
+
+            for _ in range(samples):
+                time.sleep(scenario.online_time)
+
+                request_start = simulator.total_request_count()
+                simulator.drop_auth()
+                if scenario.link_event and driver.wake_event is not None:
+                    driver.wake_event.set()
+
+                recovery_time = wait_until(simulator.is_online, recovery_timeout)
+                if recovery_time is not None:
+                    recovery_list.append(recovery_time)
+                    request_list.append(simulator.total_request_count() - request_start)
+
+            driver.stop()
+            cpu_time = time.process_time() - cpu_start
+
+    result.update(
+        {
+            "recovered": len(recovery_list),
+            "recovery_p50": percentile(recovery_list, 50),
+            "recovery_p95": percentile(recovery_list, 95),
+            "recovery_p99": percentile(recovery_list, 99),
+            "recovery_max": max(recovery_list) if len(recovery_list) > 0 else None,
+            "requests_per_recovery": (sum(request_list) / len(request_list)) if len(request_list) > 0 else None,
+            # 包含同一进程中的模拟服务器
+            "cpu_time": cpu_time,
+            "rss_kb": get_rss_kb(),
+            "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource is not None else None,
+        }
+    )
+    return result
+
+
+def run_benchmark(
+    scenario_name_list: Optional[List[str]] = None,
+    driver_name_list: Optional[List[str]] = None,
+    samples: int = 10,
+    seed: int = 0,
+) -> dict:
+    """
+    运行基准测试
+    :param scenario_name_list: 场景名称，默认全部
+    :param driver_name_list: 被测的检测循环，默认全部
+    :param samples: 每个场景的掉线次数
+    :param seed: 模拟服务器的随机数种子
+    :return: 可直接序列化为JSON的结果
+    """
+    scenario_list = get_scenario_list(seed)
+    if scenario_name_list is not None:
+        scenario_list = [scenario for scenario in scenario_list if scenario.name in scenario_name_list]
+    if driver_name_list is None:
+        driver_name_list = list(driver_dict.keys())
+
+    result_list = []
+    for scenario in scenario_list:
+        for driver_name in driver_name_list:
+            result_list.append(run_scenario(scenario, driver_name, samples))
+
+    return {
+        "version": 1,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "seed": seed,
+        "settings": benchmark_settings,
+        "results": result_list,
+    }
+
+
+def main():
+    scenario_name_list = [scenario.name for scenario in get_scenario_list()]
+
+    parser = argparse.ArgumentParser(description="End-to-end recovery benchmark for shmtu-auth")
+    parser.add_argument("--scenario", action="append", choices=scenario_name_list, help="Default: all scenarios")
+    parser.add_argument("--driver", action="append", choices=list(driver_dict.keys()), help="Default: all drivers")
+    parser.add_argument("--samples", type=int, default=10, help="Link losses per scenario")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="", help="Write JSON to this file instead of stdout")
+    args = parser.parse_args()
+
+    result = run_benchmark(args.scenario, args.driver, args.samples, args.seed)
+    result_str = json.dumps(result, indent=2, ensure_ascii=False)
+
+    if len(args.output) > 0:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(result_str)
+    else:
+        print(result_str)
+
+
+if __name__ == "__main__":
+    main()
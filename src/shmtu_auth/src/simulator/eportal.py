@@ -0,0 +1,421 @@
+"""
+本地锐捷eportal模拟服务器
+用于在没有校园网的环境下测试认证流程，以及可复现的性能测试
+
+提供:
+    /                               未认证时返回带 index.jsp?... 的跳转页面
+    /generate_204                   已认证返回204，未认证返回跳转页面(模拟劫持)
+    /eportal/InterFace.do?method=   login / logout / getOnlineUserInfo
+
+运行示例:
+    python -m shmtu_auth.src.simulator.eportal --port 8080 --latency 0.1 --failure-rate 0.05
+    SHMTU_AUTH_EPORTAL_URL=http://127.0.0.1:8080/eportal/InterFace.do?method=
+    SHMTU_AUTH_QUERY_STRING_URL=http://127.0.0.1:8080/
+    SHMTU_AUTH_PROBE_URL_LIST=http://127.0.0.1:8080/generate_204
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+LOGIN_SUCCESS_MESSAGE = ""
+LOGIN_FAIL_MESSAGE = "用户不存在或密码错误"
+QUERY_STRING_FAIL_MESSAGE = "认证参数已失效，请重新打开认证页面"
+LOGOUT_SUCCESS_MESSAGE = "下线成功！"
+
+
+class EportalSimulatorConfig:
+    """模拟服务器的行为配置，运行中修改立即生效"""
+
+    # 每个请求的基础延迟，单位：秒
+    latency: float
+    # 延迟的随机波动，单位：秒
+    latency_jitter: float
+    # 单独指定某类请求的延迟(redirect/probe/login/logout/info)
+    latency_dict: Dict[str, float]
+
+    # 直接断开连接的概率
+    failure_rate: float
+    # 返回格式错误内容的概率
+    malformed_rate: float
+
+    # 可以登录的账号 {学号: 密码}，为空时接受任意账号
+    user_dict: Dict[str, str]
+
+    # 认证成功后多久自动掉线，单位：秒，0表示不会掉线
+    auth_lifetime: float
+
+    # 随机数种子，相同种子得到相同的故障序列
+    seed: Optional[int]
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        latency_jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        malformed_rate: float = 0.0,
+        user_dict: Optional[Dict[str, str]] = None,
+        auth_lifetime: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.latency_dict = {}
+
+        self.failure_rate = failure_rate
+        self.malformed_rate = malformed_rate
+
+        self.user_dict = user_dict if user_dict is not None else {}
+
+        self.auth_lifetime = auth_lifetime
+
+        self.seed = seed
+
+
+class EportalSimulator:
+    """
+    模拟服务器
+    同时模拟认证网关(跳转页面、204劫持)与认证接口，状态在所有请求间共享
+    """
+
+    config: EportalSimulatorConfig
+
+    host: str
+    port: int
+
+    # 当前客户端的地址参数，变化后旧的Query String会被拒绝
+    wlan_user_ip: str
+
+    is_authenticated: bool
+    auth_time: float
+    online_user_id: str
+
+    # 各类请求的计数
+    request_count: Dict[str, int]
+
+    def __init__(self, config: Optional[EportalSimulatorConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config if config is not None else EportalSimulatorConfig()
+
+        self.host = host
+        self.port = port
+
+        self.wlan_user_ip = "10.1.2.3"
+
+        self.is_authenticated = False
+        self.auth_time = 0.0
+        self.online_user_id = ""
+
+        self.request_count = {}
+
+        self._lock = threading.Lock()
+        self._random = random.Random(self.config.seed)
+
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    # 地址
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def interface_url(self) -> str:
+        """对应EPORTAL_INTERFACE_URL"""
+        return f"{self.base_url}/eportal/InterFace.do?method="
+
+    @property
+    def query_string_url(self) -> str:
+        """对应QUERY_STRING_URL"""
+        return f"{self.base_url}/"
+
+    @property
+    def probe_url(self) -> str:
+        return f"{self.base_url}/generate_204"
+
+    # 状态
+
+    @property
+    def raw_query_string(self) -> str:
+        return urlencode(
+            {
+                "wlanuserip": self.wlan_user_ip,
+                "wlanacname": "shmtu-ac",
+                "nasip": "172.16.0.2",
+                "mac": "001122334455",
+            }
+        )
+
+    @property
+    def query_string(self) -> str:
+        """客户端解析后应该提交的Query String"""
+        return self.raw_query_string.replace("&", "%26").replace("=", "%3D")
+
+    def is_online(self) -> bool:
+        with self._lock:
+            return self._is_online()
+
+    def _is_online(self) -> bool:
+        if not self.is_authenticated:
+            return False
+        if self.config.auth_lifetime > 0 and time.monotonic() - self.auth_time > self.config.auth_lifetime:
+            self.is_authenticated = False
+            self.online_user_id = ""
+            return False
+        return True
+
+    def set_online(self, is_online: bool, user_id: str = "") -> None:
+        with self._lock:
+            self.is_authenticated = is_online
+            self.auth_time = time.monotonic()
+            self.online_user_id = user_id if is_online else ""
+
+    def drop_auth(self) -> None:
+        """模拟掉线(重新被劫持)"""
+        self.set_online(False)
+
+    def change_address(self, wlan_user_ip: str) -> None:
+        """模拟IP变化，之前的Query String随之失效"""
+        with self._lock:
+            self.wlan_user_ip = wlan_user_ip
+            self.is_authenticated = False
+            self.online_user_id = ""
+
+    def reset_request_count(self) -> None:
+        with self._lock:
+            self.request_count = {}
+
+    def total_request_count(self) -> int:
+        with self._lock:
+            return sum(self.request_count.values())
+
+    # 行为
+
+    def _count(self, kind: str) -> None:
+        with self._lock:
+            self.request_count[kind] = self.request_count.get(kind, 0) + 1
+
+    def _delay(self, kind: str) -> None:
+        latency = self.config.latency_dict.get(kind, self.config.latency)
+        if self.config.latency_jitter > 0:
+            with self._lock:
+                latency += self._random.uniform(0, self.config.latency_jitter)
+        if latency > 0:
+            time.sleep(latency)
+
+    def _roll(self, rate: float) -> bool:
+        if rate <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < rate
+
+    def redirect_page(self) -> str:
+        return f"<script>top.self.location.href='{self.base_url}/eportal/index.jsp?{self.raw_query_string}'</script>\n"
+
+    def handle_login(self, form: Dict[str, str]) -> dict:
+        user_id = form.get("userId", "")
+        password = form.get("password", "")
+        query_string = form.get("queryString", "")
+
+        with self._lock:
+            if query_string != self.query_string:
+                return {"userIndex": "", "result": "fail", "message": QUERY_STRING_FAIL_MESSAGE}
+
+            user_dict = self.config.user_dict
+            if len(user_id) == 0 or (len(user_dict) > 0 and user_dict.get(user_id) != password):
+                return {"userIndex": "", "result": "fail", "message": LOGIN_FAIL_MESSAGE}
+
+            self.is_authenticated = True
+            self.auth_time = time.monotonic()
+            self.online_user_id = user_id
+
+        return {"userIndex": f"sim_{user_id}", "result": "success", "message": LOGIN_SUCCESS_MESSAGE}
+
+    def handle_logout(self) -> dict:
+        self.set_online(False)
+        return {"userIndex": "", "result": "success", "message": LOGOUT_SUCCESS_MESSAGE}
+
+    def handle_info(self) -> dict:
+        with self._lock:
+            is_online = self._is_online()
+            user_id = self.online_user_id
+        if not is_online:
+            return {"result": "fail", "message": "用户未在线"}
+        return {"result": "success", "userId": user_id, "userName": f"User_{user_id}", "userIp": self.wlan_user_ip}
+
+    # 服务器
+
+    def start(self) -> "EportalSimulator":
+        self._server = ThreadingHTTPServer((self.host, self.port), self._create_handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            kwargs={"poll_interval": 0.1},
+            name="eportal-simulator",
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=3)
+        self._server = None
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _create_handler(self):
+        simulator = self
+
+        class EportalHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                self.handle_request({})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length).decode("utf-8", errors="replace")
+                form = {key: value[0] for key, value in parse_qs(body, keep_blank_values=True).items()}
+                self.handle_request(form)
+
+            def handle_request(self, form: Dict[str, str]):
+                url = urlsplit(self.path)
+
+                if url.path.endswith("/InterFace.do"):
+                    kind = {
+                        "login": "login",
+                        "logout": "logout",
+                        "getOnlineUserInfo": "info",
+                    }.get(url.query.replace("method=", "", 1), "unknown")
+                elif url.path.endswith("/generate_204"):
+                    kind = "probe"
+                else:
+                    kind = "redirect"
+
+                simulator._count(kind)
+                simulator._delay(kind)
+
+                if simulator._roll(simulator.config.failure_rate):
+                    # 不返回任何内容直接断开，客户端得到ConnectionError
+                    self.close_connection = True
+                    return
+
+                is_malformed = simulator._roll(simulator.config.malformed_rate)
+
+                if kind == "probe":
+                    if simulator.is_online() and not is_malformed:
+                        self.send_content(204, "", "text/plain")
+                    else:
+                        # 网关劫持，返回跳转页面
+                        self.send_content(200, simulator.redirect_page(), "text/html")
+                elif kind == "redirect":
+                    if is_malformed:
+                        self.send_content(200, "<html><script>top.self.location.href=", "text/html")
+                    elif simulator.is_online():
+                        self.send_content(200, "<html><body>Shanghai Maritime University</body></html>", "text/html")
+                    else:
+                        self.send_content(200, simulator.redirect_page(), "text/html")
+                elif kind == "unknown":
+                    self.send_content(404, json.dumps({"result": "fail", "message": "unknown method"}), "application/json")
+                else:
+                    if is_malformed:
+                        self.send_content(502, "<html><body>502 Bad Gateway</body></html>", "text/html")
+                        return
+
+                    if kind == "login":
+                        result = simulator.handle_login(form)
+                    elif kind == "logout":
+                        result = simulator.handle_logout()
+                    else:
+                        result = simulator.handle_info()
+                    self.send_content(200, json.dumps(result, ensure_ascii=False), "application/json")
+
+            def send_content(self, status: int, content: str, content_type: str):
+                data = content.encode("utf-8")
+                self.send_response(status)
+                if status != 204:
+                    self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+                    self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                if status != 204:
+                    self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return EportalHandler
+
+
+def parse_user_list(user_list_str: str) -> Dict[str, str]:
+    """
+    解析 学号1,密码1;学号2,密码2 形式的账号列表
+    """
+    user_dict = {}
+    for item in user_list_str.split(";"):
+        item = item.strip()
+        if len(item) == 0 or "," not in item:
+            continue
+        user_id, password = item.split(",", 1)
+        user_dict[user_id.strip()] = password.strip()
+    return user_dict
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local eportal simulator for shmtu-auth")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0, help="Base latency of every request(s)")
+    parser.add_argument("--latency-jitter", type=float, default=0.0, help="Random extra latency(s)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Probability of dropping the connection")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Probability of a malformed response")
+    parser.add_argument("--users", default="", help="Accepted accounts, e.g. id1,pwd1;id2,pwd2")
+    parser.add_argument("--auth-lifetime", type=float, default=0.0, help="Drop authentication after N seconds")
+    parser.add_argument("--online", action="store_true", help="Start in authenticated state")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    config = EportalSimulatorConfig(
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        failure_rate=args.failure_rate,
+        malformed_rate=args.malformed_rate,
+        user_dict=parse_user_list(args.users),
+        auth_lifetime=args.auth_lifetime,
+        seed=args.seed,
+    )
+
+    simulator = EportalSimulator(config, args.host, args.port).start()
+    if args.online:
+        simulator.set_online(True)
+
+    print("Eportal simulator started.")
+    print(f"SHMTU_AUTH_EPORTAL_URL={simulator.interface_url}")
+    print(f"SHMTU_AUTH_QUERY_STRING_URL={simulator.query_string_url}")
+    print(f"SHMTU_AUTH_PROBE_URL_LIST={simulator.probe_url}")
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulator.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+测试端到端恢复时间基准测试
+
+运行示例:
+    python -m pytest src/shmtu_auth/src/simulator/test_benchmark.py -v
+    python -m pytest src/shmtu_auth/src/simulator/test_benchmark.py -m "not slow"
+"""
+
+import json
+
+import pytest
+
+from shmtu_auth.src.simulator.benchmark import percentile, run_benchmark
+
+
+class TestBenchmark:
+    """基准测试工具测试类"""
+
+    def test_percentile(self):
+        """线性插值百分位数"""
+        assert percentile([], 50) is None
+        assert percentile([3.0], 99) == 3.0
+        assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.5
+        assert percentile([4.0, 1.0, 3.0, 2.0], 100) == 4.0
+
+    @pytest.mark.slow
+    def test_single_account(self):
+        """单账号场景能够恢复，结果可以序列化"""
+        result = run_benchmark(["single_account"], ["monitor_auth"], samples=1)
+        item = result["results"][0]
+        assert item["recovered"] == 1
+        assert item["recovery_p50"] < 10
+        assert item["requests_per_recovery"] > 0
+        json.dumps(result)
+
+    @pytest.mark.slow
+    def test_async_monitor(self):
+        """使用asyncio引擎的检测循环能够恢复"""
+        pytest.importorskip("aiohttp")
+        result = run_benchmark(["single_account"], ["monitor_auth_async"], samples=1)
+        item = result["results"][0]
+        assert "skipped" not in item
+        assert item["recovered"] == 1
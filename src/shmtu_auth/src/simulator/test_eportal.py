@@ -0,0 +1,78 @@
+"""
+测试本地eportal模拟服务器(同时验证认证流程，无需访问外网)
+
+运行示例:
+    python -m pytest src/shmtu_auth/src/simulator/test_eportal.py -v
+"""
+
+import time
+
+from shmtu_auth.src.core.connectivity_probe import probe_connectivity, probe_url
+from shmtu_auth.src.core.get_query_string_requests import get_query_string_by_url
+
+
+class TestEportalSimulator:
+    """eportal模拟服务器测试类"""
+
+    def test_captive_probe(self, simulator):
+        """未认证时204地址被劫持"""
+        assert probe_url(simulator.probe_url) == 200
+        simulator.set_online(True)
+        assert probe_url(simulator.probe_url) == 204
+
+    def test_query_string(self, simulator):
+        """从跳转页面解析Query String"""
+        assert get_query_string_by_url() == simulator.query_string
+
+    def test_login(self, simulator, create_net_auth, simulator_user):
+        """完整的登录流程"""
+        user_id, password = simulator_user
+        net_auth = create_net_auth(net_status=False)
+        assert net_auth.login(user_id, password) == (True, "Login Success")
+        assert simulator.is_online()
+        assert simulator.online_user_id == user_id
+
+        assert net_auth.logout()[0]
+        assert not simulator.is_online()
+
+    def test_login_by_list(self, create_net_auth, simulator_user):
+        """错误的账号失败后使用下一个账号"""
+        user_id, password = simulator_user
+        net_auth = create_net_auth(net_status=False)
+        assert net_auth.login_by_list(
+            [("202412300002", "wrong", False), (user_id, password, False)],
+            sort_by_health=False,
+        )
+        assert [attempt.is_success for attempt in net_auth.last_login_attempts] == [False, True]
+
+    def test_address_changed(self, simulator, create_net_auth, simulator_user):
+        """IP变化后缓存的Query String被拒绝，重新获取后登录成功"""
+        user_id, password = simulator_user
+        net_auth = create_net_auth(net_status=False)
+        assert net_auth.login(user_id, password)[0]
+
+        simulator.change_address("10.1.2.4")
+        net_auth.update_net_status(False)
+        assert net_auth.login(user_id, password) == (True, "Login Success")
+
+    def test_malformed(self, simulator, create_net_auth, simulator_user):
+        """格式错误的响应不会导致异常"""
+        user_id, password = simulator_user
+        simulator.config.malformed_rate = 1
+        net_auth = create_net_auth(net_status=False)
+        is_success, _ = net_auth.login(user_id, password, net_status=False)
+        assert not is_success
+
+    def test_latency(self, simulator):
+        """延迟配置生效"""
+        simulator.config.latency_dict["probe"] = 0.2
+        start_time = time.monotonic()
+        result = probe_connectivity([simulator.probe_url], timeout=1, deadline=1)
+        assert time.monotonic() - start_time >= 0.2
+        assert not result.is_connected
+
+    def test_failure(self, simulator):
+        """断开连接被视为请求失败"""
+        simulator.config.failure_rate = 1
+        assert probe_url(simulator.probe_url) == 0
+        assert simulator.request_count["probe"] == 1
@@ -0,0 +1,227 @@
+"""
+结构化事件日志
+
+认证相关的事件(联网检测、状态变化、登录尝试、WebHook推送)
+同时输出一行可读的日志，并以JSON Lines格式写入日志目录下的events.jsonl
+文件按大小与日期轮转并压缩，由loguru的后台线程写入(enqueue)，不阻塞认证线程
+"""
+
+import datetime
+import json
+import os
+from typing import Any, Dict
+
+from shmtu_auth.src.config.project_directory import get_directory_log_path
+from shmtu_auth.src.utils.env import get_env_bool, get_env_int, get_env_str
+from shmtu_auth.src.utils.logs import get_logger
+from shmtu_auth.src.utils.program_env_config import convert_number_to_star
+
+logger = get_logger()
+
+# 是否写入事件日志文件
+event_log_enable = get_env_bool("SHMTU_AUTH_EVENT_LOG", True)
+# 事件日志文件路径
+event_log_path = os.path.join(get_directory_log_path(), "events.jsonl")
+# 单个文件的最大大小，单位：MB
+event_log_max_size = 10
+# 轮转后的文件保留时间
+event_log_retention = "30 days"
+
+env_event_log_path = get_env_str("SHMTU_AUTH_EVENT_LOG_PATH", "")
+if len(env_event_log_path) > 0:
+    event_log_path = env_event_log_path
+
+env_event_log_max_size = get_env_int("SHMTU_AUTH_EVENT_LOG_MAX_SIZE", -1)
+if env_event_log_max_size > 0:
+    event_log_max_size = env_event_log_max_size
+
+env_event_log_retention = get_env_str("SHMTU_AUTH_EVENT_LOG_RETENTION", "")
+if len(env_event_log_retention) > 0:
+    event_log_retention = env_event_log_retention
+
+
+class Event:
+    """事件基类，子类的注解字段会被写入JSON"""
+
+    event_type = "event"
+
+    def get_level(self) -> str:
+        return "INFO"
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {"event": self.event_type}
+        data.update(vars(self))
+        return data
+
+    def describe(self) -> str:
+        """可读的日志内容"""
+        return self.event_type
+
+
+class ProbeEvent(Event):
+    event_type = "probe"
+
+    is_connected: bool
+    success_count: int
+    finished_count: int
+    elapsed: float
+
+    def __init__(self, is_connected: bool, success_count: int, finished_count: int, elapsed: float):
+        self.is_connected = is_connected
+        self.success_count = success_count
+        self.finished_count = finished_count
+        self.elapsed = round(elapsed, 6)
+
+    def get_level(self) -> str:
+        return "DEBUG"
+
+    def describe(self) -> str:
+        return (
+            f"Connectivity probe: connected={self.is_connected}, "
+            f"success={self.success_count}/{self.finished_count}, elapsed={self.elapsed:.3f}s"
+        )
+
+
+class StateChangeEvent(Event):
+    event_type = "state_change"
+
+    is_online: bool
+    previous: bool
+
+    def __init__(self, is_online: bool, previous: bool):
+        self.is_online = is_online
+        self.previous = previous
+
+    def describe(self) -> str:
+        return f"Network Auth Status: {self.previous} -> {self.is_online}"
+
+
+class LoginAttemptEvent(Event):
+    event_type = "login_attempt"
+
+    account: str
+    is_success: bool
+    message: str
+    latency: float
+
+    def __init__(self, user_id: str, is_success: bool, message: str, latency: float):
+        # 学号脱敏后再写入
+        self.account = convert_number_to_star(user_id)
+        self.is_success = is_success
+        self.message = message
+        self.latency = round(latency, 6)
+
+    def get_level(self) -> str:
+        return "INFO" if self.is_success else "ERROR"
+
+    def describe(self) -> str:
+        if self.is_success:
+            return f"Login success:{self.account}({self.latency:.3f}s)"
+        return f"Login failed:{self.account}({self.latency:.3f}s) {self.message}"
+
+
+class WebhookDeliveryEvent(Event):
+    event_type = "webhook_delivery"
+
+    channel: str
+    is_success: bool
+    status_code: int
+    latency: float
+    error: str
+
+    def __init__(self, channel: str, is_success: bool, status_code: int, latency: float, error: str = ""):
+        self.channel = channel
+        self.is_success = is_success
+        self.status_code = status_code
+        self.latency = round(latency, 6)
+        self.error = error
+
+    def get_level(self) -> str:
+        return "INFO" if self.is_success else "ERROR"
+
+    def describe(self) -> str:
+        result = "success" if self.is_success else f"failed {self.error}".rstrip()
+        return f"WebHook {self.channel} delivery {result}: status={self.status_code}({self.latency:.3f}s)"
+
+
+class EventLogRotation:
+    """达到最大大小或日期变化时轮转"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._date = None
+
+    def __call__(self, message, file) -> bool:
+        date = message.record["time"].date()
+        if self._date is None:
+            self._date = date
+
+        if date != self._date:
+            self._date = date
+            return True
+
+        file.seek(0, 2)
+        return file.tell() + len(message) > self.max_size
+
+
+def _format_event(record) -> str:
+    # format函数的返回值会再被当作模板格式化，因此JSON放在extra中引用
+    return "{extra[event_json]}\n"
+
+
+def _filter_event(record) -> bool:
+    return "event_json" in record["extra"]
+
+
+_sink_id = -1
+
+
+def start_event_log(path: str = "") -> int:
+    """
+    添加事件日志文件输出(重复调用只添加一次)
+    :param path: 文件路径，默认使用SHMTU_AUTH_EVENT_LOG_PATH
+    :return: loguru的sink id
+    """
+    global _sink_id
+
+    if _sink_id >= 0:
+        return _sink_id
+
+    if len(path) == 0:
+        path = event_log_path
+
+    _sink_id = logger.add(
+        path,
+        format=_format_event,
+        filter=_filter_event,
+        rotation=EventLogRotation(event_log_max_size * 1024 * 1024),
+        retention=event_log_retention,
+        compression="gz",
+        enqueue=True,
+        encoding="utf-8",
+    )
+    return _sink_id
+
+
+def stop_event_log() -> None:
+    """移除事件日志输出，并等待队列中的事件写完"""
+    global _sink_id
+
+    if _sink_id < 0:
+        return
+    logger.remove(_sink_id)
+    _sink_id = -1
+
+
+def emit_event(event: Event) -> None:
+    """
+    记录一个事件
+    :param event: 事件
+    """
+    data = {"time": datetime.datetime.now().astimezone().isoformat(timespec="milliseconds")}
+    data.update(event.to_dict())
+    logger.opt(depth=1).bind(event_json=json.dumps(data, ensure_ascii=False)).log(event.get_level(), event.describe())
+
+
+if event_log_enable:
+    start_event_log()
@@ -0,0 +1,409 @@
+"""
+Prometheus文本格式的指标导出(无第三方依赖)
+
+设置 SHMTU_AUTH_METRICS_PORT 后在 http://<host>:<port>/metrics 提供指标
+"""
+
+import bisect
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from shmtu_auth.src.utils.env import get_env_int, get_env_str
+from shmtu_auth.src.utils.logs import get_logger
+from shmtu_auth.src.utils.program_env_config import convert_number_to_star
+
+logger = get_logger()
+
+# 指标端口，0表示不启动
+metrics_port = 0
+# 监听地址
+metrics_host = "0.0.0.0"
+
+env_metrics_port = get_env_int("SHMTU_AUTH_METRICS_PORT", -1)
+if env_metrics_port > 0:
+    metrics_port = env_metrics_port
+
+env_metrics_host = get_env_str("SHMTU_AUTH_METRICS_HOST", "")
+if len(env_metrics_host) > 0:
+    metrics_host = env_metrics_host
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def format_labels(label_names: Sequence[str], label_values: Sequence[str]) -> str:
+    if len(label_names) == 0:
+        return ""
+    pair_list = [f'{name}="{escape_label_value(str(value))}"' for name, value in zip(label_names, label_values)]
+    return "{" + ",".join(pair_list) + "}"
+
+
+class Metric:
+    """指标基类"""
+
+    metric_type = "untyped"
+
+    name: str
+    help: str
+    label_names: Tuple[str, ...]
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+
+        self._lock = threading.Lock()
+
+    def _label_values(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels.keys()) != set(self.label_names):
+            raise ValueError(f"Metric {self.name} expects labels {self.label_names}, got {tuple(labels.keys())}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def samples(self) -> List[Tuple[str, LabelValues, Tuple[str, ...], float]]:
+        """
+        :return: (后缀, 标签值, 额外标签(名=值), 数值)列表
+        """
+        raise NotImplementedError
+
+    def render(self) -> str:
+        # text格式0.0.4中计数器的TYPE行需要与样本名(带_total)一致
+        family_name = self.name + ("_total" if self.metric_type == "counter" else "")
+        line_list = [
+            f"# HELP {family_name} {self.help}",
+            f"# TYPE {family_name} {self.metric_type}",
+        ]
+        for suffix, label_values, extra_labels, value in self.samples():
+            label_names = self.label_names + tuple(item.split("=", 1)[0] for item in extra_labels)
+            label_values = label_values + tuple(item.split("=", 1)[1] for item in extra_labels)
+            line_list.append(f"{self.name}{suffix}{format_labels(label_names, label_values)} {format_value(value)}")
+        return "\n".join(line_list) + "\n"
+
+
+class Counter(Metric):
+    metric_type = "counter"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        super().__init__(name, help_text, label_names)
+        self._value_dict: Dict[LabelValues, float] = {}
+
+    def inc(self, value: float = 1, **labels) -> None:
+        if value < 0:
+            raise ValueError("Counter can only increase")
+        key = self._label_values(labels)
+        with self._lock:
+            self._value_dict[key] = self._value_dict.get(key, 0.0) + value
+
+    def get(self, **labels) -> float:
+        with self._lock:
+            return self._value_dict.get(self._label_values(labels), 0.0)
+
+    def samples(self):
+        with self._lock:
+            return [("_total", key, (), value) for key, value in self._value_dict.items()]
+
+
+class Gauge(Metric):
+    metric_type = "gauge"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        super().__init__(name, help_text, label_names)
+        self._value_dict: Dict[LabelValues, float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._value_dict[key] = float(value)
+
+    def inc(self, value: float = 1, **labels) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._value_dict[key] = self._value_dict.get(key, 0.0) + value
+
+    def dec(self, value: float = 1, **labels) -> None:
+        self.inc(-value, **labels)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """导出时调用function获取数值(仅适用于无标签的指标)"""
+        self._function = function
+
+    def get(self, **labels) -> float:
+        if self._function is not None:
+            return float(self._function())
+        with self._lock:
+            return self._value_dict.get(self._label_values(labels), 0.0)
+
+    def samples(self):
+        if self._function is not None:
+            try:
+                return [("", (), (), float(self._function()))]
+            except Exception:
+                return []
+        with self._lock:
+            return [("", key, (), value) for key, value in self._value_dict.items()]
+
+
+class Histogram(Metric):
+    metric_type = "histogram"
+
+    buckets: Tuple[float, ...]
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # 标签值 -> (每个桶的计数, 总和, 总数)
+        self._value_dict: Dict[LabelValues, Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._label_values(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            bucket_list, total, count = self._value_dict.get(key, ([0] * len(self.buckets), 0.0, 0))
+            if index < len(bucket_list):
+                bucket_list[index] += 1
+            self._value_dict[key] = (bucket_list, total + value, count + 1)
+
+    def get_count(self, **labels) -> int:
+        with self._lock:
+            item = self._value_dict.get(self._label_values(labels))
+        return item[2] if item is not None else 0
+
+    def samples(self):
+        sample_list = []
+        with self._lock:
+            for key, (bucket_list, total, count) in self._value_dict.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, bucket_list):
+                    cumulative += bucket_count
+                    sample_list.append(("_bucket", key, (f"le={format_value(bound)}",), cumulative))
+                sample_list.append(("_bucket", key, ("le=+Inf",), count))
+                sample_list.append(("_sum", key, (), total))
+                sample_list.append(("_count", key, (), count))
+        return sample_list
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metric_dict: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metric_dict:
+                raise ValueError(f"Duplicated metric: {metric.name}")
+            self._metric_dict[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help_text, label_names))
+
+    def gauge(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help_text, label_names))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, help_text, label_names, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metric_list = list(self._metric_dict.values())
+        return "".join(metric.render() for metric in metric_list)
+
+
+registry = MetricsRegistry()
+
+probe_duration = registry.histogram(
+    "shmtu_auth_probe_duration_seconds",
+    "Latency of connectivity probe requests.",
+    ["url", "result"],
+)
+login_attempts = registry.counter(
+    "shmtu_auth_login_attempts",
+    "Login attempts per masked account and outcome.",
+    ["account", "result"],
+)
+login_duration = registry.histogram(
+    "shmtu_auth_login_duration_seconds",
+    "Latency of login attempts per masked account.",
+    ["account"],
+)
+online_state = registry.gauge(
+    "shmtu_auth_online",
+    "Whether the network is authenticated (1) or not (0).",
+)
+last_success_timestamp = registry.gauge(
+    "shmtu_auth_last_success_timestamp_seconds",
+    "Unix time of the last successful login.",
+)
+seconds_since_last_success = registry.gauge(
+    "shmtu_auth_seconds_since_last_success",
+    "Seconds since the last successful login, -1 if never.",
+)
+cycle_duration = registry.histogram(
+    "shmtu_auth_check_cycle_duration_seconds",
+    "Duration of one check-and-login cycle.",
+    ["loop"],
+)
+webhook_queue_depth = registry.gauge(
+    "shmtu_auth_webhook_queue_depth",
+    "Messages waiting to be sent by each webhook or notifier queue.",
+    ["queue"],
+)
+webhook_send_duration = registry.histogram(
+    "shmtu_auth_webhook_send_duration_seconds",
+    "Latency of webhook deliveries.",
+    ["channel", "result"],
+)
+
+_last_success_time = 0.0
+
+
+def _get_seconds_since_last_success() -> float:
+    if _last_success_time <= 0:
+        return -1
+    return time.time() - _last_success_time
+
+
+seconds_since_last_success.set_function(_get_seconds_since_last_success)
+
+
+def record_probe(url: str, status_code: int, elapsed: float) -> None:
+    result = "success" if status_code == 204 else ("error" if status_code == 0 else "captive")
+    probe_duration.observe(elapsed, url=url, result=result)
+
+
+def record_login(user_id: str, result: str, elapsed: float) -> None:
+    """
+    记录一次登录尝试
+    :param user_id: 学号(导出时脱敏)
+    :param result: success/failure/error(网络错误等与账号无关的失败)
+    :param elapsed: 耗时，单位：秒
+    """
+    global _last_success_time
+
+    account = convert_number_to_star(user_id)
+    login_attempts.inc(account=account, result=result)
+    login_duration.observe(elapsed, account=account)
+
+    if result == "success":
+        _last_success_time = time.time()
+        last_success_timestamp.set(_last_success_time)
+        online_state.set(1)
+
+
+def set_online(is_online: bool) -> None:
+    online_state.set(1 if is_online else 0)
+
+
+def record_cycle(loop: str, elapsed: float) -> None:
+    cycle_duration.observe(elapsed, loop=loop)
+
+
+def record_webhook_send(channel: str, is_success: bool, elapsed: float) -> None:
+    webhook_send_duration.observe(elapsed, channel=channel, result="success" if is_success else "failure")
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        data = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int = -1, host: str = "") -> Optional[ThreadingHTTPServer]:
+    """
+    启动指标服务(重复调用只启动一次)
+    :param port: 端口，默认使用SHMTU_AUTH_METRICS_PORT，为0时不启动
+    :param host: 监听地址，默认使用SHMTU_AUTH_METRICS_HOST
+    :return: 服务器，未启动时返回None
+    """
+    global _server
+
+    if port < 0:
+        port = metrics_port
+    if len(host) == 0:
+        host = metrics_host
+
+    with _server_lock:
+        if _server is not None:
+            return _server
+        if port == 0:
+            return None
+
+        try:
+            server = ThreadingHTTPServer((host, port), MetricsHandler)
+        except OSError as e:
+            logger.error(f"Failed to start metrics server on {host}:{port}: {e}")
+            return None
+
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+        _server = server
+
+    logger.info(f"Metrics server started on http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+def stop_metrics_server() -> None:
+    global _server
+
+    with _server_lock:
+        if _server is None:
+            return
+        _server.shutdown()
+        _server.server_close()
+        _server = None
+
+
+if __name__ == "__main__":
+    set_online(True)
+    record_login("202412300001", "success", 0.2)
+    print(registry.render())
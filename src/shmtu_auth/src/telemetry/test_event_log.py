@@ -0,0 +1,87 @@
+"""
+测试结构化事件日志
+
+运行示例:
+    python -m pytest src/shmtu_auth/src/telemetry/test_event_log.py -v
+"""
+
+import datetime
+import io
+import json
+import os
+
+from shmtu_auth.src.telemetry import event_log
+from shmtu_auth.src.telemetry.event_log import (
+    EventLogRotation,
+    LoginAttemptEvent,
+    ProbeEvent,
+    WebhookDeliveryEvent,
+    emit_event,
+)
+from shmtu_auth.src.utils.logs import get_logger
+
+logger = get_logger()
+
+
+class FakeMessage(str):
+    record: dict
+
+
+def create_message(text: str, time: datetime.datetime) -> FakeMessage:
+    message = FakeMessage(text)
+    message.record = {"time": time}
+    return message
+
+
+class TestEventLog:
+    """事件日志测试类"""
+
+    def test_login_event(self):
+        """登录事件中的学号被脱敏"""
+        event = LoginAttemptEvent("202412300001", False, "密码错误", 0.1234567)
+        data = event.to_dict()
+        assert data == {
+            "event": "login_attempt",
+            "account": "2024*****001",
+            "is_success": False,
+            "message": "密码错误",
+            "latency": 0.123457,
+        }
+        assert event.get_level() == "ERROR"
+        assert "202412300001" not in event.describe()
+
+    def test_write(self, tmp_path):
+        """事件以JSON Lines写入文件，普通日志不会写入"""
+        path = os.path.join(tmp_path, "events.jsonl")
+        sink_id = logger.add(
+            path,
+            format=event_log._format_event,
+            filter=event_log._filter_event,
+            enqueue=True,
+            encoding="utf-8",
+        )
+        try:
+            emit_event(ProbeEvent(True, 1, 2, 0.05))
+            logger.info("not an event {braces}")
+            emit_event(WebhookDeliveryEvent("wework", True, 200, 0.2))
+        finally:
+            logger.remove(sink_id)
+
+        with open(path, encoding="utf-8") as f:
+            data_list = [json.loads(line) for line in f]
+
+        assert [data["event"] for data in data_list] == ["probe", "webhook_delivery"]
+        assert data_list[0]["success_count"] == 1
+        assert data_list[1]["status_code"] == 200
+        assert datetime.datetime.fromisoformat(data_list[0]["time"]).tzinfo is not None
+
+    def test_rotation(self):
+        """超过大小或日期变化时轮转"""
+        rotation = EventLogRotation(max_size=10)
+        day = datetime.datetime(2024, 1, 1, 12)
+        file = io.StringIO()
+
+        assert not rotation(create_message("12345", day), file)
+        file.write("12345")
+        assert rotation(create_message("123456", day), file)
+        assert rotation(create_message("1", day + datetime.timedelta(days=1)), io.StringIO())
@@ -0,0 +1,92 @@
+"""
+测试Prometheus指标导出
+
+运行示例:
+    python -m pytest src/shmtu_auth/src/telemetry/test_metrics.py -v
+"""
+
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+import requests
+
+from shmtu_auth.src.telemetry import metrics
+from shmtu_auth.src.telemetry.metrics import MetricsRegistry
+
+
+class TestMetrics:
+    """指标测试类"""
+
+    def test_counter(self):
+        """计数器按标签累加并输出_total样本"""
+        registry = MetricsRegistry()
+        counter = registry.counter("test_requests", "Requests.", ["result"])
+        counter.inc(result="success")
+        counter.inc(2, result="success")
+        counter.inc(result="failure")
+
+        text = registry.render()
+        assert "# TYPE test_requests_total counter" in text
+        assert 'test_requests_total{result="success"} 3' in text
+        assert 'test_requests_total{result="failure"} 1' in text
+
+        with pytest.raises(ValueError):
+            counter.inc(-1, result="success")
+        with pytest.raises(ValueError):
+            counter.inc(other="x")
+
+    def test_histogram(self):
+        """直方图的桶为累计计数"""
+        registry = MetricsRegistry()
+        histogram = registry.histogram("test_duration_seconds", "Duration.", buckets=(0.1, 1.0))
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+
+        text = registry.render()
+        assert 'test_duration_seconds_bucket{le="0.1"} 1' in text
+        assert 'test_duration_seconds_bucket{le="1"} 2' in text
+        assert 'test_duration_seconds_bucket{le="+Inf"} 3' in text
+        assert "test_duration_seconds_sum 5.55" in text
+        assert "test_duration_seconds_count 3" in text
+
+    def test_gauge_function(self):
+        """回调型的仪表盘在导出时取值"""
+        registry = MetricsRegistry()
+        gauge = registry.gauge("test_value", "Value.")
+        gauge.set_function(lambda: 42)
+        assert "test_value 42" in registry.render()
+
+    def test_label_escape(self):
+        """标签值中的特殊字符被转义"""
+        registry = MetricsRegistry()
+        gauge = registry.gauge("test_escape", "Escape.", ["url"])
+        gauge.set(1, url='a"b\\c')
+        assert 'test_escape{url="a\\"b\\\\c"} 1' in registry.render()
+
+    def test_record_login(self):
+        """登录结果按脱敏后的账号统计"""
+        metrics.record_login("202412300001", "success", 0.1)
+        assert metrics.login_attempts.get(account="2024*****001", result="success") >= 1
+        assert metrics.online_state.get() == 1
+        assert 0 <= metrics.seconds_since_last_success.get() < 60
+        assert "202412300001" not in metrics.registry.render()
+
+    def test_server(self):
+        """HTTP服务输出指标"""
+        assert metrics.start_metrics_server(port=0) is None
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), metrics.MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            base_url = f"http://127.0.0.1:{server.server_address[1]}"
+            response = requests.get(base_url + "/metrics", timeout=5)
+            assert response.status_code == 200
+            assert response.headers["Content-Type"] == metrics.CONTENT_TYPE
+            assert "# TYPE shmtu_auth_online gauge" in response.text
+
+            assert requests.get(base_url + "/other", timeout=5).status_code == 404
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,111 @@
+"""
+测试Span追踪
+
+运行示例:
+    python -m pytest src/shmtu_auth/src/telemetry/test_tracing.py -v
+"""
+
+import json
+import os
+
+import pytest
+
+from shmtu_auth.src.telemetry import tracing
+from shmtu_auth.src.telemetry.tracing import (
+    OtlpJsonFileSpanSink,
+    RingBufferSpanSink,
+    span,
+    traced,
+)
+
+
+@pytest.fixture
+def sink():
+    last_sink_list = tracing._sink_list
+    ring_buffer_sink = RingBufferSpanSink(size=16)
+    tracing.set_sinks([ring_buffer_sink])
+    yield ring_buffer_sink
+    tracing.set_sinks(last_sink_list)
+
+
+class TestTracing:
+    """Span追踪测试类"""
+
+    def test_disabled(self):
+        """未启用时返回空Span，不记录任何内容"""
+        last_sink_list = tracing._sink_list
+        tracing.set_sinks([])
+        try:
+            with span("test") as current_span:
+                current_span.set_attribute("key", "value")
+            assert current_span is tracing._noop_span
+            assert tracing.get_current_span() is None
+        finally:
+            tracing.set_sinks(last_sink_list)
+
+    def test_nested(self, sink):
+        """嵌套的Span共享trace_id并记录父Span"""
+        with span("parent", kind="cycle"):
+            with span("child"):
+                pass
+
+        child, parent = sink.get_span_list()
+        assert parent.name == "parent"
+        assert parent.attributes == {"kind": "cycle"}
+        assert child.trace_id == parent.trace_id
+        assert child.parent_span_id == parent.span_id
+        assert parent.duration >= child.duration >= 0
+
+    def test_error(self, sink):
+        """异常被记录到Span后继续抛出"""
+        with pytest.raises(ValueError):
+            with span("error"):
+                raise ValueError("bad")
+
+        (error_span,) = sink.get_span_list()
+        assert error_span.is_error
+        assert error_span.error_message == "ValueError: bad"
+
+    def test_traced(self, sink):
+        """装饰器使用函数名作为Span名称"""
+
+        @traced()
+        def work(value):
+            return value * 2
+
+        assert work(2) == 4
+        assert [item.name for item in sink.get_span_list()] == ["work"]
+
+    def test_ring_buffer(self, sink):
+        """环形缓冲区只保留最近的Span"""
+        for i in range(20):
+            with span(f"span_{i}"):
+                pass
+        span_list = sink.get_span_list()
+        assert len(span_list) == 16
+        assert span_list[-1].name == "span_19"
+
+    def test_otlp_file(self, tmp_path):
+        """OTLP JSON文件每行一个请求"""
+        path = os.path.join(tmp_path, "trace.jsonl")
+        file_sink = OtlpJsonFileSpanSink(path)
+        last_sink_list = tracing._sink_list
+        tracing.set_sinks([file_sink])
+        try:
+            with span("login.post", status_code=200, timeout=8.0):
+                pass
+        finally:
+            tracing.set_sinks(last_sink_list)
+            file_sink.close()
+
+        with open(path, encoding="utf-8") as f:
+            line_list = f.readlines()
+        assert len(line_list) == 1
+
+        (otlp_span,) = json.loads(line_list[0])["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        assert otlp_span["name"] == "login.post"
+        assert len(otlp_span["traceId"]) == 32
+        assert len(otlp_span["spanId"]) == 16
+        assert int(otlp_span["endTimeUnixNano"]) >= int(otlp_span["startTimeUnixNano"])
+        assert {"key": "status_code", "value": {"intValue": "200"}} in otlp_span["attributes"]
+        assert otlp_span["status"] == {"code": 1}
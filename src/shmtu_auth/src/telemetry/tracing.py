@@ -0,0 +1,328 @@
+"""
+轻量的耗时追踪(Span)
+
+通过 SHMTU_AUTH_TRACE_SINKS 启用，多个输出用分号分隔:
+    log     输出到日志
+    memory  保存在内存环形缓冲区中(get_recent_spans)
+    otlp    以OTLP JSON格式逐行写入文件(SHMTU_AUTH_TRACE_FILE)
+未设置时span()与traced()几乎没有额外开销
+"""
+
+import functools
+import json
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from shmtu_auth.src.config.project_directory import get_directory_log_path
+from shmtu_auth.src.utils.env import get_env_int, get_env_str
+from shmtu_auth.src.utils.logs import get_logger
+
+logger = get_logger()
+
+SERVICE_NAME = "shmtu-auth"
+
+# 内存环形缓冲区保存的Span数量
+trace_buffer_size = 256
+# OTLP JSON文件路径
+trace_file_path = os.path.join(get_directory_log_path(), "trace.jsonl")
+
+env_trace_buffer_size = get_env_int("SHMTU_AUTH_TRACE_BUFFER_SIZE", -1)
+if env_trace_buffer_size > 0:
+    trace_buffer_size = env_trace_buffer_size
+
+env_trace_file_path = get_env_str("SHMTU_AUTH_TRACE_FILE", "")
+if len(env_trace_file_path) > 0:
+    trace_file_path = env_trace_file_path
+
+
+class Span:
+    """一段被计时的操作"""
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: str
+    start_time_ns: int
+    end_time_ns: int
+    attributes: Dict[str, Any]
+    is_error: bool
+    error_message: str
+
+    def __init__(self, name: str, trace_id: str, parent_span_id: str = ""):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent_span_id
+        self.start_time_ns = time.time_ns()
+        self.end_time_ns = 0
+        self.attributes = {}
+        self.is_error = False
+        self.error_message = ""
+
+        self._start_perf_ns = time.perf_counter_ns()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, message: str) -> None:
+        self.is_error = True
+        self.error_message = message
+
+    def finish(self) -> None:
+        # 结束时间由单调时钟推算，避免系统时间跳变导致耗时为负
+        self.end_time_ns = self.start_time_ns + (time.perf_counter_ns() - self._start_perf_ns)
+
+    @property
+    def duration(self) -> float:
+        """耗时，单位：秒"""
+        return (self.end_time_ns - self.start_time_ns) / 1e9
+
+    def to_otlp(self) -> dict:
+        attribute_list = []
+        for key, value in self.attributes.items():
+            if isinstance(value, bool):
+                attribute_value = {"boolValue": value}
+            elif isinstance(value, int):
+                attribute_value = {"intValue": str(value)}
+            elif isinstance(value, float):
+                attribute_value = {"doubleValue": value}
+            else:
+                attribute_value = {"stringValue": str(value)}
+            attribute_list.append({"key": key, "value": attribute_value})
+
+        span_dict = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            # SPAN_KIND_INTERNAL
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_time_ns),
+            "endTimeUnixNano": str(self.end_time_ns),
+            "attributes": attribute_list,
+            # STATUS_CODE_OK / STATUS_CODE_ERROR
+            "status": {"code": 2, "message": self.error_message} if self.is_error else {"code": 1},
+        }
+        if len(self.parent_span_id) > 0:
+            span_dict["parentSpanId"] = self.parent_span_id
+        return span_dict
+
+    def __repr__(self):
+        return f"Span({self.name}, {self.duration * 1000:.1f}ms{', error' if self.is_error else ''})"
+
+
+class NoopSpan:
+    """追踪未启用时使用的空Span"""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_error(self, message: str) -> None:
+        pass
+
+
+_noop_span = NoopSpan()
+
+
+class SpanSink:
+    """Span输出的基类"""
+
+    def export(self, span: Span) -> None:
+        raise NotImplementedError
+
+
+class LogSpanSink(SpanSink):
+    def export(self, span: Span) -> None:
+        attribute_text = " ".join(f"{key}={value}" for key, value in span.attributes.items())
+        status_text = f" error={span.error_message}" if span.is_error else ""
+        logger.debug(f"Span {span.name} {span.duration * 1000:.1f}ms {attribute_text}{status_text}".rstrip())
+
+
+class RingBufferSpanSink(SpanSink):
+    def __init__(self, size: int = trace_buffer_size):
+        self._span_deque = deque(maxlen=size)
+
+    def export(self, span: Span) -> None:
+        # deque.append是线程安全的
+        self._span_deque.append(span)
+
+    def get_span_list(self) -> List[Span]:
+        return list(self._span_deque)
+
+    def clear(self) -> None:
+        self._span_deque.clear()
+
+
+class OtlpJsonFileSpanSink(SpanSink):
+    """每行一个OTLP ExportTraceServiceRequest(与OpenTelemetry Collector的file exporter格式相同)"""
+
+    def __init__(self, path: str = trace_file_path):
+        self.path = path
+
+        self._file = None
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        data = {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+                    "scopeSpans": [{"scope": {"name": "shmtu_auth"}, "spans": [span.to_otlp()]}],
+                }
+            ]
+        }
+        line = json.dumps(data, ensure_ascii=False) + "\n"
+
+        with self._lock:
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if len(directory) > 0:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+# 当前启用的输出，为空时不追踪
+_sink_list: List[SpanSink] = []
+_local = threading.local()
+
+
+def get_current_span() -> Optional[Span]:
+    span_stack = getattr(_local, "span_stack", None)
+    if not span_stack:
+        return None
+    return span_stack[-1]
+
+
+def is_tracing_enabled() -> bool:
+    return len(_sink_list) > 0
+
+
+def set_sinks(sink_list: List[SpanSink]) -> None:
+    """
+    替换全部输出
+    :param sink_list: 输出列表，为空时关闭追踪
+    """
+    global _sink_list
+    _sink_list = list(sink_list)
+
+
+def add_sink(sink: SpanSink) -> None:
+    set_sinks(_sink_list + [sink])
+
+
+def remove_sink(sink: SpanSink) -> None:
+    set_sinks([item for item in _sink_list if item is not sink])
+
+
+def _export(span: Span) -> None:
+    for sink in _sink_list:
+        # noinspection PyBroadException
+        try:
+            sink.export(span)
+        except Exception:
+            logger.exception(f"Failed to export span {span.name}")
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    记录一段操作的耗时，嵌套的span自动成为子span
+    :param name: 名称
+    :param attributes: 附加属性
+    """
+    if not _sink_list:
+        yield _noop_span
+        return
+
+    parent = get_current_span()
+    current_span = Span(
+        name,
+        trace_id=secrets.token_hex(16) if parent is None else parent.trace_id,
+        parent_span_id="" if parent is None else parent.span_id,
+    )
+    current_span.attributes.update(attributes)
+
+    span_stack = getattr(_local, "span_stack", None)
+    if span_stack is None:
+        span_stack = []
+        _local.span_stack = span_stack
+    span_stack.append(current_span)
+
+    try:
+        yield current_span
+    except BaseException as e:
+        current_span.set_error(f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        span_stack.pop()
+        current_span.finish()
+        _export(current_span)
+
+
+def traced(name: str = "") -> Callable:
+    """
+    以span包装函数的装饰器
+    :param name: 名称，默认使用函数名
+    """
+
+    def decorator(func: Callable) -> Callable:
+        span_name = name if len(name) > 0 else func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _sink_list:
+                return func(*args, **kwargs)
+            with span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+memory_sink: Optional[RingBufferSpanSink] = None
+
+
+def get_recent_spans() -> List[Span]:
+    """获取内存缓冲区中的Span(未启用memory输出时为空)"""
+    if memory_sink is None:
+        return []
+    return memory_sink.get_span_list()
+
+
+def configure_from_env() -> None:
+    """根据SHMTU_AUTH_TRACE_SINKS设置输出"""
+    global memory_sink
+
+    sink_list: List[SpanSink] = []
+    for sink_name in get_env_str("SHMTU_AUTH_TRACE_SINKS", "").split(";"):
+        sink_name = sink_name.strip().lower()
+        if len(sink_name) == 0:
+            continue
+
+        if sink_name == "log":
+            sink_list.append(LogSpanSink())
+        elif sink_name == "memory":
+            memory_sink = RingBufferSpanSink()
+            sink_list.append(memory_sink)
+        elif sink_name == "otlp":
+            sink_list.append(OtlpJsonFileSpanSink())
+        else:
+            logger.warning(f"Unknown trace sink: {sink_name}")
+
+    set_sinks(sink_list)
+
+
+configure_from_env()
@@ -0,0 +1,165 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from shmtu_auth.src.utils.env import get_env_float
+
+# 各类网络操作的默认超时时间，单位：秒
+# 可通过 SHMTU_AUTH_TIMEOUT_<操作名大写> 覆盖，例如 SHMTU_AUTH_TIMEOUT_LOGIN
+default_timeout_dict: Dict[str, float] = {
+    # 单个204检测地址
+    "probe": 2.0,
+    # 获取认证跳转页面
+    "query_string": 5.0,
+    # 登录请求
+    "login": 8.0,
+    # 登出、获取在线信息
+    "logout": 5.0,
+    # iSMU认证页面
+    "ismu": 5.0,
+    # WebHook推送
+    "webhook": 10.0,
+    # GitHub版本检查
+    "github": 10.0,
+}
+
+# 每轮(联网检测 + 获取Query String + 登录)的总时间预算，单位：秒
+cycle_budget = 60.0
+
+
+class OperationTimeoutError(TimeoutError):
+    """单个网络操作超时"""
+
+    operation: str
+    timeout: float
+
+    def __init__(self, operation: str, timeout: float):
+        self.operation = operation
+        self.timeout = timeout
+        super().__init__(f"Operation '{operation}' timed out after {timeout:.1f}s")
+
+
+class DeadlineExceededError(TimeoutError):
+    """本轮的总时间预算已经用完"""
+
+    operation: str
+    budget: float
+    elapsed: float
+
+    def __init__(self, operation: str, budget: float, elapsed: float):
+        self.operation = operation
+        self.budget = budget
+        self.elapsed = elapsed
+        super().__init__(f"Deadline exceeded before '{operation}' ({elapsed:.1f}s used of {budget:.1f}s budget)")
+
+
+def get_cycle_budget() -> float:
+    """
+    获取每轮的总时间预算(SHMTU_AUTH_CYCLE_BUDGET)
+    :return: 预算，单位：秒
+    """
+    env_cycle_budget = get_env_float("SHMTU_AUTH_CYCLE_BUDGET", -1)
+    if env_cycle_budget > 0:
+        return env_cycle_budget
+    return cycle_budget
+
+
+def get_timeout(operation: str) -> float:
+    """
+    获取某类操作的超时时间
+    :param operation: 操作名，见default_timeout_dict
+    :return: 超时时间，单位：秒
+    """
+    default_timeout = default_timeout_dict.get(operation, 10.0)
+    env_timeout = get_env_float(f"SHMTU_AUTH_TIMEOUT_{operation.upper()}", -1)
+    if env_timeout > 0:
+        return env_timeout
+    return default_timeout
+
+
+class Deadline:
+    """
+    时间预算
+    每个操作的实际超时时间取 操作默认超时 和 剩余预算 中较小的一个
+    """
+
+    budget: float
+    start_time: float
+
+    def __init__(self, budget: float = -1):
+        """
+        :param budget: 预算，单位：秒，小于等于0时使用SHMTU_AUTH_CYCLE_BUDGET
+        """
+        if budget <= 0:
+            budget = get_cycle_budget()
+        self.budget = budget
+        self.start_time = time.monotonic()
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.start_time
+
+    def remaining(self) -> float:
+        return max(self.budget - self.elapsed(), 0.0)
+
+    def is_expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def check(self, operation: str) -> None:
+        """预算已用完时抛出DeadlineExceededError"""
+        if self.is_expired():
+            raise DeadlineExceededError(operation, self.budget, self.elapsed())
+
+    def timeout(self, operation: str) -> float:
+        """
+        获取操作在剩余预算内可用的超时时间
+        :param operation: 操作名
+        :return: 超时时间，单位：秒
+        """
+        self.check(operation)
+        return min(get_timeout(operation), self.remaining())
+
+
+_local = threading.local()
+
+
+def get_current_deadline() -> Optional[Deadline]:
+    """获取当前线程正在使用的预算，没有时返回None"""
+    return getattr(_local, "deadline", None)
+
+
+@contextmanager
+def cycle_deadline(budget: float = -1):
+    """
+    在当前线程内为一轮检测与登录设置总时间预算
+    :param budget: 预算，默认使用SHMTU_AUTH_CYCLE_BUDGET
+    """
+    last_deadline = get_current_deadline()
+    deadline = Deadline(budget)
+    _local.deadline = deadline
+    try:
+        yield deadline
+    finally:
+        _local.deadline = last_deadline
+
+
+def get_request_timeout(operation: str) -> float:
+    """
+    获取请求的超时时间(考虑当前线程的预算)
+    :param operation: 操作名
+    :return: 超时时间，单位：秒
+    """
+    deadline = get_current_deadline()
+    if deadline is None:
+        return get_timeout(operation)
+    return deadline.timeout(operation)
+
+
+def get_remaining_time(default: float) -> float:
+    """
+    当前预算的剩余时间，没有预算时返回default
+    """
+    deadline = get_current_deadline()
+    if deadline is None:
+        return default
+    return min(deadline.remaining(), default)
@@ -41,3 +41,20 @@ def get_env_time(key, default=None):
         return datetime.time(int_1, int_2)
     except Exception:
         return default
+
+
+def get_env_float(key, default=None):
+    str_float = get_env_str(key, "")
+    try:
+        return float(str_float)
+    except Exception:
+        return default
+
+
+def get_env_bool(key, default=None):
+    str_bool = get_env_str(key, "").lower()
+    if str_bool in ("1", "true", "yes", "on"):
+        return True
+    if str_bool in ("0", "false", "no", "off"):
+        return False
+    return default
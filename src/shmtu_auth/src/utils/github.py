@@ -1,9 +1,10 @@
-import requests
+from shmtu_auth.src.utils import http_client
+from shmtu_auth.src.utils.deadline import get_timeout
 
 
 def get_latest_release_version(repo_owner, repo_name):
     api_url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/releases/latest"
-    response = requests.get(api_url)
+    response = http_client.get(api_url, timeout=get_timeout("github"))
 
     if response.status_code == 200:
         release_info = response.json()
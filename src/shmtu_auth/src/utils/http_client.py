@@ -0,0 +1,133 @@
+"""
+WebHook推送、版本检查等外部请求共用的HTTP客户端
+
+与认证核心使用不同的会话，外部请求变慢不会占用认证的连接池
+- 长连接复用(qyapi.weixin.qq.com、api.github.com等)
+- 请求gzip压缩的响应
+- GET请求带If-None-Match，服务器返回304时使用缓存的响应
+- 后台任务使用有上限的线程池，避免重复点击时不断创建线程
+"""
+
+import atexit
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+import requests
+
+from shmtu_auth.src.utils.env import get_env_int
+from shmtu_auth.src.utils.http_session import get_session
+from shmtu_auth.src.utils.logs import get_logger
+
+logger = get_logger()
+
+SESSION_NAME = "client"
+
+# 后台线程池的最大线程数
+max_workers = 2
+# ETag缓存的最大条目数
+etag_cache_size = 32
+
+env_max_workers = get_env_int("SHMTU_AUTH_HTTP_MAX_WORKERS", -1)
+if env_max_workers > 0:
+    max_workers = env_max_workers
+
+_etag_cache: Dict[str, requests.Response] = {}
+_etag_lock = threading.Lock()
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_client_session() -> requests.Session:
+    """
+    获取外部请求共用的会话
+    :return: requests.Session
+    """
+    session = get_session(SESSION_NAME)
+    session.headers["Accept-Encoding"] = "gzip, deflate"
+    return session
+
+
+def post(url: str, timeout: float, **kwargs) -> requests.Response:
+    """
+    使用共享会话发送POST请求
+    :param url: 地址
+    :param timeout: 超时时间(秒)
+    :return: requests.Response
+    """
+    return get_client_session().post(url, timeout=timeout, **kwargs)
+
+
+def get(url: str, timeout: float, headers: Optional[Dict[str, str]] = None) -> requests.Response:
+    """
+    使用共享会话发送GET请求，带上次响应的ETag
+    服务器返回304时返回缓存的响应(状态码为200)，不计入GitHub API的请求次数
+    :param url: 地址
+    :param timeout: 超时时间(秒)
+    :param headers: 额外的请求头
+    :return: requests.Response
+    """
+    request_headers = dict(headers or {})
+
+    with _etag_lock:
+        cached_response = _etag_cache.get(url)
+    if cached_response is not None:
+        request_headers["If-None-Match"] = cached_response.headers["ETag"]
+
+    response = get_client_session().get(url, timeout=timeout, headers=request_headers)
+
+    if response.status_code == 304 and cached_response is not None:
+        logger.debug(f"HTTP not modified, use cached response: {url}")
+        return cached_response
+
+    if response.status_code == 200 and response.headers.get("ETag"):
+        # 读取内容，之后可以重复使用
+        _ = response.content
+        with _etag_lock:
+            _etag_cache.pop(url, None)
+            if len(_etag_cache) >= etag_cache_size:
+                _etag_cache.pop(next(iter(_etag_cache)))
+            _etag_cache[url] = response
+
+    return response
+
+
+def clear_etag_cache() -> None:
+    """清空ETag缓存"""
+    with _etag_lock:
+        _etag_cache.clear()
+
+
+def submit(function: Callable, *args, **kwargs) -> Future:
+    """
+    在后台线程池中执行任务
+    :param function: 任务函数
+    :return: Future
+    """
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="http_client")
+        return _executor.submit(function, *args, **kwargs)
+
+
+def shutdown() -> None:
+    """关闭后台线程池，不等待正在执行的任务"""
+    global _executor
+
+    with _executor_lock:
+        executor = _executor
+        _executor = None
+
+    if executor is not None:
+        executor.shutdown(wait=False)
+
+
+atexit.register(shutdown)
+
+
+if __name__ == "__main__":
+    print(get("https://api.github.com/repos/a645162/shmtu-auth/branches", timeout=10).status_code)
+    print(get("https://api.github.com/repos/a645162/shmtu-auth/branches", timeout=10).status_code)
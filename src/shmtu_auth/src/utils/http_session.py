@@ -0,0 +1,140 @@
+import atexit
+import threading
+from typing import Dict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from shmtu_auth.src.utils.env import get_env_bool, get_env_int
+from shmtu_auth.src.utils.logs import get_logger
+
+logger = get_logger()
+
+# 默认会话名称(认证核心、监控共用)
+DEFAULT_SESSION_NAME = "default"
+
+# 每个会话缓存的主机连接池数量
+pool_connections = 4
+# 每个主机连接池保留的最大连接数
+pool_maxsize = 8
+# 是否保持长连接
+keep_alive = True
+
+
+def get_env_pool_size(env_name: str, default: int) -> int:
+    """
+    读取连接池大小，未设置或不是正整数时使用默认值
+    :param env_name: 环境变量名
+    :param default: 默认值
+    :return: 连接池大小
+    """
+    value = get_env_int(env_name, -1)
+    if value > 0:
+        return value
+    return default
+
+
+pool_connections = get_env_pool_size("SHMTU_AUTH_HTTP_POOL_CONNECTIONS", pool_connections)
+pool_maxsize = get_env_pool_size("SHMTU_AUTH_HTTP_POOL_MAXSIZE", pool_maxsize)
+
+keep_alive = get_env_bool("SHMTU_AUTH_HTTP_KEEP_ALIVE", keep_alive)
+
+_session_dict: Dict[str, requests.Session] = {}
+_session_lock = threading.Lock()
+
+
+def create_session() -> requests.Session:
+    """
+    创建一个带连接池的会话
+    :return: requests.Session
+    """
+    session = requests.Session()
+
+    # 同一主机(如8443的eportal)复用TCP/TLS连接
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=0,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    if keep_alive:
+        session.headers["Connection"] = "keep-alive"
+    else:
+        session.headers["Connection"] = "close"
+
+    return session
+
+
+def get_session(name: str = DEFAULT_SESSION_NAME) -> requests.Session:
+    """
+    获取共享会话，不存在时自动创建
+    :param name: 会话名称
+    :return: requests.Session
+    """
+    session = _session_dict.get(name)
+    if session is not None:
+        return session
+
+    with _session_lock:
+        session = _session_dict.get(name)
+        if session is None:
+            session = create_session()
+            _session_dict[name] = session
+            logger.debug(f"HTTP session created: {name}")
+
+    return session
+
+
+def create_isolated_session(name: str = DEFAULT_SESSION_NAME) -> requests.Session:
+    """
+    创建一个与共享会话使用同一连接池、但Cookie独立的会话
+    用于同时登录多个账号，避免不同账号的Cookie互相覆盖
+    注意：不要关闭返回的会话，否则会关闭共享的连接池
+    :param name: 共享会话名称
+    :return: requests.Session
+    """
+    shared_session = get_session(name)
+
+    session = requests.Session()
+    for prefix, adapter in shared_session.adapters.items():
+        session.mount(prefix, adapter)
+    session.headers.update(shared_session.headers)
+
+    return session
+
+
+def close_session(name: str = DEFAULT_SESSION_NAME) -> None:
+    """
+    关闭共享会话，释放连接池中的全部连接
+    :param name: 会话名称
+    """
+    with _session_lock:
+        session = _session_dict.pop(name, None)
+
+    if session is not None:
+        session.close()
+        logger.debug(f"HTTP session closed: {name}")
+
+
+def reset_session(name: str = DEFAULT_SESSION_NAME) -> None:
+    """
+    重置共享会话(例如门户断开后，旧连接可能已经失效)
+    下次调用get_session时会重新创建
+    :param name: 会话名称
+    """
+    close_session(name)
+
+
+def close_all_sessions() -> None:
+    """关闭全部共享会话"""
+    with _session_lock:
+        session_list = list(_session_dict.values())
+        _session_dict.clear()
+
+    for session in session_list:
+        session.close()
+
+
+atexit.register(close_all_sessions)
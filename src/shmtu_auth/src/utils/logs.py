@@ -15,7 +15,8 @@ log_directory_path = get_directory_log_path()
 print("Log:\n" + log_directory_path)
 log_file_name = "shmtu_auth_{time}.log"
 log_path = os.path.join(log_directory_path, log_file_name)
-logger.add(log_path, rotation="00:00", retention="60 days")
+# 由后台线程写入文件，不阻塞调用线程
+logger.add(log_path, rotation="00:00", retention="60 days", enqueue=True)
 
 
 def get_logger() -> loguru.logger:
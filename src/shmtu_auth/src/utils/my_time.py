@@ -1,4 +1,5 @@
 import datetime
+from typing import Optional
 
 
 def get_now_time():
@@ -17,5 +18,33 @@ def is_within_time_range(start_time=datetime.time(11, 0), end_time=datetime.time
         return start_time <= current_time or current_time <= end_time
 
 
+def get_time_range_remaining_seconds(
+    start_time: datetime.time,
+    end_time: datetime.time,
+    now: Optional[datetime.datetime] = None,
+) -> float:
+    """
+    距离时间段结束的秒数(时间段可以跨过0点)
+    :param now: 默认为当前时间
+    :return: 不在时间段内时为0
+    """
+    if now is None:
+        now = datetime.datetime.now()
+    current_time = now.time()
+
+    if start_time <= end_time:
+        if not (start_time <= current_time < end_time):
+            return 0
+        end_date = now.date()
+    elif current_time >= start_time:
+        end_date = now.date() + datetime.timedelta(days=1)
+    elif current_time < end_time:
+        end_date = now.date()
+    else:
+        return 0
+
+    return (datetime.datetime.combine(end_date, end_time) - now).total_seconds()
+
+
 if __name__ == "__main__":
     print(is_within_time_range(datetime.time(23, 00), datetime.time(7, 30)))
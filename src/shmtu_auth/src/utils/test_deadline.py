@@ -0,0 +1,64 @@
+"""
+测试超时时间与每轮时间预算
+
+运行示例:
+    python -m pytest src/shmtu_auth/src/utils/test_deadline.py -v
+"""
+
+import time
+
+import pytest
+
+from shmtu_auth.src.utils import deadline as deadline_module
+from shmtu_auth.src.utils.deadline import (
+    Deadline,
+    DeadlineExceededError,
+    cycle_deadline,
+    get_current_deadline,
+    get_request_timeout,
+    get_timeout,
+)
+
+
+class TestDeadline:
+    """时间预算测试类"""
+
+    def test_default_timeout(self):
+        """没有预算时使用操作的默认超时"""
+        assert get_current_deadline() is None
+        assert get_request_timeout("login") == get_timeout("login")
+
+    def test_timeout_limited_by_budget(self):
+        """超时时间不超过剩余预算"""
+        with cycle_deadline(0.5) as deadline:
+            assert get_current_deadline() is deadline
+            assert get_request_timeout("login") <= 0.5
+        assert get_current_deadline() is None
+
+    def test_deadline_exceeded(self):
+        """预算用完后抛出结构化的异常"""
+        deadline = Deadline(0.01)
+        time.sleep(0.02)
+        assert deadline.is_expired()
+        with pytest.raises(DeadlineExceededError) as exc_info:
+            deadline.timeout("query_string")
+        assert exc_info.value.operation == "query_string"
+        assert isinstance(exc_info.value, TimeoutError)
+
+    def test_nested(self):
+        """嵌套使用时退出后恢复外层预算"""
+        with cycle_deadline(10) as outer:
+            with cycle_deadline(1) as inner:
+                assert get_current_deadline() is inner
+            assert get_current_deadline() is outer
+
+    def test_env_cycle_budget(self, monkeypatch):
+        """每轮预算在创建时读取SHMTU_AUTH_CYCLE_BUDGET，配置文件在导入后加载也能生效"""
+        monkeypatch.setenv("SHMTU_AUTH_CYCLE_BUDGET", "12.5")
+        with cycle_deadline() as deadline:
+            assert deadline.budget == 12.5
+        assert Deadline().budget == 12.5
+
+        monkeypatch.delenv("SHMTU_AUTH_CYCLE_BUDGET")
+        with cycle_deadline() as deadline:
+            assert deadline.budget == deadline_module.cycle_budget
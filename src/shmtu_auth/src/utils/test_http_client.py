@@ -0,0 +1,66 @@
+"""
+测试外部请求共用的HTTP客户端
+
+运行示例:
+    python -m pytest src/shmtu_auth/src/utils/test_http_client.py -v
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from shmtu_auth.src.utils import http_client
+
+
+class ETagHandler(BaseHTTPRequestHandler):
+    """返回固定内容与ETag，带If-None-Match时返回304"""
+
+    etag = '"v1"'
+    request_list = []
+
+    def do_GET(self):
+        self.request_list.append(self.headers.get("If-None-Match"))
+        if self.headers.get("If-None-Match") == self.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        body = b'__version__ = "1.2.3"'
+        self.send_response(200)
+        self.send_header("ETag", self.etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def base_url():
+    ETagHandler.request_list = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ETagHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    http_client.clear_etag_cache()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+    http_client.clear_etag_cache()
+
+
+class TestHttpClient:
+    def test_etag(self, base_url):
+        """第二次请求带If-None-Match，304时使用缓存的内容"""
+        first_response = http_client.get(base_url + "/version.py", timeout=5)
+        second_response = http_client.get(base_url + "/version.py", timeout=5)
+
+        assert ETagHandler.request_list == [None, '"v1"']
+        assert first_response.status_code == 200
+        assert second_response.status_code == 200
+        assert second_response.text == '__version__ = "1.2.3"'
+
+    def test_submit(self):
+        """后台线程池返回任务结果"""
+        assert http_client.submit(sum, [1, 2, 3]).result(5) == 6
@@ -0,0 +1,70 @@
+"""
+测试共享HTTP会话
+
+运行示例:
+    python -m pytest src/shmtu_auth/src/utils/test_http_session.py -v
+"""
+
+import pytest
+
+from shmtu_auth.src.utils import http_session
+
+
+@pytest.fixture(autouse=True)
+def clean_sessions():
+    http_session.close_session("test")
+    yield
+    http_session.close_session("test")
+
+
+class TestHttpSession:
+    def test_get_session(self):
+        """同名会话只创建一次，连接池大小使用配置"""
+        session = http_session.get_session("test")
+        assert http_session.get_session("test") is session
+        assert http_session.get_session("test_other") is not session
+        http_session.close_session("test_other")
+
+        adapter = session.get_adapter("https://example.com")
+        assert adapter._pool_connections == http_session.pool_connections
+        assert adapter._pool_maxsize == http_session.pool_maxsize
+
+    def test_reset_session(self):
+        """重置后重新创建会话，旧的Cookie不再保留"""
+        session = http_session.get_session("test")
+        session.cookies.set("JSESSIONID", "old")
+
+        http_session.reset_session("test")
+        new_session = http_session.get_session("test")
+        assert new_session is not session
+        assert len(new_session.cookies) == 0
+
+    def test_close_all_sessions(self):
+        """关闭全部会话后重新获取得到新会话"""
+        session = http_session.get_session("test")
+        http_session.close_all_sessions()
+        assert http_session.get_session("test") is not session
+
+    def test_isolated_session(self):
+        """独立会话共用连接池，但Cookie互不影响"""
+        shared_session = http_session.get_session("test")
+        session_1 = http_session.create_isolated_session("test")
+        session_2 = http_session.create_isolated_session("test")
+
+        assert session_1.get_adapter("http://127.0.0.1") is shared_session.get_adapter("http://127.0.0.1")
+
+        session_1.cookies.set("JSESSIONID", "user_1")
+        assert session_2.cookies.get("JSESSIONID") is None
+        assert shared_session.cookies.get("JSESSIONID") is None
+
+    def test_env_pool_size(self, monkeypatch):
+        """只接受正整数，其他值使用默认值"""
+        monkeypatch.setenv("SHMTU_AUTH_HTTP_POOL_MAXSIZE", "16")
+        assert http_session.get_env_pool_size("SHMTU_AUTH_HTTP_POOL_MAXSIZE", 8) == 16
+
+        for value in ["0", "-1", "abc", ""]:
+            monkeypatch.setenv("SHMTU_AUTH_HTTP_POOL_MAXSIZE", value)
+            assert http_session.get_env_pool_size("SHMTU_AUTH_HTTP_POOL_MAXSIZE", 8) == 8
+
+        monkeypatch.delenv("SHMTU_AUTH_HTTP_POOL_MAXSIZE")
+        assert http_session.get_env_pool_size("SHMTU_AUTH_HTTP_POOL_MAXSIZE", 8) == 8
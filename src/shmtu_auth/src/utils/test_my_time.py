@@ -0,0 +1,34 @@
+"""
+测试时间段计算
+
+运行示例:
+    python -m pytest src/shmtu_auth/src/utils/test_my_time.py -v
+"""
+
+import datetime
+
+from shmtu_auth.src.utils.my_time import get_time_range_remaining_seconds
+
+
+def at(hour: int, minute: int = 0) -> datetime.datetime:
+    return datetime.datetime(2024, 5, 1, hour, minute)
+
+
+class TestTimeRangeRemainingSeconds:
+    def test_cross_midnight(self):
+        """跨过0点的时间段(23:00 ~ 7:30)"""
+        start_time = datetime.time(23, 0)
+        end_time = datetime.time(7, 30)
+        assert get_time_range_remaining_seconds(start_time, end_time, at(23, 30)) == 8 * 3600
+        assert get_time_range_remaining_seconds(start_time, end_time, at(7, 0)) == 30 * 60
+        assert get_time_range_remaining_seconds(start_time, end_time, at(7, 30)) == 0
+        assert get_time_range_remaining_seconds(start_time, end_time, at(12, 0)) == 0
+
+    def test_same_day(self):
+        """同一天内的时间段(12:00 ~ 14:00)"""
+        start_time = datetime.time(12, 0)
+        end_time = datetime.time(14, 0)
+        assert get_time_range_remaining_seconds(start_time, end_time, at(12, 0)) == 2 * 3600
+        assert get_time_range_remaining_seconds(start_time, end_time, at(13, 59)) == 60
+        assert get_time_range_remaining_seconds(start_time, end_time, at(14, 0)) == 0
+        assert get_time_range_remaining_seconds(start_time, end_time, at(11, 0)) == 0
@@ -0,0 +1,175 @@
+"""
+合并短时间内的WebHook通知
+
+窗口内的第一条通知开始计时，窗口结束时把所有通知合并为一条摘要发送
+摘要中按类型统计次数、首次与最后一次的时间以及涉及的账号(隐藏部分学号)
+"""
+
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from shmtu_auth.src.utils.env import get_env_float
+from shmtu_auth.src.utils.logs import get_logger
+from shmtu_auth.src.utils.program_env_config import convert_number_to_star
+
+logger = get_logger()
+
+# 合并窗口，0表示不合并，单位：秒
+coalesce_window = 60.0
+
+env_coalesce_window = get_env_float("SHMTU_AUTH_WEBHOOK_COALESCE_WINDOW", -1)
+if env_coalesce_window >= 0:
+    coalesce_window = env_coalesce_window
+
+time_format = "%Y-%m-%d %H:%M:%S"
+
+
+class Notification:
+    kind: str
+    message: str
+    account_list: List[str]
+    # time.time()
+    timestamp: float
+
+    def __init__(self, kind: str, message: str, account_list: Optional[List[str]] = None, timestamp: float = 0):
+        self.kind = kind
+        self.message = message
+        self.account_list = account_list or []
+        self.timestamp = timestamp if timestamp > 0 else time.time()
+
+    def to_dict(self) -> dict:
+        return dict(vars(self))
+
+    @staticmethod
+    def from_dict(data: dict) -> "Notification":
+        return Notification(
+            str(data.get("kind", "")),
+            str(data.get("message", "")),
+            list(data.get("account_list") or []),
+            float(data.get("timestamp", 0)),
+        )
+
+
+def format_timestamp(timestamp: float) -> str:
+    return time.strftime(time_format, time.localtime(timestamp))
+
+
+def build_digest(notification_list: List[Notification], title: str = "SHMTU_Auth") -> str:
+    """
+    把多条通知合并为一条摘要，只有一条通知时直接使用原内容
+    """
+    if len(notification_list) == 1:
+        return notification_list[0].message
+
+    # 按第一次出现的顺序
+    kind_dict: Dict[str, List[Notification]] = {}
+    for notification in notification_list:
+        kind_dict.setdefault(notification.kind, []).append(notification)
+
+    first_time = min(notification.timestamp for notification in notification_list)
+    last_time = max(notification.timestamp for notification in notification_list)
+
+    line_list = [
+        title,
+        f"\t{len(notification_list)}条通知",
+        f"\t时间: {format_timestamp(first_time)} ~ {format_timestamp(last_time)}",
+    ]
+    for kind, kind_list in kind_dict.items():
+        line = f"\t{kind}: {len(kind_list)}次"
+        if len(kind_list) > 1:
+            line += f"(最后一次 {format_timestamp(kind_list[-1].timestamp)})"
+
+        # dict去重并保持顺序
+        account_dict = {
+            convert_number_to_star(account): None for notification in kind_list for account in notification.account_list
+        }
+        if len(account_dict) > 0:
+            line += f"\n\t\t账号: {', '.join(account_dict)}"
+        line_list.append(line)
+
+    return "\n".join(line_list) + "\n"
+
+
+def notification_list_to_payload(notification_list: List[Notification], title: str = "SHMTU_Auth") -> dict:
+    """
+    发送队列中保存的内容，同时保存原始通知，之后可以重新合并
+    """
+    return {
+        "msg": build_digest(notification_list, title=title),
+        "notifications": [notification.to_dict() for notification in notification_list],
+    }
+
+
+def merge_payloads(payload_list: List[dict], created_time_list: List[float], title: str) -> dict:
+    """
+    把发送队列中积压的多条内容合并为一条摘要
+    :param payload_list: notification_list_to_payload生成的内容，或只有msg的文字消息
+    :param created_time_list: 每条内容加入队列的时间，用于文字消息
+    """
+    notification_list = []
+    for payload, created_time in zip(payload_list, created_time_list):
+        data_list = payload.get("notifications")
+        if data_list:
+            notification_list.extend(Notification.from_dict(data) for data in data_list)
+        else:
+            # 直接加入队列的文字消息
+            notification_list.append(Notification("其他消息", payload["msg"], timestamp=created_time))
+
+    return notification_list_to_payload(notification_list, title=title)
+
+
+class NotificationCoalescer:
+    """
+    窗口结束时在定时器线程中调用send_function(窗口内的通知)，add不会阻塞
+    """
+
+    window: float
+
+    def __init__(self, send_function: Callable[[List[Notification]], None], window: float = coalesce_window):
+        self.send_function = send_function
+        self.window = window
+
+        self._lock = threading.Lock()
+        self._pending_list: List[Notification] = []
+        self._timer: Optional[threading.Timer] = None
+
+    def add(self, kind: str, message: str, account_list: Optional[List[str]] = None) -> None:
+        """
+        :param kind: 通知类型(摘要中按类型统计)，例如"认证失败"
+        :param message: 窗口内只有这一条通知时发送的内容
+        :param account_list: 涉及的学号
+        """
+        notification = Notification(kind, message, account_list)
+
+        if self.window <= 0:
+            self.send_function([notification])
+            return
+
+        with self._lock:
+            self._pending_list.append(notification)
+            if self._timer is None:
+                self._timer = threading.Timer(self.window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending_list)
+
+    def flush(self) -> None:
+        """立即发送窗口内的通知"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+            notification_list = self._pending_list
+            self._pending_list = []
+
+        if len(notification_list) == 0:
+            return
+
+        if len(notification_list) > 1:
+            logger.info(f"Coalesced {len(notification_list)} webhook notifications into one message")
+        self.send_function(notification_list)
@@ -0,0 +1,382 @@
+"""
+WebHook消息的持久化发送队列
+
+新消息先追加写入磁盘日志(JSON Lines)再放入内存队列，程序重启后未发送的消息会重新发送
+发送线程通过条件变量等待新消息或重试时间，不轮询
+发送失败按指数退避(带随机抖动)重试，超过次数后写入死信文件
+暂停(免打扰)期间一直等待到暂停结束，之后可以把积压的消息合并为一条发送
+"""
+
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+
+from shmtu_auth.src.config.project_directory import get_directory_data_path
+from shmtu_auth.src.telemetry import metrics
+from shmtu_auth.src.utils.env import get_env_float, get_env_int
+from shmtu_auth.src.utils.logs import get_logger
+
+logger = get_logger()
+
+journal_path = os.path.join(get_directory_data_path(), "webhook_queue.jsonl")
+dead_letter_path = os.path.join(get_directory_data_path(), "webhook_dead_letter.jsonl")
+
+# 最多尝试发送的次数
+max_attempts = 8
+# 第一次重试的等待时间，之后每次翻倍，单位：秒
+retry_delay = 5.0
+# 重试等待时间的上限，单位：秒
+retry_max_delay = 600.0
+# 在等待时间上随机增加的比例，避免多台机器同时重试
+retry_jitter = 0.2
+
+env_max_attempts = get_env_int("SHMTU_AUTH_WEBHOOK_MAX_ATTEMPTS", -1)
+if env_max_attempts > 0:
+    max_attempts = env_max_attempts
+
+env_retry_delay = get_env_float("SHMTU_AUTH_WEBHOOK_RETRY_DELAY", -1)
+if env_retry_delay > 0:
+    retry_delay = env_retry_delay
+
+env_retry_max_delay = get_env_float("SHMTU_AUTH_WEBHOOK_RETRY_MAX_DELAY", -1)
+if env_retry_max_delay > 0:
+    retry_max_delay = env_retry_max_delay
+
+
+class DeliveryMessage:
+    message_id: str
+    channel: str
+    payload: dict
+    attempt: int
+    # 下次可以发送的时间(time.time())，重启后仍然有效
+    next_time: float
+    created_time: float
+    last_error: str
+
+    def __init__(self, channel: str, payload: dict, message_id: str = "", created_time: float = 0):
+        self.message_id = message_id if len(message_id) > 0 else uuid.uuid4().hex
+        self.channel = channel
+        self.payload = payload
+        self.attempt = 0
+        self.created_time = created_time if created_time > 0 else time.time()
+        self.next_time = 0
+        self.last_error = ""
+
+    def to_dict(self) -> dict:
+        return dict(vars(self))
+
+    @staticmethod
+    def from_dict(data: dict) -> "DeliveryMessage":
+        message = DeliveryMessage(
+            str(data.get("channel", "")),
+            dict(data.get("payload") or {}),
+            message_id=str(data.get("message_id", "")),
+            created_time=float(data.get("created_time", 0)),
+        )
+        message.attempt = int(data.get("attempt", 0))
+        message.next_time = float(data.get("next_time", 0))
+        message.last_error = str(data.get("last_error", ""))
+        return message
+
+
+def get_retry_delay(attempt: int, base_delay: float, max_delay: float, jitter: float) -> float:
+    """
+    第attempt次发送失败后的等待时间
+    :param attempt: 已经失败的次数(从1开始)
+    :return: 单位：秒
+    """
+    delay = min(max_delay, base_delay * (2 ** (attempt - 1)))
+    return delay + random.uniform(0, delay * jitter)
+
+
+class DeliveryQueue:
+    """
+    按加入顺序发送，队首的消息在重试期间会阻塞后面的消息
+    sender返回True表示发送成功，返回False或抛出异常表示需要重试
+    get_pause_time返回距离暂停结束的秒数，0表示不暂停
+    merge_function把暂停期间积压的消息合并为新的payload列表
+    """
+
+    name: str
+    journal_path: str
+    dead_letter_path: str
+    max_attempts: int
+
+    def __init__(
+        self,
+        name: str,
+        sender: Callable[[DeliveryMessage], bool],
+        journal_path: str = journal_path,
+        dead_letter_path: str = dead_letter_path,
+        max_attempts: int = max_attempts,
+        retry_delay: float = retry_delay,
+        retry_max_delay: float = retry_max_delay,
+        get_pause_time: Optional[Callable[[], float]] = None,
+        merge_function: Optional[Callable[[List[DeliveryMessage]], List[dict]]] = None,
+    ):
+        self.name = name
+        self.sender = sender
+        self.journal_path = journal_path
+        self.dead_letter_path = dead_letter_path
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.retry_max_delay = retry_max_delay
+        self.get_pause_time = get_pause_time
+        self.merge_function = merge_function
+
+        self._condition = threading.Condition()
+        self._message_deque: Deque[DeliveryMessage] = deque()
+        self._thread: Optional[threading.Thread] = None
+        self._is_stopping = False
+        # 正在发送的消息(已离开锁，尚未确认)
+        self._is_sending = False
+        # 上一次检查时处于暂停状态
+        self._is_paused = False
+
+        self._load_journal()
+
+    def __len__(self) -> int:
+        with self._condition:
+            return len(self._message_deque) + int(self._is_sending)
+
+    def _append_journal(self, record: dict) -> None:
+        directory = os.path.dirname(self.journal_path)
+        if len(directory) > 0:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _rewrite_journal(self, message_list: List[DeliveryMessage]) -> None:
+        """只保留尚未发送的消息"""
+        if len(message_list) == 0:
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+            return
+
+        temp_path = self.journal_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            for message in message_list:
+                f.write(json.dumps({"op": "add", "message": message.to_dict()}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.journal_path)
+
+    def _load_journal(self) -> None:
+        if not os.path.exists(self.journal_path):
+            return
+
+        message_dict: Dict[str, DeliveryMessage] = {}
+        with open(self.journal_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # 写入过程中退出时最后一行可能不完整
+                    logger.warning(f"Skip broken line in webhook journal {self.journal_path}")
+                    continue
+
+                op = record.get("op")
+                if op == "add":
+                    message = DeliveryMessage.from_dict(record.get("message") or {})
+                    message_dict[message.message_id] = message
+                elif op == "retry" and record.get("id") in message_dict:
+                    message = message_dict[record["id"]]
+                    message.attempt = int(record.get("attempt", message.attempt))
+                    message.next_time = float(record.get("next_time", message.next_time))
+                    message.last_error = str(record.get("error", ""))
+                elif op == "done":
+                    message_dict.pop(record.get("id"), None)
+
+        self._message_deque.extend(message_dict.values())
+        self._rewrite_journal(list(self._message_deque))
+        metrics.webhook_queue_depth.set(len(self._message_deque), queue=self.name)
+
+        if len(self._message_deque) > 0:
+            logger.info(f"Restored {len(self._message_deque)} pending {self.name} messages")
+
+    def _write_dead_letter(self, message: DeliveryMessage) -> None:
+        directory = os.path.dirname(self.dead_letter_path)
+        if len(directory) > 0:
+            os.makedirs(directory, exist_ok=True)
+
+        record = message.to_dict()
+        record["dead_time"] = time.time()
+        with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def put(self, channel: str, payload: dict) -> DeliveryMessage:
+        """
+        加入队列，写入磁盘后立即返回，不等待发送
+        :param channel: 渠道名称
+        :param payload: 发送所需的内容，必须可以转换为JSON
+        """
+        message = DeliveryMessage(channel, payload)
+        with self._condition:
+            try:
+                self._append_journal({"op": "add", "message": message.to_dict()})
+            except OSError as e:
+                # 无法写入时仍然在内存中发送
+                logger.error(f"Failed to write webhook journal {self.journal_path}: {e}")
+            self._message_deque.append(message)
+            metrics.webhook_queue_depth.set(len(self._message_deque), queue=self.name)
+            self._condition.notify_all()
+
+        self.start()
+        return message
+
+    def start(self) -> None:
+        with self._condition:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._is_stopping = False
+            self._thread = threading.Thread(target=self._run, name=f"webhook-{self.name}", daemon=True)
+            self._thread.start()
+        logger.info(f"WebHook {self.name} delivery thread start!")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._condition:
+            self._is_stopping = True
+            self._condition.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def wait_until_empty(self, timeout: float) -> bool:
+        """
+        等待全部消息发送完成(或进入死信)
+        :return: 超时前是否已经为空
+        """
+        end_time = time.monotonic() + timeout
+        with self._condition:
+            while len(self._message_deque) > 0 or self._is_sending:
+                remaining_time = end_time - time.monotonic()
+                if remaining_time <= 0:
+                    return False
+                self._condition.wait(remaining_time)
+            return True
+
+    def _take_next(self) -> Optional[DeliveryMessage]:
+        """等待直到队首的消息可以发送，停止时返回None"""
+        with self._condition:
+            while not self._is_stopping:
+                if len(self._message_deque) == 0:
+                    self._condition.wait()
+                    continue
+
+                pause_time = 0 if self.get_pause_time is None else self.get_pause_time()
+                if pause_time > 0:
+                    # 直接等待到暂停结束，期间加入的消息只会提前唤醒一次
+                    self._is_paused = True
+                    self._condition.wait(pause_time)
+                    continue
+
+                if self._is_paused:
+                    self._is_paused = False
+                    self._merge_backlog()
+
+                wait_time = self._message_deque[0].next_time - time.time()
+                if wait_time > 0:
+                    self._condition.wait(wait_time)
+                    continue
+
+                self._is_sending = True
+                return self._message_deque[0]
+        return None
+
+    def _merge_backlog(self) -> None:
+        """暂停结束后合并积压的消息(需要持有锁)"""
+        if self.merge_function is None or len(self._message_deque) <= 1:
+            return
+
+        message_list = list(self._message_deque)
+        try:
+            payload_list = self.merge_function(message_list)
+        except Exception as e:
+            logger.error(f"Failed to merge {len(message_list)} {self.name} messages: {e}")
+            return
+
+        created_time = min(message.created_time for message in message_list)
+        self._message_deque.clear()
+        self._message_deque.extend(
+            DeliveryMessage(message_list[-1].channel, payload, created_time=created_time) for payload in payload_list
+        )
+        try:
+            self._rewrite_journal(list(self._message_deque))
+        except OSError as e:
+            logger.error(f"Failed to rewrite webhook journal {self.journal_path}: {e}")
+
+        metrics.webhook_queue_depth.set(len(self._message_deque), queue=self.name)
+        logger.info(f"Merged {len(message_list)} {self.name} messages into {len(payload_list)} after pause")
+
+    def _run(self) -> None:
+        while True:
+            message = self._take_next()
+            if message is None:
+                return
+
+            try:
+                is_success = bool(self.sender(message))
+                error = "" if is_success else "rejected"
+            except Exception as e:
+                is_success = False
+                error = f"{type(e).__name__}: {e}"
+
+            self._finish(message, is_success, error)
+
+    def _finish(self, message: DeliveryMessage, is_success: bool, error: str) -> None:
+        with self._condition:
+            self._is_sending = False
+            is_removed = True
+
+            # 磁盘写入失败时仍然更新内存中的队列并唤醒等待的线程
+            try:
+                if is_success:
+                    self._message_deque.popleft()
+                    logger.info(f"WebHook {message.channel} message {message.message_id} delivered")
+                else:
+                    message.attempt += 1
+                    message.last_error = error
+
+                    if message.attempt >= self.max_attempts:
+                        self._message_deque.popleft()
+                        logger.error(
+                            f"WebHook {message.channel} message {message.message_id} "
+                            f"moved to dead letter after {message.attempt} attempts: {error}"
+                        )
+                        self._write_dead_letter(message)
+                    else:
+                        is_removed = False
+                        delay = get_retry_delay(message.attempt, self.retry_delay, self.retry_max_delay, retry_jitter)
+                        message.next_time = time.time() + delay
+                        logger.warning(
+                            f"WebHook {message.channel} message {message.message_id} failed "
+                            f"(attempt {message.attempt}), retry in {delay:.1f}s: {error}"
+                        )
+                        self._append_journal(
+                            {
+                                "op": "retry",
+                                "id": message.message_id,
+                                "attempt": message.attempt,
+                                "next_time": message.next_time,
+                                "error": error,
+                            }
+                        )
+
+                if is_removed:
+                    if len(self._message_deque) == 0:
+                        self._rewrite_journal([])
+                    else:
+                        self._append_journal({"op": "done", "id": message.message_id})
+            except OSError as e:
+                logger.error(f"Failed to update webhook journal {self.journal_path}: {e}")
+            finally:
+                metrics.webhook_queue_depth.set(len(self._message_deque), queue=self.name)
+                self._condition.notify_all()
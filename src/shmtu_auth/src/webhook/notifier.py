@@ -0,0 +1,485 @@
+"""
+通知插件
+
+每个通知渠道(企业微信、通用JSON WebHook、邮件、本地文件、Unix Socket)对应一个Notifier
+每个渠道有独立的持久化发送队列、超时时间与频率限制，某个渠道变慢不会影响其他渠道
+
+配置(TOML/env_list.yaml中的键会被展开，因此使用平铺的键名):
+    SHMTU_AUTH_NOTIFIERS = "wework;oncall"
+    SHMTU_AUTH_NOTIFIER_ONCALL_TYPE = "unix_socket"
+    SHMTU_AUTH_NOTIFIER_ONCALL_PATH = "/run/oncall.sock"
+未设置SHMTU_AUTH_NOTIFIERS时，如果配置了SHMTU_AUTH_WEBHOOK_WEWORK则只使用企业微信
+"""
+
+import atexit
+import json
+import os
+import smtplib
+import socket
+import threading
+import time
+from email.message import EmailMessage
+from typing import Callable, Dict, List, Optional, Type
+
+from shmtu_auth.src.config.project_directory import get_directory_data_path
+from shmtu_auth.src.telemetry import metrics
+from shmtu_auth.src.telemetry.event_log import WebhookDeliveryEvent, emit_event
+from shmtu_auth.src.utils import http_client, my_time
+from shmtu_auth.src.utils.deadline import get_timeout
+from shmtu_auth.src.utils.env import get_env_str
+from shmtu_auth.src.utils.logs import get_logger
+from shmtu_auth.src.webhook import wework
+from shmtu_auth.src.webhook.coalescer import (
+    Notification,
+    NotificationCoalescer,
+    merge_payloads,
+    notification_list_to_payload,
+)
+from shmtu_auth.src.webhook.delivery_queue import DeliveryMessage, DeliveryQueue
+
+logger = get_logger()
+
+# 每个渠道的配置项，对应SHMTU_AUTH_NOTIFIER_<名称>_<配置项>
+option_key_list = [
+    "type",
+    "url",
+    "path",
+    "timeout",
+    "rate",
+    "burst",
+    "quiet_hours",
+    "host",
+    "port",
+    "user",
+    "password",
+    "from",
+    "to",
+    "ssl",
+]
+
+notifier_type_dict: Dict[str, Type["Notifier"]] = {}
+
+
+def register_notifier(type_name: str) -> Callable[[Type["Notifier"]], Type["Notifier"]]:
+    """
+    注册通知渠道类型
+    :param type_name: 配置中的type
+    """
+
+    def decorator(cls: Type["Notifier"]) -> Type["Notifier"]:
+        cls.type_name = type_name
+        notifier_type_dict[type_name] = cls
+        return cls
+
+    return decorator
+
+
+def parse_bool(value: str, default: bool) -> bool:
+    value = value.strip().lower()
+    if value in ("1", "true", "yes", "on"):
+        return True
+    if value in ("0", "false", "no", "off"):
+        return False
+    return default
+
+
+class TokenBucket:
+    """
+    令牌桶频率限制，rate为0时不限制
+    """
+
+    rate: float
+    capacity: float
+
+    def __init__(self, rate: float, capacity: float):
+        # 每秒生成的令牌数
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._update_time = time.monotonic()
+
+    def get_wait_time(self) -> float:
+        """
+        尝试取出一个令牌
+        :return: 0表示已取出，否则为需要等待的秒数
+        """
+        if self.rate <= 0:
+            return 0
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._update_time) * self.rate)
+            self._update_time = now
+
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self) -> None:
+        """等待直到取出一个令牌(只阻塞当前渠道的发送线程)"""
+        while True:
+            wait_time = self.get_wait_time()
+            if wait_time <= 0:
+                return
+            time.sleep(wait_time)
+
+
+class Notifier:
+    type_name: str = ""
+
+    # 默认的频率限制，单位：条/分钟，0表示不限制
+    default_rate: float = 0
+    default_burst: float = 5
+    # 是否默认遵守免打扰时间
+    default_quiet_hours: bool = True
+    # send中是否已经记录了指标与事件
+    records_delivery: bool = False
+
+    name: str
+    options: Dict[str, str]
+    timeout: float
+    quiet_hours: bool
+    rate_limiter: TokenBucket
+
+    def __init__(self, name: str, options: Dict[str, str]):
+        self.name = name
+        self.options = options
+
+        self.timeout = float(options.get("timeout") or get_timeout("webhook"))
+        self.quiet_hours = parse_bool(options.get("quiet_hours", ""), self.default_quiet_hours)
+
+        rate = float(options.get("rate") or self.default_rate)
+        burst = float(options.get("burst") or self.default_burst)
+        self.rate_limiter = TokenBucket(rate / 60, burst)
+
+    def get_required_option(self, key: str) -> str:
+        value = self.options.get(key, "")
+        if len(value) == 0:
+            raise ValueError(f"Notifier {self.name} requires option '{key}'")
+        return value
+
+    def send(self, payload: dict) -> bool:
+        """
+        发送一条通知
+        :param payload: notification_list_to_payload生成的内容
+        :return: 是否发送成功，失败会按发送队列的规则重试
+        """
+        raise NotImplementedError
+
+    def deliver(self, payload: dict) -> bool:
+        """发送并记录耗时与结果"""
+        if self.records_delivery:
+            return self.send(payload)
+
+        start_time = time.monotonic()
+        try:
+            is_success = self.send(payload)
+            error = "" if is_success else "rejected"
+        except Exception as e:
+            elapsed = time.monotonic() - start_time
+            metrics.record_webhook_send(self.name, False, elapsed)
+            emit_event(WebhookDeliveryEvent(self.name, False, 0, elapsed, f"{type(e).__name__}: {e}"))
+            raise
+
+        elapsed = time.monotonic() - start_time
+        metrics.record_webhook_send(self.name, is_success, elapsed)
+        emit_event(WebhookDeliveryEvent(self.name, is_success, 0, elapsed, error))
+        return is_success
+
+
+def build_event_record(payload: dict) -> dict:
+    """通用JSON格式(JSON WebHook、本地文件、Unix Socket)"""
+    return {
+        "source": "shmtu_auth",
+        "machine": wework.machine_name,
+        "time": my_time.get_now_time(),
+        "text": payload.get("msg", ""),
+        "notifications": payload.get("notifications") or [],
+    }
+
+
+@register_notifier("wework")
+class WeWorkNotifier(Notifier):
+    # 企业微信机器人每分钟最多20条
+    default_rate = 20
+    records_delivery = True
+
+    webhook_url: str
+
+    def __init__(self, name: str, options: Dict[str, str]):
+        super().__init__(name, options)
+
+        self.webhook_url = wework.get_wework_url(options.get("url", ""))
+        if not self.webhook_url:
+            raise ValueError(f"Notifier {name} requires option 'url' or {wework.ENV_VAR_NAME}")
+
+    def send(self, payload: dict) -> bool:
+        return wework.direct_send_text(self.webhook_url, payload["msg"], timeout=self.timeout)
+
+
+@register_notifier("json")
+class JsonWebhookNotifier(Notifier):
+    """POST通用JSON格式到任意地址"""
+
+    default_rate = 60
+
+    url: str
+
+    def __init__(self, name: str, options: Dict[str, str]):
+        super().__init__(name, options)
+        self.url = self.get_required_option("url")
+
+    def send(self, payload: dict) -> bool:
+        r = http_client.post(self.url, timeout=self.timeout, json=build_event_record(payload))
+        return r.ok
+
+
+@register_notifier("email")
+class EmailNotifier(Notifier):
+    default_rate = 10
+
+    host: str
+    port: int
+    use_ssl: bool
+    user: str
+    password: str
+    from_address: str
+    to_address_list: List[str]
+
+    def __init__(self, name: str, options: Dict[str, str]):
+        super().__init__(name, options)
+
+        self.host = self.get_required_option("host")
+        self.use_ssl = parse_bool(options.get("ssl", ""), True)
+        self.port = int(options.get("port") or (465 if self.use_ssl else 25))
+        self.user = options.get("user", "")
+        self.password = options.get("password", "")
+        self.from_address = options.get("from") or self.user
+        self.to_address_list = [
+            address.strip() for address in self.get_required_option("to").replace(";", ",").split(",") if address.strip()
+        ]
+
+    def send(self, payload: dict) -> bool:
+        text = payload["msg"]
+
+        message = EmailMessage()
+        message["Subject"] = f"[{wework.machine_name or 'SHMTU_Auth'}] {text.strip().splitlines()[0]}"
+        message["From"] = self.from_address
+        message["To"] = ", ".join(self.to_address_list)
+        message.set_content(text)
+
+        smtp_class = smtplib.SMTP_SSL if self.use_ssl else smtplib.SMTP
+        with smtp_class(self.host, self.port, timeout=self.timeout) as smtp:
+            if len(self.user) > 0:
+                smtp.login(self.user, self.password)
+            smtp.send_message(message)
+        return True
+
+
+@register_notifier("file")
+class FileNotifier(Notifier):
+    """每条通知追加一行JSON，供本地工具读取"""
+
+    default_quiet_hours = False
+
+    path: str
+
+    def __init__(self, name: str, options: Dict[str, str]):
+        super().__init__(name, options)
+        self.path = self.get_required_option("path")
+
+    def send(self, payload: dict) -> bool:
+        directory = os.path.dirname(self.path)
+        if len(directory) > 0:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(build_event_record(payload), ensure_ascii=False) + "\n")
+        return True
+
+
+@register_notifier("unix_socket")
+class UnixSocketNotifier(Notifier):
+    """每条通知作为一行JSON写入Unix Socket(SOCK_STREAM)，值班工具监听即可收到"""
+
+    default_quiet_hours = False
+
+    path: str
+
+    def __init__(self, name: str, options: Dict[str, str]):
+        super().__init__(name, options)
+        self.path = self.get_required_option("path")
+
+        if not hasattr(socket, "AF_UNIX"):
+            raise ValueError(f"Notifier {name}: Unix socket is not supported on this system")
+
+    def send(self, payload: dict) -> bool:
+        data = (json.dumps(build_event_record(payload), ensure_ascii=False) + "\n").encode("utf-8")
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(self.timeout)
+            client.connect(self.path)
+            client.sendall(data)
+        return True
+
+
+def create_notifier(name: str, options: Dict[str, str]) -> Notifier:
+    type_name = options.get("type") or name
+    if type_name not in notifier_type_dict:
+        raise ValueError(f"Unknown notifier type '{type_name}' for {name}")
+    return notifier_type_dict[type_name](name, options)
+
+
+def read_notifier_options(name: str) -> Dict[str, str]:
+    options = {}
+    for key in option_key_list:
+        value = get_env_str(f"SHMTU_AUTH_NOTIFIER_{name.upper()}_{key.upper()}", "")
+        if len(value) > 0:
+            options[key] = value
+    return options
+
+
+def load_notifiers_from_env() -> List[Notifier]:
+    """
+    按SHMTU_AUTH_NOTIFIERS创建通知渠道，配置有误的渠道会被跳过
+    """
+    name_list = [name.strip() for name in get_env_str("SHMTU_AUTH_NOTIFIERS", "").replace(",", ";").split(";")]
+    name_list = [name for name in name_list if len(name) > 0]
+
+    if len(name_list) == 0:
+        # 兼容只配置了企业微信的情况
+        if wework.is_configured():
+            name_list = ["wework"]
+        else:
+            return []
+
+    notifier_list = []
+    for name in name_list:
+        try:
+            notifier_list.append(create_notifier(name, read_notifier_options(name)))
+        except ValueError as e:
+            logger.error(f"Failed to create notifier {name}: {e}")
+
+    return notifier_list
+
+
+def merge_queued_notifications(message_list: List[DeliveryMessage]) -> List[dict]:
+    """免打扰结束后，把期间积压的通知合并为一条摘要"""
+    return [
+        merge_payloads(
+            [message.payload for message in message_list],
+            [message.created_time for message in message_list],
+            title=wework.quiet_hours_digest_title,
+        )
+    ]
+
+
+class NotifierDispatcher:
+    """
+    把通知同时发送到所有渠道
+    通知先经过合并窗口，然后写入每个渠道自己的发送队列，由各自的线程发送
+    """
+
+    notifier_list: List[Notifier]
+    queue_list: List[DeliveryQueue]
+
+    def __init__(self, notifier_list: List[Notifier], journal_directory: str = "", coalesce_window: float = -1):
+        if len(journal_directory) == 0:
+            journal_directory = get_directory_data_path()
+
+        self.notifier_list = notifier_list
+        self.queue_list = []
+        for notifier in notifier_list:
+            self.queue_list.append(
+                DeliveryQueue(
+                    notifier.name,
+                    self._create_sender(notifier),
+                    journal_path=os.path.join(journal_directory, f"notify_{notifier.name}.jsonl"),
+                    dead_letter_path=os.path.join(journal_directory, "notify_dead_letter.jsonl"),
+                    get_pause_time=wework.get_sleep_remaining_seconds if notifier.quiet_hours else None,
+                    merge_function=merge_queued_notifications,
+                )
+            )
+
+        if coalesce_window >= 0:
+            self.coalescer = NotificationCoalescer(self.dispatch, window=coalesce_window)
+        else:
+            self.coalescer = NotificationCoalescer(self.dispatch)
+
+    @staticmethod
+    def _create_sender(notifier: Notifier) -> Callable[[DeliveryMessage], bool]:
+        def sender(message: DeliveryMessage) -> bool:
+            notifier.rate_limiter.acquire()
+            return notifier.deliver(message.payload)
+
+        return sender
+
+    def notify(self, kind: str, message: str, account_list: Optional[List[str]] = None) -> None:
+        """放入合并窗口，不会阻塞"""
+        if len(self.queue_list) == 0:
+            return
+        self.coalescer.add(kind, message, account_list)
+
+    def dispatch(self, notification_list: List[Notification]) -> None:
+        payload = notification_list_to_payload(notification_list)
+        for queue in self.queue_list:
+            queue.put(queue.name, payload)
+
+    def resume(self) -> None:
+        """继续发送上次退出前未发送的通知"""
+        for queue in self.queue_list:
+            if len(queue) > 0:
+                queue.start()
+
+    def flush(self) -> None:
+        self.coalescer.flush()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self.flush()
+        for queue in self.queue_list:
+            queue.stop(timeout)
+
+
+dispatcher: Optional[NotifierDispatcher] = None
+dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher() -> NotifierDispatcher:
+    global dispatcher
+    with dispatcher_lock:
+        if dispatcher is None:
+            dispatcher = NotifierDispatcher(load_notifiers_from_env())
+            if len(dispatcher.notifier_list) > 0:
+                logger.info(f"Notifiers: {', '.join(notifier.name for notifier in dispatcher.notifier_list)}")
+            # 退出前把窗口内的通知写入发送队列
+            atexit.register(dispatcher.flush)
+        return dispatcher
+
+
+def resume_notification_queue() -> None:
+    """程序启动时调用"""
+    get_dispatcher().resume()
+
+
+def send_auth_failed_notification(user_id_list: List[str]) -> None:
+    """
+    认证失败通知，没有配置通知渠道时不发送
+    只放入合并窗口，不会阻塞认证线程
+    :param user_id_list: 尝试过的学号
+    """
+    get_dispatcher().notify(
+        "认证失败",
+        f"SHMTU_Auth\n\tTime: {my_time.get_now_time()}\n认证失败，已尝试{len(user_id_list)}个账号\n",
+        user_id_list,
+    )
+
+
+def send_auth_recovered_notification(user_id_list: List[str]) -> None:
+    """认证失败后重新登录成功的通知"""
+    get_dispatcher().notify(
+        "认证恢复",
+        f"SHMTU_Auth\n\tTime: {my_time.get_now_time()}\n认证已恢复\n",
+        user_id_list,
+    )
@@ -0,0 +1,71 @@
+"""
+测试WebHook通知合并
+
+运行示例:
+    python -m pytest src/shmtu_auth/src/webhook/test_coalescer.py -v
+"""
+
+import threading
+
+from shmtu_auth.src.webhook.coalescer import Notification, NotificationCoalescer, build_digest
+
+
+class TestBuildDigest:
+    def test_single(self):
+        """只有一条通知时使用原内容"""
+        assert build_digest([Notification("认证失败", "原内容", ["202412300001"])]) == "原内容"
+
+    def test_digest(self):
+        """按类型统计次数，账号去重并隐藏部分学号"""
+        notification_list = [
+            Notification("认证失败", "a", ["202412300001", "202412300002"], timestamp=1700000000),
+            Notification("认证恢复", "b", ["202412300001"], timestamp=1700000010),
+            Notification("认证失败", "c", ["202412300001"], timestamp=1700000020),
+        ]
+        digest = build_digest(notification_list)
+
+        assert "3条通知" in digest
+        assert "认证失败: 2次" in digest
+        assert "认证恢复: 1次" in digest
+        assert digest.index("认证失败") < digest.index("认证恢复")
+        assert digest.count("2024*****001") == 2
+        assert "2024*****002" in digest
+        assert "202412300001" not in digest
+
+
+class TestNotificationCoalescer:
+    def test_window(self):
+        """窗口内的通知合并为一条消息"""
+        sent_list = []
+        sent_event = threading.Event()
+
+        def send(notification_list):
+            sent_list.append(build_digest(notification_list))
+            sent_event.set()
+
+        coalescer = NotificationCoalescer(send, window=0.1)
+        for _ in range(5):
+            coalescer.add("认证失败", "a", ["202412300001"])
+
+        assert sent_event.wait(5)
+        assert len(sent_list) == 1
+        assert "认证失败: 5次" in sent_list[0]
+        assert coalescer.pending_count() == 0
+
+    def test_flush_and_no_window(self):
+        """手动发送窗口内的通知；窗口为0时不合并"""
+        sent_list = []
+
+        def send(notification_list):
+            sent_list.append(build_digest(notification_list))
+
+        coalescer = NotificationCoalescer(send, window=60)
+        coalescer.add("认证失败", "a")
+        coalescer.flush()
+        coalescer.flush()
+        assert sent_list == ["a"]
+
+        coalescer = NotificationCoalescer(send, window=0)
+        coalescer.add("认证失败", "b")
+        coalescer.add("认证失败", "c")
+        assert sent_list == ["a", "b", "c"]
@@ -0,0 +1,158 @@
+"""
+测试WebHook持久化发送队列
+
+运行示例:
+    python -m pytest src/shmtu_auth/src/webhook/test_delivery_queue.py -v
+"""
+
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from shmtu_auth.src.webhook.delivery_queue import DeliveryQueue, get_retry_delay
+
+
+class FakeSender:
+    """按顺序返回结果的发送函数，记录收到的消息"""
+
+    def __init__(self, result_list=None):
+        self.result_list = list(result_list or [])
+        self.sent_list = []
+        self.lock = threading.Lock()
+
+    def __call__(self, message) -> bool:
+        with self.lock:
+            self.sent_list.append(message.payload["msg"])
+            if len(self.result_list) == 0:
+                return True
+            result = self.result_list.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return os.path.join(tmp_path, "queue.jsonl"), os.path.join(tmp_path, "dead.jsonl")
+
+
+def create_queue(paths, sender, **kwargs) -> DeliveryQueue:
+    journal_path, dead_letter_path = paths
+    return DeliveryQueue(
+        "test",
+        sender,
+        journal_path=journal_path,
+        dead_letter_path=dead_letter_path,
+        retry_delay=0.01,
+        retry_max_delay=0.05,
+        **kwargs,
+    )
+
+
+class TestDeliveryQueue:
+    def test_deliver_in_order(self, paths):
+        """按加入顺序发送，发送完成后删除磁盘日志"""
+        sender = FakeSender()
+        queue = create_queue(paths, sender)
+        for i in range(5):
+            queue.put("test", {"msg": str(i)})
+
+        assert queue.wait_until_empty(5)
+        queue.stop()
+        assert sender.sent_list == ["0", "1", "2", "3", "4"]
+        assert not os.path.exists(paths[0])
+
+    def test_retry(self, paths):
+        """失败或抛出异常后重试"""
+        sender = FakeSender([False, ConnectionError("down"), True])
+        queue = create_queue(paths, sender)
+        queue.put("test", {"msg": "a"})
+
+        assert queue.wait_until_empty(5)
+        queue.stop()
+        assert sender.sent_list == ["a", "a", "a"]
+
+    def test_dead_letter(self, paths):
+        """超过次数后写入死信文件，不影响后面的消息"""
+        sender = FakeSender([False, False])
+        queue = create_queue(paths, sender, max_attempts=2)
+        queue.put("test", {"msg": "a"})
+        queue.put("test", {"msg": "b"})
+
+        assert queue.wait_until_empty(5)
+        queue.stop()
+        assert sender.sent_list == ["a", "a", "b"]
+
+        with open(paths[1], encoding="utf-8") as f:
+            dead_list = [json.loads(line) for line in f]
+        assert len(dead_list) == 1
+        assert dead_list[0]["payload"]["msg"] == "a"
+        assert dead_list[0]["attempt"] == 2
+        assert dead_list[0]["last_error"] == "rejected"
+
+    def test_restore_after_restart(self, paths):
+        """未发送的消息在重启后恢复，已发送的不会重复发送"""
+        queue = create_queue(paths, FakeSender(), get_pause_time=lambda: 3600)
+        queue.put("test", {"msg": "a"})
+        queue.put("test", {"msg": "b"})
+        queue.stop()
+        with open(paths[0], "a", encoding="utf-8") as f:
+            f.write(json.dumps({"op": "done", "id": queue._message_deque[0].message_id}) + "\n")
+            # 模拟退出时写入了一半
+            f.write('{"op": "add", "mess')
+
+        sender = FakeSender()
+        new_queue = create_queue(paths, sender)
+        assert len(new_queue) == 1
+        new_queue.start()
+        assert new_queue.wait_until_empty(5)
+        new_queue.stop()
+        assert sender.sent_list == ["b"]
+
+    def test_merge_after_pause(self, paths):
+        """暂停期间积压的消息在暂停结束后合并为一条"""
+        pause_end_time = time.monotonic() + 0.3
+
+        def merge(message_list):
+            return [{"msg": "+".join(message.payload["msg"] for message in message_list)}]
+
+        sender = FakeSender()
+        queue = create_queue(
+            paths,
+            sender,
+            get_pause_time=lambda: max(pause_end_time - time.monotonic(), 0),
+            merge_function=merge,
+        )
+        for msg in ["a", "b", "c"]:
+            queue.put("test", {"msg": msg})
+
+        assert queue.wait_until_empty(5)
+        queue.stop()
+        assert sender.sent_list == ["a+b+c"]
+
+    def test_journal_error(self, paths):
+        """日志写入失败时仍然发送，等待的线程被及时唤醒"""
+
+        def raise_os_error(*args):
+            raise OSError("disk full")
+
+        sender = FakeSender([False])
+        queue = create_queue(paths, sender)
+        queue._append_journal = raise_os_error
+        queue._rewrite_journal = raise_os_error
+        queue.put("test", {"msg": "a"})
+
+        start_time = time.monotonic()
+        assert queue.wait_until_empty(5)
+        queue.stop()
+        assert time.monotonic() - start_time < 2
+        assert sender.sent_list == ["a", "a"]
+
+    def test_retry_delay(self):
+        """指数退避，不超过上限"""
+        assert 1 <= get_retry_delay(1, 1, 100, 0.2) <= 1.2
+        assert 8 <= get_retry_delay(4, 1, 100, 0.2) <= 9.6
+        assert 100 <= get_retry_delay(20, 1, 100, 0.2) <= 120
@@ -0,0 +1,144 @@
+"""
+测试通知插件
+
+运行示例:
+    python -m pytest src/shmtu_auth/src/webhook/test_notifier.py -v
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+
+import pytest
+
+from shmtu_auth.src.webhook import wework
+from shmtu_auth.src.webhook.notifier import (
+    FileNotifier,
+    Notifier,
+    NotifierDispatcher,
+    TokenBucket,
+    UnixSocketNotifier,
+    create_notifier,
+    load_notifiers_from_env,
+)
+
+
+class SlowNotifier(Notifier):
+    """第一次发送时等待release，用于检查渠道之间互不影响"""
+
+    def __init__(self, name: str):
+        super().__init__(name, {})
+        self.release = threading.Event()
+        self.text_list = []
+
+    def send(self, payload: dict) -> bool:
+        self.release.wait(5)
+        self.text_list.append(payload["msg"])
+        return True
+
+
+class TestTokenBucket:
+    def test_unlimited(self):
+        """rate为0时不限制"""
+        bucket = TokenBucket(0, 1)
+        assert all(bucket.get_wait_time() == 0 for _ in range(100))
+
+    def test_burst(self):
+        """令牌用完后需要等待"""
+        bucket = TokenBucket(1, 2)
+        assert bucket.get_wait_time() == 0
+        assert bucket.get_wait_time() == 0
+        assert 0 < bucket.get_wait_time() <= 1
+
+
+class TestCreateNotifier:
+    def test_invalid(self):
+        """未知类型或缺少必需的配置项"""
+        with pytest.raises(ValueError):
+            create_notifier("unknown", {})
+        with pytest.raises(ValueError):
+            create_notifier("log", {"type": "file"})
+
+    def test_load_from_env(self, monkeypatch, tmp_path):
+        """按SHMTU_AUTH_NOTIFIERS创建，配置有误的渠道被跳过"""
+        monkeypatch.setenv("SHMTU_AUTH_NOTIFIERS", "log; broken")
+        monkeypatch.setenv("SHMTU_AUTH_NOTIFIER_LOG_TYPE", "file")
+        monkeypatch.setenv("SHMTU_AUTH_NOTIFIER_LOG_PATH", os.path.join(tmp_path, "notify.jsonl"))
+        monkeypatch.setenv("SHMTU_AUTH_NOTIFIER_LOG_RATE", "30")
+        monkeypatch.setenv("SHMTU_AUTH_NOTIFIER_BROKEN_TYPE", "json")
+
+        notifier_list = load_notifiers_from_env()
+        assert len(notifier_list) == 1
+        assert isinstance(notifier_list[0], FileNotifier)
+        assert notifier_list[0].name == "log"
+        assert notifier_list[0].rate_limiter.rate == 0.5
+        assert not notifier_list[0].quiet_hours
+
+    def test_wework_fallback(self, monkeypatch):
+        """只配置企业微信时使用wework渠道，队列名称与旧的文本队列不同"""
+        monkeypatch.delenv("SHMTU_AUTH_NOTIFIERS", raising=False)
+        monkeypatch.setenv("SHMTU_AUTH_WEBHOOK_WEWORK", "key")
+
+        notifier_list = load_notifiers_from_env()
+        assert [notifier.name for notifier in notifier_list] == ["wework"]
+        assert notifier_list[0].name != wework.DELIVERY_QUEUE_NAME
+
+
+class TestNotifierDispatcher:
+    def test_slow_channel_does_not_block(self, tmp_path):
+        """某个渠道阻塞时，其他渠道照常发送"""
+        file_path = os.path.join(tmp_path, "notify.jsonl")
+        file_notifier = FileNotifier("log", {"path": file_path})
+        slow_notifier = SlowNotifier("slow")
+        dispatcher = NotifierDispatcher(
+            [slow_notifier, file_notifier], journal_directory=os.path.join(tmp_path, "data"), coalesce_window=0
+        )
+
+        dispatcher.notify("认证失败", "failed", ["202412300001"])
+        assert dispatcher.queue_list[1].wait_until_empty(5)
+        assert len(slow_notifier.text_list) == 0
+
+        with open(file_path, encoding="utf-8") as f:
+            record = json.loads(f.readline())
+        assert record["text"] == "failed"
+        assert record["notifications"][0]["kind"] == "认证失败"
+
+        slow_notifier.release.set()
+        assert dispatcher.queue_list[0].wait_until_empty(5)
+        assert slow_notifier.text_list == ["failed"]
+        dispatcher.stop()
+
+    def test_no_notifier(self, tmp_path):
+        """没有通知渠道时直接忽略"""
+        dispatcher = NotifierDispatcher([], journal_directory=str(tmp_path), coalesce_window=0)
+        dispatcher.notify("认证失败", "failed")
+        dispatcher.stop()
+
+    @pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="Unix socket is not supported")
+    def test_unix_socket(self, tmp_path):
+        """通知作为一行JSON写入Unix Socket"""
+        socket_path = os.path.join(tmp_path, "notify.sock")
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(socket_path)
+        server.listen(1)
+        server.settimeout(5)
+
+        received_list = []
+
+        def accept():
+            connection, _ = server.accept()
+            with connection:
+                received_list.append(connection.makefile("r", encoding="utf-8").readline())
+
+        thread = threading.Thread(target=accept)
+        thread.start()
+
+        start_time = time.monotonic()
+        assert UnixSocketNotifier("oncall", {"path": socket_path}).deliver({"msg": "hello"})
+        thread.join(5)
+        server.close()
+
+        assert time.monotonic() - start_time < 5
+        assert json.loads(received_list[0])["text"] == "hello"
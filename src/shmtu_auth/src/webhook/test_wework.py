@@ -0,0 +1,71 @@
+"""
+测试企业微信文字消息的发送队列
+
+运行示例:
+    python -m pytest src/shmtu_auth/src/webhook/test_wework.py -v
+"""
+
+from shmtu_auth.src.webhook import wework
+from shmtu_auth.src.webhook.delivery_queue import DeliveryMessage
+
+
+def create_message(webhook_url: str, msg: str, mentioned_id=None, mentioned_mobile=None) -> DeliveryMessage:
+    return DeliveryMessage(
+        "wework",
+        {
+            "webhook_url": webhook_url,
+            "msg": msg,
+            "mentioned_id": mentioned_id,
+            "mentioned_mobile": mentioned_mobile,
+        },
+    )
+
+
+class TestMergeQueuedText:
+    def test_single(self):
+        """只有一条消息时原样发送"""
+        message = create_message("url_1", "a", ["user_1"])
+        assert wework.merge_queued_text([message]) == [message.payload]
+
+    def test_merge_mentioned(self):
+        """合并后的摘要保留每条消息需要提醒的成员，按顺序去重"""
+        message_list = [
+            create_message("url_1", "a", ["user_1"], ["13800000001"]),
+            create_message("url_1", "b", ["user_2", "user_1"]),
+            create_message("url_1", "c", None, ["13800000001", "13800000002"]),
+        ]
+
+        payload_list = wework.merge_queued_text(message_list)
+        assert len(payload_list) == 1
+        payload = payload_list[0]
+        assert payload["webhook_url"] == "url_1"
+        assert payload["mentioned_id"] == ["user_1", "user_2"]
+        assert payload["mentioned_mobile"] == ["13800000001", "13800000002"]
+
+    def test_merge_by_url(self):
+        """不同WebHook地址分别合并，没有需要提醒的成员时不提醒"""
+        message_list = [
+            create_message("url_1", "a"),
+            create_message("url_2", "b", ["user_2"]),
+            create_message("url_1", "c"),
+            create_message("url_2", "d"),
+        ]
+
+        payload_dict = {payload["webhook_url"]: payload for payload in wework.merge_queued_text(message_list)}
+        assert payload_dict["url_1"]["mentioned_id"] is None
+        assert payload_dict["url_1"]["mentioned_mobile"] is None
+        assert payload_dict["url_2"]["mentioned_id"] == ["user_2"]
+
+    def test_send_merged(self, monkeypatch):
+        """发送合并后的摘要时传入提醒的成员"""
+        call_list = []
+        monkeypatch.setattr(wework, "direct_send_text", lambda *args: call_list.append(args) or True)
+
+        message_list = [create_message("url_1", "a", ["user_1"]), create_message("url_1", "b", ["user_2"])]
+        payload = wework.merge_queued_text(message_list)[0]
+        assert wework.send_queued_text(DeliveryMessage("wework", payload))
+
+        webhook_url, _, mentioned_id, mentioned_mobile = call_list[0]
+        assert webhook_url == "url_1"
+        assert mentioned_id == ["user_1", "user_2"]
+        assert mentioned_mobile is None
@@ -1,13 +1,18 @@
 import datetime
 import json
 import threading
-from time import sleep as time_sleep
-
-import requests
-
-from shmtu_auth.src.utils import my_time
+import time
+from typing import Dict, List, Optional
+
+from shmtu_auth.src.telemetry import metrics
+from shmtu_auth.src.telemetry.event_log import WebhookDeliveryEvent, emit_event
+from shmtu_auth.src.telemetry.tracing import span
+from shmtu_auth.src.utils import http_client, my_time
+from shmtu_auth.src.utils.deadline import get_timeout
 from shmtu_auth.src.utils.env import get_env_str, get_env_time
 from shmtu_auth.src.utils.logs import get_logger
+from shmtu_auth.src.webhook.coalescer import merge_payloads
+from shmtu_auth.src.webhook.delivery_queue import DeliveryMessage, DeliveryQueue
 
 logger = get_logger()
 
@@ -38,8 +43,18 @@ def get_wework_url(webhook_env: str = ""):
     return webhook_url
 
 
-def direct_send_text(webhook_url: str, msg: str, mentioned_id=None, mentioned_mobile=None):
-    """Send text to WeWork"""
+def direct_send_text(
+    webhook_url: str,
+    msg: str,
+    mentioned_id=None,
+    mentioned_mobile=None,
+    timeout: float = -1,
+) -> bool:
+    """
+    Send text to WeWork
+    :param timeout: 单位：秒，小于0时使用SHMTU_AUTH_TIMEOUT_WEBHOOK
+    :return: 是否发送成功(HTTP状态码正常且errcode为0)
+    """
 
     logger.info("WebHook WeWork direct send text start!")
 
@@ -50,7 +65,7 @@ def direct_send_text(webhook_url: str, msg: str, mentioned_id=None, mentioned_mo
 
     if not webhook_url:
         print("URL Not Set!")
-        return
+        return False
 
     msg = f"{machine_name}\n{msg}"
 
@@ -62,49 +77,142 @@ def direct_send_text(webhook_url: str, msg: str, mentioned_id=None, mentioned_mo
     if mentioned_mobile:
         data["text"]["mentioned_mobile_list"] = mentioned_mobile
 
-    r = requests.post(webhook_url, headers=headers, data=json.dumps(data))
-    print("WeWork", "text", r.text)
-
-    logger.info("WebHook WeWork direct send text end!")
+    start_time = time.monotonic()
+    try:
+        with span("webhook.send", channel="wework") as current_span:
+            r = http_client.post(
+                webhook_url, headers=headers, data=json.dumps(data), timeout=timeout if timeout > 0 else get_timeout("webhook")
+            )
+            current_span.set_attribute("status_code", r.status_code)
+    except Exception as e:
+        elapsed = time.monotonic() - start_time
+        metrics.record_webhook_send("wework", False, elapsed)
+        emit_event(WebhookDeliveryEvent("wework", False, 0, elapsed, f"{type(e).__name__}: {e}"))
+        raise
+    elapsed = time.monotonic() - start_time
+
+    # 企业微信出错时HTTP状态码仍为200，需要检查errcode
+    is_success = r.ok
+    if is_success:
+        try:
+            is_success = r.json().get("errcode", 0) == 0
+        except ValueError:
+            pass
 
+    metrics.record_webhook_send("wework", is_success, elapsed)
+    emit_event(WebhookDeliveryEvent("wework", is_success, r.status_code, elapsed, "" if is_success else r.text[:200]))
+    logger.debug(f"WeWork response: {r.text}")
+    return is_success
 
-msg_queue = []
-thread_is_start = False
 
 sleep_time_start = get_env_time("SHMTU_WEBHOOK_SLEEP_TIME_START", datetime.time(23, 0))
 sleep_time_end = get_env_time("SHMTU_WEBHOOK_SLEEP_TIME_END", datetime.time(7, 30))
+quiet_hours_digest_title = "SHMTU_Auth 免打扰期间的通知"
 
+# 与通知插件中名为wework的渠道区分(队列长度指标按名称区分)
+DELIVERY_QUEUE_NAME = "wework_text"
 
-def send_text_thread():
-    while True:
-        if len(msg_queue) == 0:
-            time_sleep(5)
-            continue
+delivery_queue: Optional[DeliveryQueue] = None
+delivery_queue_lock = threading.Lock()
 
-        try:
-            if my_time.is_within_time_range(sleep_time_start, sleep_time_end):
-                time_sleep(60)
-                continue
 
-            current_msg = msg_queue[0]
-            direct_send_text(current_msg[0], current_msg[1], current_msg[2], current_msg[3])
-            msg_queue.pop(0)
-            logger.info("WebHook WeWork send text success!")
-        except Exception as e:
-            logger.exception("WebHook WeWork send text failed!")
-            logger.exception(e)
-            time_sleep(60)
+def get_sleep_remaining_seconds() -> float:
+    """距离免打扰时间结束的秒数，不在免打扰时间内时为0"""
+    return my_time.get_time_range_remaining_seconds(sleep_time_start, sleep_time_end)
+
+
+def send_queued_text(message: DeliveryMessage) -> bool:
+    payload = message.payload
+    return direct_send_text(
+        payload["webhook_url"],
+        payload["msg"],
+        payload.get("mentioned_id"),
+        payload.get("mentioned_mobile"),
+    )
+
+
+def merge_mentioned_list(payload_list: List[dict], key: str) -> Optional[List[str]]:
+    """
+    合并多条消息中需要提醒的成员，保持顺序并去重
+    :param key: mentioned_id或mentioned_mobile
+    :return: 没有需要提醒的成员时为None
+    """
+    mentioned_list = []
+    for payload in payload_list:
+        for mentioned in payload.get(key) or []:
+            if mentioned not in mentioned_list:
+                mentioned_list.append(mentioned)
+    return mentioned_list if len(mentioned_list) > 0 else None
+
+
+def merge_queued_text(message_list: List[DeliveryMessage]) -> List[dict]:
+    """
+    免打扰结束后，把期间积压的消息按WebHook地址合并为一条摘要
+    """
+    message_dict: Dict[str, List[DeliveryMessage]] = {}
+    for message in message_list:
+        message_dict.setdefault(message.payload["webhook_url"], []).append(message)
+
+    payload_list = []
+    for webhook_url, url_message_list in message_dict.items():
+        if len(url_message_list) == 1:
+            payload_list.append(url_message_list[0].payload)
+            continue
+
+        url_payload_list = [message.payload for message in url_message_list]
+        payload = merge_payloads(
+            url_payload_list,
+            [message.created_time for message in url_message_list],
+            title=quiet_hours_digest_title,
+        )
+        payload["webhook_url"] = webhook_url
+        # 摘要中仍然提醒每条消息原本需要提醒的成员
+        payload["mentioned_id"] = merge_mentioned_list(url_payload_list, "mentioned_id")
+        payload["mentioned_mobile"] = merge_mentioned_list(url_payload_list, "mentioned_mobile")
+        payload_list.append(payload)
+
+    return payload_list
+
+
+def get_delivery_queue() -> DeliveryQueue:
+    """
+    获取发送队列(第一次调用时读取磁盘上未发送的消息)
+    """
+    global delivery_queue
+    with delivery_queue_lock:
+        if delivery_queue is None:
+            # 免打扰期间等待到结束，然后把积压的消息合并发送
+            delivery_queue = DeliveryQueue(
+                DELIVERY_QUEUE_NAME,
+                send_queued_text,
+                get_pause_time=get_sleep_remaining_seconds,
+                merge_function=merge_queued_text,
+            )
+        return delivery_queue
+
+
+def resume_send_text_queue() -> None:
+    """程序启动时调用，继续发送上次退出前未发送的消息"""
+    queue = get_delivery_queue()
+    if len(queue) > 0:
+        queue.start()
 
 
 def add_send_text_to_queue(webhook_url: str, msg: str, mentioned_id=None, mentioned_mobile=None):
-    msg_queue.append((webhook_url, msg, mentioned_id, mentioned_mobile))
+    get_delivery_queue().put(
+        "wework",
+        {
+            "webhook_url": webhook_url,
+            "msg": msg,
+            "mentioned_id": mentioned_id,
+            "mentioned_mobile": mentioned_mobile,
+        },
+    )
     logger.info("WebHook WeWork add send text to queue!")
 
-    global thread_is_start
-    if not thread_is_start:
-        thread_is_start = True
-        threading.Thread(target=send_text_thread).start()
-        logger.info("WebHook WeWork send text thread start!")
+
+def is_configured() -> bool:
+    return len(get_env_str(ENV_VAR_NAME, "")) > 0
 
 
 if __name__ == "__main__":